@@ -1,6 +1,8 @@
 import requests
 from dotenv import set_key, load_dotenv
 import os
+from token_manager import TokenManager
+from veracore_client import VeraCoreClient
 
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
 load_dotenv(dotenv_path)
@@ -35,6 +37,11 @@ if response.status_code == 200:
     if token:
         set_key(dotenv_path, "W_TOKEN", token)
         print("Token saved to .env file as W_TOKEN.")
+
+        # Also refresh the token cache reports.py reads, so its next run skips the login
+        cache_path = os.path.join(os.path.dirname(__file__), "data", "veracore_token.json")
+        TokenManager(VeraCoreClient(), payload["userName"], PASSWORD, SYSTEM_ID, cache_path).store(token)
+        print(f"Token cached in {cache_path}.")
 else:
     print("Login failed.")
     print("Status Code:", response.status_code)
@@ -0,0 +1,199 @@
+"""End-to-end latency benchmark of reports.main() against the local fake services.
+
+Every scenario (report count x rows per report) runs the real pipeline in a
+fresh working directory against fake_services.FakeServiceServer and records
+the wall time of main() plus the time spent in each pipeline stage:
+
+    python benchmark.py --reports 1,4 --rows 1000,50000 --delay 2 --json bench.json
+
+Stage times are summed over all calls, so with several report workers a
+stage can add up to more than the wall time.
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import reports
+from fake_services import FakeReport, FakeServiceServer, FakeSharePoint, FakeSharePointSession, FakeVeraCore
+
+logger = logging.getLogger(__name__)
+
+# reports.py functions timed as pipeline stages (looked up by name, so wrapping them is enough)
+STAGES = [
+    "get_token",
+    "start_report_task",
+    "wait_for_report",
+    "download_report",
+    "run_partitioned_report",
+    "fingerprint_csv",
+    "write_columnar_outputs",
+    "write_kpi_outputs",
+    "write_change_feed",
+    "upload_to_sharepoint",
+    "archive_superseded_files",
+]
+
+# Settings every benchmark run uses; the fake service accepts any credentials
+BENCH_ENV = {
+    "USERNAME": "benchmark",
+    "PASSWORD": "benchmark",
+    "SYSTEM_ID": "benchmark",
+    "W_TOKEN": "",
+    "SHAREPOINT_CLIENT_ID": "benchmark",
+    "SHAREPOINT_CLIENT_SECRET": "benchmark",
+    "REPORT_INCREMENTAL": "false",
+}
+
+
+class StageTimer:
+    """Wrap module functions and accumulate call counts and durations per function"""
+
+    def __init__(self, module, names):
+        self.module = module
+        self.names = [name for name in names if hasattr(module, name)]
+        self.stats = {}
+        self._originals = {}
+        self._lock = threading.Lock()
+
+    def _wrap(self, name, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._record(name, time.perf_counter() - started)
+        return timed
+
+    def _record(self, name, seconds):
+        with self._lock:
+            stat = self.stats.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+            stat["calls"] += 1
+            stat["seconds"] += seconds
+            stat["max_seconds"] = max(stat["max_seconds"], seconds)
+
+    def __enter__(self):
+        for name in self.names:
+            self._originals[name] = getattr(self.module, name)
+            setattr(self.module, name, self._wrap(name, self._originals[name]))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for name, func in self._originals.items():
+            setattr(self.module, name, func)
+        self._originals.clear()
+
+
+def run_scenario(server, report_count, rows, settings=None, verbose=False):
+    """Run main() once for ``report_count`` reports of ``rows`` rows and return the timings"""
+    server.veracore.reset()
+    server.sharepoint.reset()
+    reports_to_run = []
+    for i in range(1, report_count + 1):
+        report = server.veracore.add_report(FakeReport(f"BenchReport{i}", rows))
+        reports_to_run.append({"report_name": report.name, "filters": [], "output_csv": f"Bench{i}.csv"})
+
+    os.environ.update(BENCH_ENV)
+    os.environ.update(settings or {})
+    os.environ["VERACORE_BASE_URL"] = server.veracore_url
+
+    with tempfile.TemporaryDirectory(prefix="veracore_bench_") as base_dir:
+        reports.initialize(base_dir=base_dir, log_to_file=False)
+        if not verbose:
+            logging.getLogger().setLevel(logging.WARNING)
+        reports.sharepoint = FakeSharePointSession(
+            server.sharepoint_url,
+            large_file_threshold=reports.SHAREPOINT_LARGE_UPLOAD_BYTES,
+            chunk_size=reports.SHAREPOINT_UPLOAD_CHUNK_BYTES,
+            upload_state_dir=os.path.join(base_dir, "data", "uploads")
+        )
+        try:
+            with StageTimer(reports, STAGES) as timer:
+                started = time.perf_counter()
+                success = reports.main(reports_to_run)
+                seconds = time.perf_counter() - started
+        finally:
+            reports.shutdown()
+
+    return {
+        "reports": report_count,
+        "rows_per_report": rows,
+        "success": bool(success),
+        "seconds": round(seconds, 3),
+        "stages": {
+            name: {key: round(value, 3) if isinstance(value, float) else value for key, value in stat.items()}
+            for name, stat in timer.stats.items()
+        },
+        "veracore_requests": dict(server.veracore.counts),
+        "sharepoint_requests": dict(server.sharepoint.counts),
+        "uploaded_bytes": sum(len(entry["content"]) for entry in server.sharepoint.files.values()),
+    }
+
+
+def format_results(results):
+    stages = [name for name in STAGES if any(name in result["stages"] for result in results)]
+    header = ["reports", "rows", "ok", "total_s"] + stages
+    lines = ["  ".join(f"{column:>10}" if i < 4 else column for i, column in enumerate(header))]
+    for result in results:
+        cells = [
+            f"{result['reports']:>10}",
+            f"{result['rows_per_report']:>10}",
+            f"{'yes' if result['success'] else 'NO':>10}",
+            f"{result['seconds']:>10.2f}",
+        ]
+        for name in stages:
+            stat = result["stages"].get(name)
+            cells.append(f"{stat['seconds']:.2f}s/{stat['calls']}".rjust(len(name)) if stat else "-".rjust(len(name)))
+        lines.append("  ".join(cells))
+    return "\n".join(lines)
+
+
+def parse_int_list(text):
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the report pipeline against the local fake services")
+    parser.add_argument("--reports", type=parse_int_list, default=[1, 4], help="report counts, e.g. 1,4,8")
+    parser.add_argument("--rows", type=parse_int_list, default=[1000, 50000], help="rows per report, e.g. 1000,50000")
+    parser.add_argument("--delay", type=float, default=1.0, help="seconds each report task takes on the server")
+    parser.add_argument("--max-rows", type=int, default=None,
+                        help="tasks above this many rows come back 'Request too Large' (exercises partitioning)")
+    parser.add_argument("--throttle-every", type=int, default=0,
+                        help="answer every n-th VeraCore request with 429 (exercises the rate limiter)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake request")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra pipeline setting, e.g. --set REPORT_WORKERS=1")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline log")
+    args = parser.parse_args(argv)
+
+    settings = dict(item.split("=", 1) for item in args.set)
+    veracore = FakeVeraCore(processing_delay=args.delay, max_rows=args.max_rows, latency=args.latency,
+                            throttle_every=args.throttle_every)
+    results = []
+    with FakeServiceServer(veracore, FakeSharePoint(latency=args.latency)) as server:
+        for report_count in args.reports:
+            for rows in args.rows:
+                for _ in range(args.repeat):
+                    result = run_scenario(server, report_count, rows, settings, args.verbose)
+                    results.append(result)
+                    print(f"{report_count} report(s) x {rows} rows: {result['seconds']:.2f}s "
+                          f"({'ok' if result['success'] else 'FAILED'})", flush=True)
+
+    print()
+    print(format_results(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args) | {"set": settings}, "results": results}, f, indent=2)
+    return 0 if all(result["success"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
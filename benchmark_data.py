@@ -0,0 +1,264 @@
+"""Throughput and peak memory of each data-handling stage on synthetic OrderStatus data.
+
+For every size the synthetic report is written once as a VeraCore JSON body
+and as an extract CSV (plus the following run's extract, for the change
+feed and snapshot stages). Each stage then runs twice: once timed and once
+under tracemalloc for its peak Python/NumPy allocation. Stages whose
+optional dependency (pandas, pyarrow) is missing are reported as skipped.
+
+    python benchmark_data.py --sizes 100k,1m --json bench_data.json
+    python benchmark_data.py --sizes 100k,1m --baseline bench_data.json   # exit 1 on a regression
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from change_feed import write_change_feed
+from report_kpis import write_kpi_outputs
+from report_output import write_columnar_outputs
+from report_stream import READ_CHUNK_BYTES, iter_json_array, write_rows_to_csv
+from snapshot_store import SnapshotStore
+from synthetic_data import iter_next_extract, iter_rows, write_csv, write_report_json
+from upload_manifest import fingerprint_csv
+
+
+def _read_chunks(path):
+    with open(path, encoding="utf-8") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _load_records(files):
+    with open(files["json"], encoding="utf-8") as f:
+        return {"records": json.load(f)["Data"]}
+
+
+def _load_frame(files):
+    import pandas as pd
+
+    return {"df": pd.DataFrame(_load_records(files)["records"])}
+
+
+def _fresh_store(files):
+    path = os.path.join(files["work"], "snapshots.sqlite")
+    if os.path.exists(path):
+        os.remove(path)
+    store = SnapshotStore(path)
+    store.add_snapshot("Bench", files["csv"])
+    return {"store": store}
+
+
+def _csv_copy(files):
+    path = os.path.join(files["work"], "Extract.csv")
+    shutil.copyfile(files["csv"], path)
+    return {"path": path}
+
+
+def stage_json_parse(files, ctx):
+    """Non-streaming download: response.json() of the whole body"""
+    return len(_load_records(files)["records"])
+
+
+def stage_dataframe(files, ctx):
+    """Non-streaming download: records -> DataFrame"""
+    import pandas as pd
+
+    return len(pd.DataFrame(ctx["records"]))
+
+
+def stage_to_csv(files, ctx):
+    """Non-streaming download: DataFrame -> CSV"""
+    ctx["df"].to_csv(os.path.join(files["work"], "out.csv"), index=False)
+    return len(ctx["df"])
+
+
+def stage_stream_to_csv(files, ctx):
+    """Streaming download: JSON body chunks -> CSV in bounded batches"""
+    rows = iter_json_array(_read_chunks(files["json"]))
+    return write_rows_to_csv(rows, os.path.join(files["work"], "out.csv"))
+
+
+def stage_fingerprint(files, ctx):
+    return fingerprint_csv(files["csv"])[1]
+
+
+def stage_columnar(files, ctx):
+    write_columnar_outputs(ctx["path"], ["parquet"])
+    return files["rows"]
+
+
+def stage_kpi(files, ctx):
+    write_kpi_outputs(ctx["path"])
+    return files["rows"]
+
+
+def stage_change_feed(files, ctx):
+    counts = write_change_feed(files["csv"], files["next_csv"], os.path.join(files["work"], "changes.csv"))
+    return sum(counts.values())
+
+
+def stage_snapshot(files, ctx):
+    return ctx["store"].add_snapshot("Bench", files["next_csv"])["rows"]
+
+
+# name: (input file the throughput is measured against, required modules, untimed setup, stage)
+STAGES = {
+    "json_parse": ("json", (), None, stage_json_parse),
+    "dataframe": ("json", ("pandas",), _load_records, stage_dataframe),
+    "to_csv": ("csv", ("pandas",), _load_frame, stage_to_csv),
+    "stream_to_csv": ("json", (), None, stage_stream_to_csv),
+    "fingerprint": ("csv", (), None, stage_fingerprint),
+    "columnar": ("csv", ("pandas", "pyarrow"), _csv_copy, stage_columnar),
+    "kpi": ("csv", ("pandas",), _csv_copy, stage_kpi),
+    "change_feed": ("next_csv", (), None, stage_change_feed),
+    "snapshot": ("next_csv", (), _fresh_store, stage_snapshot),
+}
+
+
+def _missing_modules(modules):
+    missing = []
+    for module in modules:
+        try:
+            __import__(module)
+        except ImportError:
+            missing.append(module)
+    return missing
+
+
+def prepare_files(rows, work_dir, seed=0):
+    """Write the synthetic inputs for one size and return their paths"""
+    files = {"rows": rows, "work": work_dir}
+    files["json"] = write_report_json(os.path.join(work_dir, "report.json"), iter_rows(rows, seed))
+    files["csv"] = os.path.join(work_dir, "OrderStatus.csv")
+    write_csv(files["csv"], iter_rows(rows, seed))
+    files["next_csv"] = os.path.join(work_dir, "OrderStatus_next.csv")
+    write_csv(files["next_csv"], iter_next_extract(files["csv"], seed=seed + 1))
+    return files
+
+
+def run_stage(name, files, measure_memory=True):
+    input_key, modules, setup, stage = STAGES[name]
+    result = {"stage": name, "rows": files["rows"]}
+    missing = _missing_modules(modules)
+    if missing:
+        result["skipped"] = f"{', '.join(missing)} not installed"
+        return result
+
+    ctx = setup(files) if setup else {}
+    started = time.perf_counter()
+    handled = stage(files, ctx)
+    seconds = time.perf_counter() - started
+    input_mb = os.path.getsize(files[input_key]) / 1e6
+    result.update({
+        "seconds": round(seconds, 4),
+        "rows_handled": handled,
+        "rows_per_second": round(files["rows"] / seconds) if seconds else None,
+        "mb_per_second": round(input_mb / seconds, 2) if seconds else None,
+    })
+    del ctx
+
+    if measure_memory:
+        ctx = setup(files) if setup else {}
+        tracemalloc.start()
+        try:
+            stage(files, ctx)
+            result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def find_regressions(results, baseline, tolerance):
+    """Stages that got slower or used more memory than the baseline by more than ``tolerance``"""
+    previous = {(r["stage"], r["rows"]): r for r in baseline if "skipped" not in r}
+    regressions = []
+    for result in results:
+        before = previous.get((result["stage"], result["rows"]))
+        if not before or "skipped" in result:
+            continue
+        if before.get("rows_per_second") and result["rows_per_second"] < before["rows_per_second"] * (1 - tolerance):
+            regressions.append(f"{result['stage']} @ {result['rows']} rows: {result['rows_per_second']} rows/s "
+                               f"vs {before['rows_per_second']} before")
+        if before.get("peak_mb") and result.get("peak_mb", 0) > before["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{result['stage']} @ {result['rows']} rows: peak {result['peak_mb']} MB "
+                               f"vs {before['peak_mb']} MB before")
+    return regressions
+
+
+def format_results(results):
+    lines = [f"{'stage':<14} {'rows':>10} {'seconds':>9} {'rows/s':>11} {'MB/s':>8} {'peak MB':>9}"]
+    for r in results:
+        if "skipped" in r:
+            lines.append(f"{r['stage']:<14} {r['rows']:>10} skipped ({r['skipped']})")
+            continue
+        peak = f"{r['peak_mb']:>9.1f}" if "peak_mb" in r else f"{'-':>9}"
+        lines.append(f"{r['stage']:<14} {r['rows']:>10} {r['seconds']:>9.3f} {r['rows_per_second']:>11,} "
+                     f"{r['mb_per_second']:>8.1f} {peak}")
+    return "\n".join(lines)
+
+
+def parse_sizes(text):
+    sizes = []
+    for value in text.lower().split(","):
+        value = value.strip()
+        if not value:
+            continue
+        factor = {"k": 1_000, "m": 1_000_000}.get(value[-1], 1)
+        sizes.append(int(float(value.rstrip("km")) * factor))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the data-handling stages on synthetic OrderStatus data")
+    parser.add_argument("--sizes", type=parse_sizes, default=[100_000, 1_000_000], help="rows, e.g. 100k,1m,5m")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of: " + ", ".join(STAGES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass (halves the run time)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / memory growth (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    stages = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    results = []
+    for rows in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="veracore_bench_data_") as work_dir:
+            print(f"Generating {rows} synthetic rows...", flush=True)
+            files = prepare_files(rows, work_dir, args.seed)
+            for name in stages:
+                result = run_stage(name, files, measure_memory=not args.no_memory)
+                results.append(result)
+                status = result.get("skipped") or f"{result['seconds']:.3f}s"
+                print(f"  {name}: {status}", flush=True)
+
+    print()
+    print(format_results(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = find_regressions(results, json.load(f)["results"], args.tolerance)
+        if regressions:
+            print("\nRegressions against " + args.baseline + ":")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,121 @@
+import csv
+import logging
+import os
+
+from report_output import FLAG_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+STATUS_COLUMN = "Order Status All"
+
+# Columns compared between two extracts of the same order
+COMPARED_COLUMNS = [STATUS_COLUMN] + FLAG_COLUMNS
+
+# Kinds of change, most specific first: a canceled or completed order is also a status transition
+CHANGE_NEW = "new"
+CHANGE_COMPLETED = "completed"
+CHANGE_CANCELED = "canceled"
+CHANGE_TRANSITION = "transition"
+CHANGE_REMOVED = "removed"
+
+CHANGE_FIELDS = ["change", "Order ID", "previous_status", "status", "changed_fields"]
+
+
+def _compared(header, key):
+    if key not in header:
+        raise ValueError(f"Column {key!r} not found in the extract")
+    return [col for col in COMPARED_COLUMNS if col in header]
+
+
+def index_extract(csv_path, key="Order ID"):
+    """Hash index of an extract: key -> tuple of the compared column values (the only columns kept in memory)"""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        columns = _compared(header, key)
+        key_pos = header.index(key)
+        positions = [header.index(col) for col in columns]
+        index = {}
+        for row in reader:
+            if len(row) <= key_pos:
+                continue
+            index[row[key_pos]] = tuple(row[pos].strip() if pos < len(row) else "" for pos in positions)
+    return columns, index
+
+
+def _classify(columns, before, after):
+    changed = [(col, old, new) for col, old, new in zip(columns, before, after) if old != new]
+    if not changed:
+        return None, changed
+    flips = {col: new for col, old, new in changed}
+    if flips.get("Canceled Order Flag") == "1":
+        return CHANGE_CANCELED, changed
+    if flips.get("Complete Order Flag") == "1":
+        return CHANGE_COMPLETED, changed
+    return CHANGE_TRANSITION, changed
+
+
+def iter_changes(previous_csv, current_csv, key="Order ID"):
+    """Yield one change record per order that is new, changed or removed between two extracts.
+
+    The previous extract is loaded into a dict keyed on ``key`` and the
+    current one is streamed against it, so memory holds one small tuple per
+    previous order. When an order appears more than once in an extract its
+    last row wins, as in the snapshot store; for the current extract that
+    takes one extra pass to find each order's last row.
+    """
+    previous_columns, previous = index_extract(previous_csv, key)
+    with open(current_csv, newline="", encoding="utf-8") as f:
+        last_row = {}
+        for index, row in enumerate(csv.DictReader(f)):
+            if row.get(key) is not None:
+                last_row[row[key]] = index
+        f.seek(0)
+        reader = csv.DictReader(f)
+        columns = [col for col in _compared(reader.fieldnames or [], key) if col in previous_columns]
+        previous_positions = [previous_columns.index(col) for col in columns]
+        status_pos = previous_columns.index(STATUS_COLUMN) if STATUS_COLUMN in previous_columns else None
+
+        for index, row in enumerate(reader):
+            order_id = row.get(key)
+            if order_id is None or last_row[order_id] != index:
+                continue
+            status = (row.get(STATUS_COLUMN) or "").strip()
+            before = previous.pop(order_id, None)
+            if before is None:
+                yield {"change": CHANGE_NEW, "Order ID": order_id, "previous_status": "", "status": status,
+                       "changed_fields": ""}
+                continue
+            after = tuple((row.get(col) or "").strip() for col in columns)
+            change, changed = _classify(columns, tuple(before[pos] for pos in previous_positions), after)
+            if change:
+                yield {
+                    "change": change,
+                    "Order ID": order_id,
+                    "previous_status": before[status_pos] if status_pos is not None else "",
+                    "status": status,
+                    "changed_fields": "; ".join(f"{col} {old}->{new}" for col, old, new in changed),
+                }
+
+    for order_id, before in previous.items():
+        yield {
+            "change": CHANGE_REMOVED,
+            "Order ID": order_id,
+            "previous_status": before[status_pos] if status_pos is not None else "",
+            "status": "",
+            "changed_fields": "",
+        }
+
+
+def write_change_feed(previous_csv, current_csv, output_path, key="Order ID"):
+    """Write the changes between two extracts to output_path and return the count per kind of change"""
+    counts = {}
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CHANGE_FIELDS)
+        writer.writeheader()
+        for change in iter_changes(previous_csv, current_csv, key):
+            writer.writerow(change)
+            counts[change["change"]] = counts.get(change["change"], 0) + 1
+    summary = ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items())) or "no changes"
+    logger.info(f"Change feed {os.path.basename(output_path)}: {summary}")
+    return counts
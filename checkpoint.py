@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+# A report task has been queued on VeraCore (task_id is known)
+STAGE_QUEUED = "queued"
+
+# The report CSV is on disk and ready to upload (output_path, rows)
+STAGE_PREPARED = "prepared"
+
+# VeraCore keeps finished report results for a limited time, so older checkpoints are not resumed
+DEFAULT_MAX_AGE = timedelta(hours=12)
+
+
+def request_signature(report_name, filters, partition=None):
+    """Short hash of everything that decides a report's content, so a checkpoint only resumes the same request"""
+    payload = json.dumps([report_name, filters, partition], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """Progress of unfinished report runs, kept in a local JSON file.
+
+    Each report has at most one entry: the request signature, the stage it
+    reached, the VeraCore task id, where the downloaded CSV was saved and
+    which SharePoint uploads already went through. The entry is removed
+    once the report completes, so anything left behind is resumable work.
+    """
+
+    def __init__(self, path, max_age=DEFAULT_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write(self, state):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, report_name, signature):
+        """The report's checkpoint for this exact request, or None if there is none or it is too old"""
+        with self._lock:
+            entry = self._read().get(report_name)
+        if not entry or entry.get("signature") != signature:
+            return None
+        if datetime.now() - datetime.fromisoformat(entry["started_at"]) > self.max_age:
+            return None
+        return entry
+
+    def update(self, report_name, signature, **fields):
+        """Merge fields into the report's checkpoint (a different request starts a new one)"""
+        with self._lock:
+            state = self._read()
+            entry = state.get(report_name)
+            now = datetime.now().isoformat(timespec="seconds")
+            if not entry or entry.get("signature") != signature:
+                entry = {"signature": signature, "started_at": now, "uploaded": []}
+            entry.update(fields)
+            entry["updated_at"] = now
+            state[report_name] = entry
+            self._write(state)
+            return entry
+
+    def mark_uploaded(self, report_name, sharepoint_name):
+        with self._lock:
+            state = self._read()
+            entry = state.get(report_name)
+            if entry is None:
+                return
+            if sharepoint_name not in entry["uploaded"]:
+                entry["uploaded"].append(sharepoint_name)
+            entry["updated_at"] = datetime.now().isoformat(timespec="seconds")
+            self._write(state)
+
+    def clear(self, report_name):
+        with self._lock:
+            state = self._read()
+            if state.pop(report_name, None) is not None:
+                self._write(state)
@@ -3,6 +3,8 @@ from office365.sharepoint.client_context import ClientContext
 from office365.runtime.auth.client_credential import ClientCredential
 from dotenv import load_dotenv
 
+from sharepoint_session import SharePointSession
+
 load_dotenv()
 
 SHAREPOINT_URL = os.getenv("SHAREPOINT_URL")
@@ -88,30 +90,19 @@ def test_permissions():
     except Exception as e:
         print(f"   ✗ Cannot list files: {e}")
     
-    # Test 7: Try to get items from the library directly
-    print("\n7. Testing direct library item query...")
+    # Test 7: Query the library for the folder's items (CAML, filtered and paged on the server)
+    print("\n7. Testing folder-scoped library query...")
     try:
-        doc_lib = ctx.web.lists.get_by_title("Documents")
-        
-        # Try to get all items (limited)
-        items = doc_lib.items.top(5000)
-        ctx.load(items)
-        ctx.execute_query()
-        
-        print(f"   ✓ Retrieved {len(items)} items from library")
-        
-        # Filter for items in our folder
-        folder_items = [
-            item for item in items 
-            if '/InventoryHealthDashboard' in str(item.properties.get('FileRef', ''))
-        ]
+        folder_url = "/Shared Documents/InventoryHealthDashboard"
+        session = SharePointSession(SHAREPOINT_URL, SHAREPOINT_CLIENT_ID, SHAREPOINT_CLIENT_SECRET, folder_url)
+        folder_items = session.list_folder_items(folder_url)
         
         print(f"   Items in InventoryHealthDashboard: {len(folder_items)}")
         
         if len(folder_items) > 0:
             print(f"\n   📄 Files found via library query:")
             for item in folder_items[:10]:  # Show first 10
-                print(f"      - {item.properties.get('FileLeafRef')} at {item.properties.get('FileRef')}")
+                print(f"      - {item['Name']} at {item['ServerRelativeUrl']}")
         
     except Exception as e:
         print(f"   ✗ Library query failed: {e}")
@@ -0,0 +1,798 @@
+"""Local stand-ins for the VeraCore Public API and the SharePoint operations the pipeline uses.
+
+FakeServiceServer runs both on one local ThreadingHTTPServer so the pipeline
+(and benchmark.py) can be exercised end to end without production services:
+
+    python fake_services.py --port 8765 --rows 20000 --delay 3
+
+then run reports.py with VERACORE_BASE_URL=http://127.0.0.1:8765/api.
+That variable redirects VeraCore only; SharePoint stays at SHAREPOINT_URL.
+To use the fake SharePoint, set reports.sharepoint to a FakeSharePointSession
+for server.sharepoint_url (as benchmark.py does). It runs the real
+SharePointSession and office365 client code, with a static bearer token
+instead of the app credentials, against the /sharepoint endpoints.
+"""
+import argparse
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email import message_from_bytes
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+
+from report_partition import parse_date
+from sharepoint_session import SharePointSession
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "Queued"
+STATUS_PROCESSING = "Processing"
+STATUS_DONE = "Done"
+STATUS_TOO_LARGE = "Request too Large"
+
+# Rows serialized per write when streaming a report body
+STREAM_BATCH_ROWS = 500
+
+# Server-relative URL of the fake SharePoint site; its document library is "<site>/Shared Documents"
+FAKE_SITE_URL = "/sites/Fake"
+
+# SP.CamlQuery properties GetItems accepts; like SharePoint, the fake rejects any other property
+CAML_QUERY_PROPERTIES = {
+    "__metadata", "DatesInUtc", "FolderServerRelativeUrl", "AllowIncrementalResults", "ViewXml",
+    "ListItemCollectionPosition",
+}
+
+CARRIERS = ["UPS Ground", "UPS Next Day Air", "FedEx Ground", "FedEx 2Day", "USPS Priority", "LTL"]
+ORDER_STATUSES = ["Unprocessed", "Pending", "Backordered", "Shipped", "Complete", "Canceled"]
+FLAG_BY_STATUS = {
+    "Unprocessed": "Unprocessed Order Flag",
+    "Pending": "Pending Order Flag",
+    "Backordered": "Backordered Order Flag",
+    "Shipped": "Shipped Order Flag",
+    "Complete": "Complete Order Flag",
+    "Canceled": "Canceled Order Flag",
+}
+
+
+class FakeReport:
+    """A report whose rows are generated on demand, spread evenly over [start, end)"""
+
+    def __init__(self, name, rows, start="2024-01-01", end="2025-01-01", description=None):
+        self.name = name
+        self.rows = rows
+        self.start = datetime.combine(parse_date(start), datetime.min.time())
+        self.end = datetime.combine(parse_date(end), datetime.min.time())
+        self.description = description or f"Synthetic {name} report"
+        self._step = (self.end - self.start) / max(rows, 1)
+
+    def order_date(self, index):
+        return self.start + self._step * index
+
+    def index_range(self, filters):
+        """Indices of the rows matching the report filters (only "Order Date" Between is applied)"""
+        low, high = 0, self.rows
+        for f in filters or []:
+            if f.get("FilterName") != "Order Date" or f.get("Operator") != "Between":
+                continue
+            first, last = (parse_date(value) for value in f["Values"])
+            first = datetime.combine(first, datetime.min.time())
+            after_last = datetime.combine(last, datetime.min.time()) + timedelta(days=1)
+            dates = _DateIndex(self)
+            low = max(low, bisect.bisect_left(dates, first))
+            high = min(high, bisect.bisect_left(dates, after_last))
+        return range(low, max(low, high))
+
+    def row(self, index):
+        order_date = self.order_date(index)
+        status = ORDER_STATUSES[index % len(ORDER_STATUSES)]
+        row = {
+            "Order ID": f"{self.name[:3].upper()}{index:08d}",
+            "Order Date": order_date.strftime("%m/%d/%Y %H:%M:%S"),
+            "Date Needed By": (order_date + timedelta(days=5)).strftime("%m/%d/%Y"),
+            "Date Completed": (order_date + timedelta(days=2)).strftime("%m/%d/%Y %H:%M:%S")
+            if status in ("Shipped", "Complete") else "",
+            "Order Status All": status,
+            "Order Ship To Requested Freight Carrier": CARRIERS[index % len(CARRIERS)],
+            "Total # of Product Lines Ordered": str(1 + index % 7),
+            "Total # of Product Units Ordered": str(1 + (index * 13) % 250),
+            "Rush Order": "1" if index % 17 == 0 else "0",
+        }
+        for order_status, flag in FLAG_BY_STATUS.items():
+            row[flag] = "1" if order_status == status else "0"
+        return row
+
+
+class _DateIndex:
+    """Sequence view of a report's order dates so bisect can search them without building a list"""
+
+    def __init__(self, report):
+        self.report = report
+
+    def __len__(self):
+        return self.report.rows
+
+    def __getitem__(self, index):
+        return self.report.order_date(index)
+
+
+class FakeVeraCore:
+    """In-memory VeraCore Public API: login, report catalog, report tasks and report data.
+
+    ``processing_delay`` is how long a task stays in progress, ``max_rows``
+    makes tasks matching more rows finish as "Request too Large" and
+    ``latency`` is added to every request to stand in for the network.
+    With ``throttle_every`` set, every n-th request is answered with 429 and
+    ``unavailable`` makes every request fail with 503, to exercise throttling
+    and circuit breaking.
+    """
+
+    def __init__(self, reports=(), processing_delay=1.0, max_rows=None, latency=0.0,
+                 username=None, password=None, throttle_every=0):
+        self.reports = {report.name: report for report in reports}
+        self.processing_delay = processing_delay
+        self.max_rows = max_rows
+        self.latency = latency
+        self.username = username
+        self.password = password
+        self.throttle_every = throttle_every
+        self.unavailable = False
+        self.tokens = set()
+        self.tasks = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+        self._task_ids = itertools.count(1)
+
+    def add_report(self, report):
+        self.reports[report.name] = report
+        return report
+
+    def reset(self):
+        with self._lock:
+            self.tokens.clear()
+            self.tasks.clear()
+            self.counts.clear()
+
+    def handle(self, method, path, query, headers, body):
+        """Return (status code, JSON payload or iterator of bytes)"""
+        if self.latency:
+            time.sleep(self.latency)
+        parts = [p for p in path.split("/") if p]
+        route = f"{method} /{'/'.join('{id}' if p.isdigit() else p for p in parts)}"
+        with self._lock:
+            self.counts[route] = self.counts.get(route, 0) + 1
+            seen = sum(self.counts.values())
+
+        if self.unavailable:
+            return 503, {"Message": "Service Unavailable"}
+        if self.throttle_every and seen % self.throttle_every == 0:
+            with self._lock:
+                self.counts["429"] = self.counts.get("429", 0) + 1
+            return 429, {"Message": "Too Many Requests"}
+        if parts == ["Login"] and method == "POST":
+            return self._login(body, headers)
+        if not self._authorized(headers):
+            return 401, {"Message": "Authorization has been denied for this request."}
+        if parts == ["reports"] and method == "GET":
+            return self._catalog(headers)
+        if parts == ["reports"] and method == "POST":
+            return self._start_task(json.loads(body or b"{}"))
+        if len(parts) == 3 and parts[0] == "reports" and parts[2] == "status" and method == "GET":
+            return self._status(parts[1])
+        if len(parts) == 2 and parts[0] == "reports" and method == "GET":
+            return self._data(parts[1])
+        return 404, {"Message": f"No route for {method} /{path}"}
+
+    def _login(self, body, headers):
+        if "json" in headers.get("Content-Type", ""):
+            form = json.loads(body or b"{}")
+        else:
+            form = {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+        if self.username and (form.get("userName") != self.username or form.get("password") != self.password):
+            return 401, {"Message": "Invalid credentials"}
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.tokens.add(token)
+        return 200, {"Token": token}
+
+    def _authorized(self, headers):
+        auth = headers.get("Authorization") or ""
+        return auth.split(" ", 1)[-1] in self.tokens
+
+    def _catalog(self, headers):
+        catalog = [{"ReportName": r.name, "Description": r.description} for r in self.reports.values()]
+        etag = '"%s"' % hashlib.sha1(json.dumps(catalog).encode("utf-8")).hexdigest()[:16]
+        if headers.get("If-None-Match") == etag:
+            return 304, None, {"ETag": etag}
+        return 200, catalog, {"ETag": etag}
+
+    def _start_task(self, payload):
+        report = self.reports.get(payload.get("reportName"))
+        if report is None:
+            return 400, {"Message": f"Report {payload.get('reportName')} not found"}
+        rows = report.index_range(payload.get("filters"))
+        with self._lock:
+            task_id = str(next(self._task_ids))
+            self.tasks[task_id] = {
+                "report": report,
+                "rows": rows,
+                "ready_at": time.monotonic() + self.processing_delay,
+                "too_large": self.max_rows is not None and len(rows) > self.max_rows,
+            }
+        return 200, {"TaskId": task_id}
+
+    def _status(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return 404, {"Message": f"Task {task_id} not found"}
+        remaining = task["ready_at"] - time.monotonic()
+        if remaining > self.processing_delay / 2:
+            return 200, {"Status": STATUS_QUEUED}
+        if remaining > 0:
+            return 200, {"Status": STATUS_PROCESSING}
+        return 200, {"Status": STATUS_TOO_LARGE if task["too_large"] else STATUS_DONE}
+
+    def _data(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return 404, {"Message": f"Task {task_id} not found"}
+        if task["too_large"] or task["ready_at"] > time.monotonic():
+            return 400, {"Message": f"Task {task_id} is not complete"}
+        return 200, self._stream_rows(task["report"], task["rows"])
+
+    def _stream_rows(self, report, indices):
+        yield b'{"Data":['
+        for batch_start in range(0, len(indices), STREAM_BATCH_ROWS):
+            batch = indices[batch_start:batch_start + STREAM_BATCH_ROWS]
+            text = ",".join(json.dumps(report.row(i)) for i in batch)
+            yield (("," if batch_start else "") + text).encode("utf-8")
+        yield b"]}"
+
+
+class FakeSharePoint:
+    """In-memory document library behind the SharePoint REST endpoints the office365 client calls.
+
+    Enough of /_api/ is served for the real SharePointSession to run against
+    it: form digest, folder lookup and creation, file listing, CAML GetItems
+    with PagingInfo, whole-file and upload-session uploads, moveto and
+    $batch. Requests are counted per operation in ``counts``.
+    """
+
+    def __init__(self, latency=0.0, site_url=FAKE_SITE_URL, list_title="Documents"):
+        self.latency = latency
+        self.site_url = site_url
+        self.library_url = f"{site_url}/Shared Documents"
+        self.list_title = list_title
+        self.files = {}
+        self.folders = set()
+        self.uploads = {}
+        self.counts = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def default_folder_url(self):
+        return f"{self.library_url}/Reports"
+
+    def reset(self):
+        with self._lock:
+            self.files.clear()
+            self.folders.clear()
+            self.folders.update((self.library_url, self.default_folder_url))
+            self.uploads.clear()
+            self.counts.clear()
+
+    def add_file(self, url, content=b""):
+        """Put a file straight into the library (test setup); its folder is created if needed"""
+        with self._lock:
+            self.folders.add(url.rsplit("/", 1)[0])
+            self._store(url, content)
+
+    def handle(self, method, path, query, headers, body):
+        if self.latency:
+            time.sleep(self.latency)
+        if not str(headers.get("Authorization", "")).startswith("Bearer "):
+            return _sp_error(401, "Access denied.", "-2147024891, System.UnauthorizedAccessException")
+        path = unquote(path)
+        if "/_api/" not in f"/{path}":
+            return _sp_error(404, f"No route for {method} /{path}")
+        api_path = f"/{path}".split("/_api/", 1)[1]
+        if api_path.lower() == "$batch":
+            self._count("POST $batch")
+            return self._batch(headers.get("Content-Type", ""), body)
+        with self._lock:
+            return self._call(method, api_path, query, headers, body)
+
+    def _count(self, route):
+        self.counts[route] = self.counts.get(route, 0) + 1
+
+    def _call(self, method, api_path, query, headers, body):
+        segments = _odata_segments(api_path)
+        self._count(f"{method} {segments[-1][0]}")
+        if method == "POST" and api_path.lower() != "contextinfo" and not headers.get("X-RequestDigest"):
+            return _sp_error(403, "The security validation for this page is invalid.")
+        try:
+            return self._resolve(method, segments, query, body)
+        except _SharePointError as e:
+            return _sp_error(e.status, e.message)
+
+    def _resolve(self, method, segments, query, body):
+        node = None
+        for name, args in segments:
+            name = name.lower()
+            kind = node[0] if node else None
+            if node is None and name == "contextinfo":
+                return 200, {"d": {"GetContextWebInformation": {
+                    "FormDigestValue": f"0x{uuid.uuid4().hex.upper()},{datetime.now(timezone.utc):%d %b %Y %H:%M:%S} -0000",
+                    "FormDigestTimeoutSeconds": 1800,
+                    "WebFullUrl": self.site_url,
+                    "SiteFullUrl": self.site_url,
+                }}}
+            if node is None and name == "web":
+                node = ("web",)
+            elif kind == "web" and name == "getfolderbyserverrelativeurl":
+                node = ("folder", self._server_relative(args[0]).rstrip("/"))
+            elif kind == "web" and name == "getfilebyserverrelativeurl":
+                node = ("file", self._server_relative(args[0]))
+            elif kind == "web" and name == "folders":
+                node = ("folders", None)
+            elif kind == "web" and name == "lists":
+                node = ("lists",)
+            elif kind == "lists" and name == "getbytitle":
+                if args[0] != self.list_title:
+                    raise _SharePointError(404, f"List '{args[0]}' does not exist at site with URL '{self.site_url}'.")
+                node = ("list",)
+            elif kind == "list" and name == "getitems" and method == "POST":
+                return 200, {"d": {"results": self._get_items(json.loads(body or b"{}"), query)}}
+            elif kind == "folder" and name in ("files", "folders"):
+                self._require_folder(node[1])
+                node = (name, node[1])
+            elif kind == "files" and name == "getbyurl":
+                node = ("file", args[0] if args[0].startswith("/") else f"{node[1]}/{args[0]}")
+            elif kind == "files" and name == "add" and method == "POST":
+                url = args["url"] if args["url"].startswith("/") else f"{node[1]}/{args['url']}"
+                if url in self.files and not args.get("overwrite"):
+                    raise _SharePointError(400, f"A file with the name {url} already exists.")
+                self._store(url, body)
+                return 200, {"d": self._file_json(url)}
+            elif kind == "file" and name in ("startupload", "continueupload", "finishupload") and method == "POST":
+                return self._upload_chunk(node[1], name, args, body)
+            elif kind == "file" and name == "moveto" and method == "POST":
+                self._move(node[1], args["newurl"], args.get("flags", 0))
+                return 200, {"d": {"MoveTo": None}}
+            else:
+                raise _SharePointError(400, f"Unsupported request {method} {name} on {kind or 'the service root'}")
+
+        if method == "POST" and node[0] == "folders":
+            return 201, {"d": self._add_folder(node[1], json.loads(body)["ServerRelativeUrl"])}
+        if method != "GET":
+            raise _SharePointError(400, f"Unsupported request {method} on {node[0]}")
+        if node[0] == "folder":
+            return 200, {"d": self._folder_json(self._require_folder(node[1]))}
+        if node[0] == "file":
+            return 200, {"d": self._file_json(self._require_file(node[1]))}
+        if node[0] == "files":
+            select = _select(query)
+            results = [
+                {key: value for key, value in self._file_json(url).items() if not select or key in select or key == "__metadata"}
+                for url in sorted(self.files) if url.rsplit("/", 1)[0] == node[1]
+            ]
+            return 200, {"d": {"results": results}}
+        raise _SharePointError(400, f"Unsupported request GET on {node[0]}")
+
+    def _server_relative(self, url):
+        # Like SharePoint, URLs without a leading slash are relative to the site
+        return url if url.startswith("/") else f"{self.site_url}/{url}"
+
+    def _require_folder(self, url):
+        if url not in self.folders:
+            raise _SharePointError(404, "File Not Found.")
+        return url
+
+    def _require_file(self, url):
+        if url not in self.files:
+            raise _SharePointError(404, "File Not Found.")
+        return url
+
+    def _folder_json(self, url):
+        return {
+            "__metadata": {"type": "SP.Folder"},
+            "Name": url.rsplit("/", 1)[-1],
+            "ServerRelativeUrl": url,
+            "Exists": True,
+            "ItemCount": sum(1 for f in self.files if f.rsplit("/", 1)[0] == url),
+        }
+
+    def _file_json(self, url):
+        entry = self.files[url]
+        return {
+            "__metadata": {"type": "SP.File"},
+            "Name": url.rsplit("/", 1)[-1],
+            "ServerRelativeUrl": url,
+            "Length": str(len(entry["content"])),
+            "TimeLastModified": entry["modified"],
+            "Exists": True,
+        }
+
+    def _add_folder(self, parent_url, url):
+        if not url.startswith("/"):
+            url = f"{parent_url or self.site_url}/{url}"
+        url = url.rstrip("/")
+        self._require_folder(url.rsplit("/", 1)[0])
+        self.folders.add(url)
+        return self._folder_json(url)
+
+    def _store(self, url, content):
+        self._require_folder(url.rsplit("/", 1)[0])
+        previous = self.files.get(url)
+        if previous is None:
+            item_id = self._next_id
+            self._next_id += 1
+        else:
+            item_id = previous["id"]
+        self.files[url] = {
+            "id": item_id,
+            "content": bytes(content),
+            "modified": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+
+    def _upload_chunk(self, url, operation, args, body):
+        self._require_file(url)
+        upload_id = args["uploadID"]
+        if operation == "startupload":
+            self.uploads[upload_id] = {"url": url, "content": bytearray(body)}
+            return 200, {"d": {"StartUpload": str(len(body))}}
+        session = self.uploads.get(upload_id)
+        if session is None or session["url"] != url:
+            raise _SharePointError(400, f"The upload session {upload_id} was not found.")
+        if int(args["fileOffset"]) != len(session["content"]):
+            raise _SharePointError(400, f"The file offset {args['fileOffset']} does not match "
+                                        f"the uploaded length {len(session['content'])}.")
+        session["content"].extend(body)
+        if operation == "continueupload":
+            return 200, {"d": {"ContinueUpload": str(len(session["content"]))}}
+        self._store(url, self.uploads.pop(upload_id)["content"])
+        return 200, {"d": self._file_json(url)}
+
+    def _move(self, source_url, destination_url, flags):
+        self._require_file(source_url)
+        self._require_folder(destination_url.rsplit("/", 1)[0])
+        if destination_url in self.files and not int(flags) & 1:
+            raise _SharePointError(400, f"A file with the name {destination_url} already exists.")
+        self.files[destination_url] = self.files.pop(source_url)
+
+    def _get_items(self, payload, query):
+        """Files of one folder for a CAML query: FilesOnly scope, File_x0020_Type filter, ID order, PagingInfo.
+
+        The payload is checked against SharePoint's rules, not the client's
+        exact output: unknown properties and wrong type names are rejected,
+        while ``__metadata`` on nested values may be left out, so any shape
+        SharePoint accepts works here too.
+        """
+        caml = payload.get("query")
+        if not isinstance(caml, dict) or set(caml) - CAML_QUERY_PROPERTIES:
+            raise _SharePointError(400, f"Invalid CAML query parameter: {payload}")
+        position = caml.get("ListItemCollectionPosition")
+        after = 0
+        if position is not None:
+            if not isinstance(position, dict) or set(position) - {"__metadata", "PagingInfo"}:
+                raise _SharePointError(400, f"Invalid ListItemCollectionPosition: {position}")
+            if "__metadata" in position and (position["__metadata"] or {}).get("type") != "SP.ListItemCollectionPosition":
+                raise _SharePointError(400, f"Invalid ListItemCollectionPosition type: {position.get('__metadata')}")
+            paging = parse_qs(position.get("PagingInfo") or "")
+            after = int(paging.get("p_ID", ["0"])[0])
+
+        view = ElementTree.fromstring(caml.get("ViewXml") or "<View />")
+        if view.get("Scope") not in (None, "FilesOnly"):
+            raise _SharePointError(400, f"Unsupported view scope {view.get('Scope')}")
+        extensions = {value.text.lower() for value in view.iter("Value")}
+        row_limit = int(view.findtext("RowLimit") or 100)
+        folder_url = (caml.get("FolderServerRelativeUrl") or self.library_url).rstrip("/")
+        if not folder_url.startswith(self.library_url):
+            raise _SharePointError(400, f"{folder_url} is not in the list {self.list_title}")
+
+        select = _select(query)
+        items = sorted(
+            (entry["id"], url, entry) for url, entry in self.files.items()
+            if url.rsplit("/", 1)[0] == folder_url and entry["id"] > after
+            and (not extensions or url.rsplit(".", 1)[-1].lower() in extensions)
+        )
+        results = []
+        for item_id, url, entry in items[:row_limit]:
+            fields = {
+                "ID": item_id,
+                "Id": item_id,
+                "FileLeafRef": url.rsplit("/", 1)[-1],
+                "FileRef": url,
+                "File_x0020_Size": str(len(entry["content"])),
+                "Modified": entry["modified"],
+            }
+            item = {key: value for key, value in fields.items() if not select or key in select or key == "Id"}
+            results.append(dict(item, __metadata={"type": "SP.Data.Shared_x0020_DocumentsItem"}))
+        return results
+
+    def _batch(self, content_type, body):
+        """Run the parts of a multipart $batch request and answer with one part per request"""
+        message = message_from_bytes(f"Content-Type: {content_type}\r\n\r\n".encode("ascii") + body)
+        parts = []
+        for part in message.walk():
+            if part.get_content_type() != "application/http":
+                continue
+            request_text = part.get_payload(decode=True).decode("utf-8").replace("\r\n", "\n")
+            head, _, part_body = request_text.strip().partition("\n\n")
+            request_line, *header_lines = head.split("\n")
+            method, url = request_line.split(" ", 1)
+            url = url.rsplit(" HTTP/", 1)[0]
+            part_headers = dict(line.split(":", 1) for line in header_lines if ":" in line)
+            part_headers["X-RequestDigest"] = "batch"
+            split = urlsplit(url)
+            api_path = unquote(split.path).split("/_api/", 1)[1]
+            with self._lock:
+                status, payload = self._call(method, api_path, parse_qs(split.query), part_headers,
+                                             part_body.strip().encode("utf-8"))
+            parts.append((status, payload))
+
+        boundary = f"batchresponse_{uuid.uuid4()}"
+        lines = []
+        for status, payload in parts:
+            lines += [f"--{boundary}", "Content-Type: application/http", "Content-Transfer-Encoding: binary", ""]
+            if payload is None:
+                lines += [f"HTTP/1.1 {status} No Content", "", ""]
+            else:
+                lines += [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+                          "Content-Type: application/json;odata=verbose;charset=utf-8", "", json.dumps(payload)]
+        lines += [f"--{boundary}--", ""]
+        return 200, "\r\n".join(lines).encode("utf-8"), {"Content-Type": f"multipart/mixed; boundary={boundary}"}
+
+
+class _SharePointError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _sp_error(status, message, code="-2130575338, Microsoft.SharePoint.SPException"):
+    return status, {"error": {"code": code, "message": {"lang": "en-US", "value": message}}}
+
+
+def _select(query):
+    return {field for value in query.get("$select", []) for field in value.split(",") if field}
+
+
+def _odata_segments(path):
+    """Split an OData resource path into (name, arguments) pairs.
+
+    getFolderByServerRelativeUrl('/a/b')/Files/add(url='c.csv',overwrite=true)
+    gives [("getFolderByServerRelativeUrl", ["/a/b"]), ("Files", None),
+    ("add", {"url": "c.csv", "overwrite": True})]; slashes and parentheses
+    inside quoted arguments do not split.
+    """
+    segments = []
+    name, args, quoted, in_args = "", None, False, False
+    for char in path + "/":
+        if in_args:
+            if char == "'":
+                quoted = not quoted
+            if char == ")" and not quoted:
+                in_args = False
+                continue
+            args += char
+        elif char == "(":
+            in_args, args = True, ""
+        elif char == "/":
+            if name:
+                segments.append((name, None if args is None else _odata_arguments(args)))
+            name, args = "", None
+        else:
+            name += char
+    return segments
+
+
+def _odata_arguments(text):
+    if not text:
+        return []
+    values = []
+    current, quoted = "", False
+    for char in text + ",":
+        if char == "'":
+            quoted = not quoted
+        if char == "," and not quoted:
+            values.append(current)
+            current = ""
+        else:
+            current += char
+
+    def value_of(raw):
+        raw = raw.strip()
+        if raw.startswith("'") and raw.endswith("'"):
+            return raw[1:-1].replace("''", "'")
+        if raw in ("true", "false"):
+            return raw == "true"
+        return int(raw) if raw.lstrip("-").isdigit() else raw
+
+    if all("=" in value.split("'", 1)[0] for value in values):
+        return {key.strip(): value_of(raw) for key, raw in (value.split("=", 1) for value in values)}
+    return [value_of(value) for value in values]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def _dispatch(self, method):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        query = parse_qs(url.query)
+        try:
+            # Handlers return (status, payload) or (status, payload, extra headers)
+            if url.path.startswith("/api/"):
+                result = self.server.veracore.handle(method, url.path[5:], query, self.headers, body)
+            elif url.path.startswith("/sharepoint/"):
+                result = self.server.sharepoint.handle(method, url.path[12:], query, self.headers, body)
+            else:
+                result = 404, {"Message": "Not found"}
+        except Exception as e:
+            logger.exception("Fake service error")
+            result = 500, {"Message": str(e)}
+        status, payload = result[:2]
+        extra_headers = result[2] if len(result) > 2 else {}
+
+        if payload is None:
+            self.send_response(status)
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        if isinstance(payload, bytes):
+            self.send_response(status)
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        if isinstance(payload, (dict, list)):
+            content = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            for name, value in extra_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(content)
+            return
+
+        # Report bodies are generated while they are sent, as VeraCore streams large reports
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for piece in payload:
+            self.wfile.write(f"{len(piece):X}\r\n".encode("ascii") + piece + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections at shutdown is expected, not an error
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class FakeServiceServer:
+    """Serve a FakeVeraCore under /api and a FakeSharePoint under /sharepoint on a background thread"""
+
+    def __init__(self, veracore=None, sharepoint=None, host="127.0.0.1", port=0):
+        self.veracore = veracore or FakeVeraCore()
+        self.sharepoint = sharepoint or FakeSharePoint()
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.veracore = self.veracore
+        self.httpd.sharepoint = self.sharepoint
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def veracore_url(self):
+        return f"{self.url}/api"
+
+    @property
+    def sharepoint_url(self):
+        """Site URL for a ClientContext (SHAREPOINT_URL)"""
+        return f"{self.url}/sharepoint{self.sharepoint.site_url}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-services", daemon=True)
+        self._thread.start()
+        logger.info(f"Fake VeraCore/SharePoint listening on {self.url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class FakeSharePointSession(SharePointSession):
+    """SharePointSession whose ClientContext talks to a FakeSharePoint instead of SharePoint Online.
+
+    Only authentication differs (a static bearer token instead of the app
+    credentials), so folder lookups, listings, uploads and batched moves run
+    the real SharePointSession and office365 client code.
+    """
+
+    def __init__(self, site_url, folder_url=None, **kwargs):
+        super().__init__(site_url, "fake-client", "fake-secret", folder_url or f"{FAKE_SITE_URL}/Shared Documents/Reports",
+                         **kwargs)
+
+    @property
+    def ctx(self):
+        with self.lock:
+            if self._ctx is None:
+                from office365.runtime.auth.token_response import TokenResponse
+                from office365.sharepoint.client_context import ClientContext
+
+                token = TokenResponse(accessToken="fake-token", tokenType="Bearer")
+                self._ctx = ClientContext(self.site_url).with_access_token(lambda: token)
+            return self._ctx
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the local VeraCore/SharePoint stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--report", default="ResideoDashboardOrderStatus")
+    parser.add_argument("--rows", type=int, default=10000, help="rows in the report")
+    parser.add_argument("--delay", type=float, default=2.0, help="seconds a report task takes to finish")
+    parser.add_argument("--max-rows", type=int, default=None,
+                        help="tasks matching more rows finish as 'Request too Large'")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    veracore = FakeVeraCore([FakeReport(args.report, args.rows)], processing_delay=args.delay,
+                            max_rows=args.max_rows, latency=args.latency)
+    server = FakeServiceServer(veracore, FakeSharePoint(latency=args.latency), port=args.port).start()
+    print(f"VERACORE_BASE_URL={server.veracore_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+ORDER_DATETIME_FORMAT = "%m/%d/%Y %H:%M:%S"
+
+DEFAULT_KEY = "Order ID"
+DEFAULT_DATE_FIELD = "Order Date"
+DEFAULT_COMPLETED_FIELD = "Date Completed"
+
+# An order is closed (can no longer change) once one of these flags is set
+CLOSED_FLAGS = ("Complete Order Flag", "Canceled Order Flag")
+
+
+class WatermarkStore:
+    """Per-report watermarks of the last successful incremental run, kept in a JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def get(self, report_name):
+        with self._lock:
+            return self._read().get(report_name)
+
+    def set(self, report_name, watermark):
+        with self._lock:
+            state = self._read()
+            state[report_name] = watermark
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def _parse_dates(series):
+    import pandas as pd
+
+    return pd.to_datetime(series, format=ORDER_DATETIME_FORMAT, errors="coerce")
+
+
+def compute_watermark(full_path, date_field=DEFAULT_DATE_FIELD, completed_field=DEFAULT_COMPLETED_FIELD):
+    """Summarize a full dataset into the watermark saved after a successful run.
+
+    ``open_since`` is the order date of the oldest order that is neither
+    complete nor canceled: everything before it is final and never re-requested.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(full_path, dtype=str, keep_default_na=False)
+    order_dates = _parse_dates(df[date_field]) if date_field in df else pd.Series(dtype="datetime64[ns]")
+
+    is_open = pd.Series(True, index=df.index)
+    for flag in CLOSED_FLAGS:
+        if flag in df:
+            is_open &= df[flag] != "1"
+
+    watermark = {
+        "rows": int(len(df)),
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+        "max_order_date": None,
+        "max_completed_date": None,
+        "open_since": None,
+    }
+    if order_dates.notna().any():
+        watermark["max_order_date"] = order_dates.max().isoformat()
+    if completed_field in df:
+        completed_dates = _parse_dates(df[completed_field])
+        if completed_dates.notna().any():
+            watermark["max_completed_date"] = completed_dates.max().isoformat()
+    open_dates = order_dates[is_open]
+    if open_dates.notna().any():
+        watermark["open_since"] = open_dates.min().isoformat()
+    return watermark
+
+
+def delta_window_start(watermark, lookback_days=1):
+    """First order date to re-request: the oldest open order or the newest order, minus the lookback"""
+    candidates = [watermark.get("max_order_date"), watermark.get("open_since")]
+    candidates = [datetime.fromisoformat(c) for c in candidates if c]
+    if not candidates:
+        return None
+    return (min(candidates) - timedelta(days=lookback_days)).date()
+
+
+def merge_delta(full_path, delta_path, window_start, key=DEFAULT_KEY, date_field=DEFAULT_DATE_FIELD):
+    """Replace the [window_start, ...) slice of the full dataset with the delta rows.
+
+    Rows ordered before the window are kept as they are; rows inside the
+    window that are missing from the delta are dropped, and delta rows win on
+    duplicate keys. Returns (total_rows, delta_rows, removed_rows).
+    """
+    import pandas as pd
+
+    full = pd.read_csv(full_path, dtype=str, keep_default_na=False)
+    delta = pd.read_csv(delta_path, dtype=str, keep_default_na=False) if os.path.getsize(delta_path) else None
+    if delta is None or delta.empty:
+        delta = full.iloc[0:0]
+
+    order_dates = _parse_dates(full[date_field])
+    in_window = order_dates >= pd.Timestamp(window_start)
+    kept = full[~in_window & ~full[key].isin(delta[key])]
+    removed = int((in_window & ~full[key].isin(delta[key])).sum())
+
+    merged = pd.concat([kept, delta], ignore_index=True)
+    merged = merged.drop_duplicates(subset=key, keep="last")
+
+    tmp_path = f"{full_path}.tmp"
+    merged.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, full_path)
+    return len(merged), len(delta), removed
+
+
+def seed_full_dataset(full_path, source_path):
+    """Start the locally maintained dataset from a full extract"""
+    os.makedirs(os.path.dirname(full_path) or ".", exist_ok=True)
+    shutil.copyfile(source_path, full_path)
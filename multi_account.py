@@ -0,0 +1,190 @@
+"""Run the pipeline for several VeraCore accounts at once.
+
+Every account runs reports.main() in its own process, so the module-level
+configuration, VeraCore token, SharePoint session, working folders and
+log file of one customer never mix with another's. Accounts are listed in
+a JSON file:
+
+    {
+      "workers": 4,
+      "base_dir": "accounts",
+      "env": {"SHAREPOINT_URL": "https://3plwinner.sharepoint.com/sites/Dashboards"},
+      "accounts": [
+        {
+          "name": "resideo",
+          "dotenv": ".env.resideo",
+          "env": {"SYSTEM_ID": "${RESIDEO_SYSTEM_ID}", "SHAREPOINT_FOLDER": "/sites/Dashboards/Resideo"},
+          "reports": [{"report_name": "ResideoDashboardOrderStatus", "filters": [], "output_csv": "OrderStatus.csv"}]
+        }
+      ]
+    }
+
+Settings are layered per account: the account's "env", then its "dotenv"
+file, then the top-level "env", then the shared .env next to reports.py.
+${NAME} in a value is replaced from the environment, so secrets can stay
+out of the file. Each account works in <base_dir>/<name>/ (data, output,
+logs). Without "reports" an account runs reports.REPORTS_TO_RUN.
+
+    python multi_account.py accounts.json
+    python reports.py --accounts accounts.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Working folder for the accounts, relative to the accounts file unless absolute
+DEFAULT_BASE_DIR = "accounts"
+
+
+def load_accounts(path):
+    """Read the accounts file and return (accounts, workers); relative paths resolve against the file"""
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    root = os.path.dirname(os.path.abspath(path))
+    base_dir = os.path.join(root, config.get("base_dir") or DEFAULT_BASE_DIR)
+    shared_env = config.get("env") or {}
+
+    accounts = []
+    names = set()
+    for entry in config.get("accounts") or []:
+        name = entry.get("name")
+        if not name:
+            raise ValueError("Every account needs a name")
+        if name in names:
+            raise ValueError(f"Account {name} is listed twice")
+        names.add(name)
+        accounts.append({
+            "name": name,
+            "env": {key: os.path.expandvars(str(value)) for key, value in (entry.get("env") or {}).items()},
+            "shared_env": {key: os.path.expandvars(str(value)) for key, value in shared_env.items()},
+            "dotenv": os.path.join(root, entry["dotenv"]) if entry.get("dotenv") else None,
+            "base_dir": os.path.join(base_dir, name),
+            "reports": entry.get("reports"),
+        })
+    return accounts, config.get("workers")
+
+
+def _last_run_record(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    return json.loads(lines[-1]) if lines else None
+
+
+def apply_account_env(account):
+    """Layer an account's settings into os.environ; a variable that is already set is never replaced"""
+    import reports
+
+    # Highest precedence first: the account's "env", its "dotenv" file, then the top-level "env".
+    # The shared .env is loaded last, by reports.initialize().
+    os.environ.update(account["env"])
+    os.environ["ACCOUNT_NAME"] = account["name"]
+    if account["dotenv"]:
+        reports.load_env(account["dotenv"])
+    for key, value in account["shared_env"].items():
+        os.environ.setdefault(key, value)
+
+
+def run_account(account):
+    """Run one account's pipeline in this (fresh) process and return its result summary"""
+    started = time.perf_counter()
+    result = {"account": account["name"], "success": False, "base_dir": account["base_dir"]}
+
+    import reports
+
+    try:
+        apply_account_env(account)
+        os.makedirs(account["base_dir"], exist_ok=True)
+        reports.initialize(base_dir=account["base_dir"])
+        run_started = datetime.now()
+        result["success"] = bool(reports.main(account["reports"]))
+        record = _last_run_record(reports.RUN_METRICS_FILE)
+        if record and datetime.fromisoformat(record["started_at"]) >= run_started.replace(microsecond=0):
+            result["reports_total"] = record.get("reports_total")
+            result["reports_succeeded"] = record.get("reports_succeeded")
+    except Exception as e:
+        logging.getLogger("reports").error(f"Critical error: {str(e)}")
+        result["error"] = str(e)
+    finally:
+        reports.shutdown()
+        result["seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+def run_accounts(accounts, workers=None):
+    """Run every account in a process pool and return their results in the accounts' order.
+
+    Each process handles a single account and then exits, so no module
+    state carries over from one account to the next.
+    """
+    if not accounts:
+        return []
+    workers = max(1, min(workers or os.cpu_count() or 1, len(accounts)))
+    logger.info(f"Running {len(accounts)} accounts with {workers} worker processes")
+
+    results = {}
+    with multiprocessing.Pool(processes=workers, maxtasksperchild=1) as pool:
+        for result in pool.imap_unordered(run_account, accounts):
+            results[result["account"]] = result
+            status = "ok" if result["success"] else f"FAILED{': ' + result['error'] if result.get('error') else ''}"
+            logger.info(f"Account {result['account']} finished in {result['seconds']}s: {status}")
+    return [results[account["name"]] for account in accounts]
+
+
+def format_results(results):
+    lines = [f"{'account':<24} {'result':<8} {'reports':>9} {'seconds':>9}"]
+    for r in results:
+        reports_done = f"{r['reports_succeeded']}/{r['reports_total']}" if r.get("reports_total") is not None else "-"
+        lines.append(f"{r['account']:<24} {'ok' if r['success'] else 'FAILED':<8} {reports_done:>9} {r['seconds']:>9.2f}")
+    return "\n".join(lines)
+
+
+def run_accounts_file(path, workers=None, only=None, summary_path=None):
+    """Run the accounts in ``path`` (optionally only the named ones); returns the process exit code"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    try:
+        accounts, configured_workers = load_accounts(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not read accounts file {path}: {str(e)}")
+        return 1
+    if only:
+        unknown = set(only) - {account["name"] for account in accounts}
+        if unknown:
+            logger.error(f"Unknown account(s): {', '.join(sorted(unknown))}")
+            return 1
+        accounts = [account for account in accounts if account["name"] in only]
+
+    started = time.perf_counter()
+    results = run_accounts(accounts, workers or configured_workers)
+    wall = time.perf_counter() - started
+    serial = sum(r["seconds"] for r in results)
+
+    print(format_results(results))
+    print(f"Wall time {wall:.2f}s for {serial:.2f}s of account runs")
+    if summary_path:
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump({"finished_at": datetime.now().isoformat(timespec="seconds"), "seconds": round(wall, 2),
+                       "results": results}, f, indent=2)
+    return 0 if all(r["success"] for r in results) else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the report pipeline for every account in a JSON file")
+    parser.add_argument("accounts_file")
+    parser.add_argument("--workers", type=int, help="parallel account processes (default: file setting or CPUs)")
+    parser.add_argument("--only", action="append", metavar="NAME", help="run only this account (repeatable)")
+    parser.add_argument("--json", help="also write the per-account results to this file")
+    args = parser.parse_args(argv)
+    return run_accounts_file(args.accounts_file, args.workers, args.only, args.json)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean "slow down" rather than "broken"
+THROTTLE_STATUS_CODES = (429, 503)
+
+# Responses that count as the API being unavailable for the circuit breaker
+FAILURE_STATUS_CODES = (500, 502, 503, 504)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+
+class TokenBucket:
+    """Allow ``rate`` requests per second on average with bursts of up to ``burst``"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Hand out no tokens for ``seconds`` (e.g. a server's Retry-After)"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self.paused_until:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    self.updated = now
+                    wait = self.paused_until - now
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """Cap in-flight requests with a limit that adapts to how the server is coping.
+
+    The limit halves (down to ``min_limit``) when the server throttles or
+    when response latency climbs above ``latency_factor`` times its long-run
+    average, at most once per ``cooldown`` seconds. Every healthy response
+    raises it by 1/limit, so it recovers by about one slot per limit's worth
+    of requests, up to ``max_limit``.
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=16, latency_factor=2.5, cooldown=5.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.baseline = None
+        self.recent = None
+        self.samples = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, throttled=False):
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self._decrease("server throttled")
+            elif latency is not None:
+                self._observe(latency)
+            self._condition.notify_all()
+
+    def _observe(self, latency):
+        self.samples += 1
+        self.recent = latency if self.recent is None else 0.7 * self.recent + 0.3 * latency
+        self.baseline = latency if self.baseline is None else 0.95 * self.baseline + 0.05 * latency
+        if self.samples >= 10 and self.recent > self.latency_factor * max(self.baseline, 0.05):
+            self._decrease(f"latency {self.recent:.2f}s vs {self.baseline:.2f}s typical")
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _decrease(self, reason):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        previous = int(self.limit)
+        self.limit = max(float(self.min_limit), self.limit / 2)
+        if int(self.limit) != previous:
+            logger.warning(f"VeraCore concurrency limit {previous} -> {int(self.limit)} ({reason})")
+
+
+class CircuitBreaker:
+    """Fail fast while the API is down.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    requests raise CircuitOpenError without being sent. After
+    ``reset_timeout`` seconds one trial request is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def retry_in(self):
+        """Seconds until the next trial request is allowed (0 when closed)"""
+        if self.state == CLOSED:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def before_request(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_running = False
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            raise CircuitOpenError(f"VeraCore circuit is open after {self.failures} consecutive failures, "
+                                   f"retrying in {self.retry_in:.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("VeraCore circuit closed, API is responding again")
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def release_trial(self):
+        """Let another trial through after one ended without a verdict"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                if self.state == CLOSED:
+                    logger.error(f"VeraCore circuit opened after {self.failures} consecutive failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+
+class ApiLimiter:
+    """Rate limit, adaptive concurrency and circuit breaker shared by every VeraCore request"""
+
+    def __init__(self, rate=10.0, burst=None, initial_concurrency=4, max_concurrency=16,
+                 failure_threshold=5, reset_timeout=30.0):
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveConcurrency(initial_concurrency, max_limit=max_concurrency)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+    def call(self, send):
+        """Run ``send()`` (which returns a requests response) under all three controls"""
+        self.breaker.before_request()
+        self.bucket.acquire()
+        self.concurrency.acquire()
+        latency = None
+        throttled = False
+        try:
+            response = send()
+        except Exception as e:
+            # Connection problems and timeouts mean the API is unreachable; programming errors do not
+            if _is_transport_error(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_trial()
+            raise
+        else:
+            latency = response.elapsed.total_seconds()
+            throttled = response.status_code in THROTTLE_STATUS_CODES
+            if throttled:
+                self.bucket.pause(retry_after(response, default=1.0))
+            if response.status_code in FAILURE_STATUS_CODES:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+        finally:
+            self.concurrency.release(latency, throttled)
+
+    def stats(self):
+        return {
+            "concurrency_limit": int(self.concurrency.limit),
+            "in_flight": self.concurrency.in_flight,
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+        }
+
+
+def retry_after(response, default=1.0, maximum=60.0):
+    """Seconds from a Retry-After header (only the delta-seconds form), capped at ``maximum``"""
+    try:
+        return min(float(response.headers.get("Retry-After")), maximum)
+    except (TypeError, ValueError):
+        return default
+
+
+def _is_transport_error(error):
+    import requests
+
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
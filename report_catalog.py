@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# How long a fetched catalog is trusted without asking VeraCore again
+DEFAULT_TTL = timedelta(hours=24)
+
+# Field holding the report name in a catalog entry (the first one present is used)
+NAME_FIELDS = ("ReportName", "reportName", "Name", "name")
+
+
+def report_name(entry):
+    for field in NAME_FIELDS:
+        if entry.get(field):
+            return str(entry[field])
+    return None
+
+
+class ReportCatalog:
+    """VeraCore's list of available reports, cached in a local JSON file.
+
+    Within ``ttl`` of the last fetch the cached names are used without any
+    request. After that the catalog is revalidated with If-None-Match /
+    If-Modified-Since when the server sent an ETag or Last-Modified, so an
+    unchanged catalog costs one empty 304 response. If VeraCore cannot be
+    reached the stale copy is used rather than blocking the run.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, state):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def is_fresh(self, state):
+        if not state or not state.get("checked_at"):
+            return False
+        return datetime.now() - datetime.fromisoformat(state["checked_at"]) < self.ttl
+
+    def names(self, client, auth_header, force=False):
+        """Set of report names VeraCore offers, or None when there is no catalog at all"""
+        return self._names(client, auth_header, force)[0]
+
+    def _names(self, client, auth_header, force=False):
+        with self._lock:
+            state = self._read()
+            if not force and self.is_fresh(state):
+                return set(state["reports"]), True
+            state = self._refresh(client, auth_header, state)
+        return (set(state["reports"]) if state else None), False
+
+    def _refresh(self, client, auth_header, state):
+        headers = dict(auth_header)
+        if state and state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state and state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        now = datetime.now().isoformat(timespec="seconds")
+        try:
+            response = client.get("reports", headers=headers, timeout=30)
+            if response.status_code == 304 and state:
+                logger.info(f"Report catalog unchanged ({len(state['reports'])} reports)")
+                state["checked_at"] = now
+                self._write(state)
+                return state
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}")
+            data = response.json()
+            if not isinstance(data, list):
+                raise ValueError("unexpected catalog format")
+        except Exception as e:
+            if state:
+                logger.warning(f"Could not refresh the report catalog ({str(e)}), using the copy from {state['fetched_at']}")
+            else:
+                logger.error(f"Could not fetch the report catalog: {str(e)}")
+            return state
+
+        reports = sorted({name for name in (report_name(entry) for entry in data if isinstance(entry, dict)) if name})
+        if data and not reports:
+            # Entries without a recognised name field: caching this would make every report look unknown
+            logger.warning(f"Report catalog has {len(data)} entries but no name field from {NAME_FIELDS}, ignoring it")
+            return state
+        state = {
+            "fetched_at": now,
+            "checked_at": now,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "reports": reports,
+        }
+        self._write(state)
+        logger.info(f"Fetched the report catalog: {len(reports)} reports")
+        return state
+
+    def unknown(self, report_names, client, auth_header):
+        """The names not in the catalog; a miss forces one refresh in case the report was just added"""
+        available, cached = self._names(client, auth_header)
+        if available is None:
+            return set()
+        missing = set(report_names) - available
+        if missing and cached:
+            available = self.names(client, auth_header, force=True) or available
+            missing = set(report_names) - available
+        return missing
@@ -0,0 +1,212 @@
+import json
+import logging
+import os
+from datetime import datetime
+
+from report_output import FLAG_COLUMNS, normalize_order_status, read_report_csv
+
+logger = logging.getLogger(__name__)
+
+# Order counts are broken down by every flag except Rush Order, which is counted on its own
+STATUS_FLAG_COLUMNS = [col for col in FLAG_COLUMNS if col != "Rush Order"]
+
+# Unit totals come from the first of these columns the extract has (older extracts use "Offer")
+UNIT_COLUMNS = ["Total # of Product Units Ordered", "Total # of Offer Units Ordered"]
+
+CARRIER_COLUMN = "Order Ship To Requested Freight Carrier"
+
+# Daily counts are kept for each of these dates
+DATE_COLUMNS = ["Order Date", "Date Needed By", "Date Completed"]
+
+# Cycle time (Order Date -> Date Completed) histogram buckets, in days
+CYCLE_TIME_BUCKETS = [0, 1, 2, 3, 5, 7, 14, 30]
+
+# Local file suffix of each summary table; the JSON holds the headline numbers
+KPI_TABLES = ["status", "carrier", "daily", "cycle_time"]
+KPI_SUMMARY_SUFFIX = "_kpi_summary.json"
+
+
+def _units(df):
+    import pandas as pd
+
+    for col in UNIT_COLUMNS:
+        if col in df:
+            return pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return pd.Series(0, index=df.index)
+
+
+def _flag(df, col):
+    import pandas as pd
+
+    if col in df:
+        return df[col].fillna(False).astype(bool)
+    return pd.Series(False, index=df.index)
+
+
+def _cycle_time_hours(df):
+    if "Order Date" not in df or "Date Completed" not in df:
+        return None
+    return (df["Date Completed"] - df["Order Date"]).dt.total_seconds() / 3600
+
+
+def _on_time(df):
+    """(on_time, late) masks of completed orders measured against Date Needed By (the whole day counts)"""
+    if "Date Completed" not in df or "Date Needed By" not in df:
+        return None, None
+    measured = df["Date Completed"].notna() & df["Date Needed By"].notna()
+    on_time = df["Date Completed"].dt.normalize() <= df["Date Needed By"].dt.normalize()
+    return measured & on_time, measured & ~on_time
+
+
+def status_counts(df):
+    """Orders and units per status flag"""
+    import pandas as pd
+
+    flags = [col for col in STATUS_FLAG_COLUMNS if col in df]
+    if not flags:
+        return None
+    units = _units(df)
+    flagged = pd.DataFrame({col: _flag(df, col) for col in flags})
+    return pd.DataFrame({
+        "status_flag": flags,
+        "orders": flagged.sum().to_numpy(),
+        "units": flagged.mul(units, axis=0).sum().to_numpy(),
+    })
+
+
+def carrier_counts(df):
+    """Orders, units, rush orders, completions and on-time/late completions per requested carrier"""
+    import pandas as pd
+
+    if CARRIER_COLUMN not in df:
+        return None
+    on_time, late = _on_time(df)
+    frame = pd.DataFrame({
+        "carrier": df[CARRIER_COLUMN].astype("string").fillna("").str.strip().replace("", "(none)"),
+        "orders": 1,
+        "units": _units(df),
+        "rush_orders": _flag(df, "Rush Order").astype(int),
+        "completed": _flag(df, "Complete Order Flag").astype(int),
+    })
+    if on_time is not None:
+        frame["on_time"] = on_time.astype(int)
+        frame["late"] = late.astype(int)
+    return frame.groupby("carrier", sort=True).sum().reset_index()
+
+
+def daily_counts(df):
+    """Orders, units and rush orders per day of each date column, in long format"""
+    import pandas as pd
+
+    units = _units(df)
+    rush = _flag(df, "Rush Order").astype(int)
+    tables = []
+    for col in DATE_COLUMNS:
+        if col not in df:
+            continue
+        frame = pd.DataFrame({"date": df[col].dt.date, "orders": 1, "units": units, "rush_orders": rush})
+        table = frame.dropna(subset=["date"]).groupby("date", sort=True).sum().reset_index()
+        table.insert(0, "date_field", col)
+        tables.append(table)
+    if not tables:
+        return None
+    return pd.concat(tables, ignore_index=True)
+
+
+def cycle_time_distribution(df):
+    """Completed orders per cycle-time bucket (Order Date to Date Completed)"""
+    import pandas as pd
+
+    hours = _cycle_time_hours(df)
+    if hours is None:
+        return None
+    days = hours.dropna() / 24
+    edges = CYCLE_TIME_BUCKETS + [float("inf")]
+    labels = [f"{low}-{high}d" for low, high in zip(edges[:-2], edges[1:-1])] + [f"{edges[-2]}d+"]
+    buckets = pd.cut(days.clip(lower=0), bins=edges, labels=labels, right=False)
+    counts = buckets.value_counts(sort=False).reindex(labels, fill_value=0)
+    total = int(counts.sum())
+    return pd.DataFrame({
+        "cycle_time": labels,
+        "orders": counts.to_numpy(),
+        "share": (counts / total).round(4).to_numpy() if total else 0.0,
+    })
+
+
+def kpi_summary(df, missing_columns=()):
+    """Headline numbers for the dashboard tiles"""
+    units = _units(df)
+    completed = _flag(df, "Complete Order Flag")
+    canceled = _flag(df, "Canceled Order Flag")
+    summary = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "rows": int(len(df)),
+        "orders": int(df["Order ID"].nunique()) if "Order ID" in df else int(len(df)),
+        "units": int(units.sum()),
+        "rush_orders": int(_flag(df, "Rush Order").sum()),
+        "completed_orders": int(completed.sum()),
+        "open_orders": int((~completed & ~canceled).sum()),
+        "missing_columns": sorted(missing_columns),
+    }
+
+    on_time, late = _on_time(df)
+    if on_time is not None:
+        measured = int(on_time.sum() + late.sum())
+        summary["on_time"] = int(on_time.sum())
+        summary["late"] = int(late.sum())
+        summary["on_time_rate"] = round(summary["on_time"] / measured, 4) if measured else None
+
+    hours = _cycle_time_hours(df)
+    if hours is not None:
+        hours = hours.dropna()
+        cycle_time = {"count": int(len(hours))}
+        if len(hours):
+            cycle_time["mean"] = round(float(hours.mean()), 2)
+            for pct in (50, 75, 90, 95):
+                cycle_time[f"p{pct}"] = round(float(hours.quantile(pct / 100)), 2)
+            cycle_time["max"] = round(float(hours.max()), 2)
+        summary["cycle_time_hours"] = cycle_time
+    return summary
+
+
+def compute_kpis(df):
+    """Return (tables, summary) for a typed OrderStatus frame; tables for absent columns are left out"""
+    expected = set(STATUS_FLAG_COLUMNS + DATE_COLUMNS + [CARRIER_COLUMN, "Rush Order", "Order ID"])
+    missing = expected - set(df.columns)
+    if not any(col in df for col in UNIT_COLUMNS):
+        missing.add(UNIT_COLUMNS[0])
+    builders = {
+        "status": status_counts,
+        "carrier": carrier_counts,
+        "daily": daily_counts,
+        "cycle_time": cycle_time_distribution,
+    }
+    tables = {}
+    for name in KPI_TABLES:
+        table = builders[name](df)
+        if table is not None:
+            tables[name] = table
+    return tables, kpi_summary(df, missing)
+
+
+def write_kpi_outputs(csv_path):
+    """Write the KPI tables (CSV) and summary (JSON) next to csv_path and return the created paths"""
+    df = normalize_order_status(read_report_csv(csv_path))
+    tables, summary = compute_kpis(df)
+    base = os.path.splitext(csv_path)[0]
+
+    paths = []
+    for name, table in tables.items():
+        path = f"{base}_kpi_{name}.csv"
+        table.to_csv(path, index=False)
+        paths.append(path)
+    summary_path = base + KPI_SUMMARY_SUFFIX
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    paths.append(summary_path)
+
+    if summary["missing_columns"]:
+        logger.info(f"KPIs for {os.path.basename(csv_path)} skip missing columns: {', '.join(summary['missing_columns'])}")
+    logger.info(f"Wrote {len(paths)} KPI files for {os.path.basename(csv_path)} "
+                f"({sum(os.path.getsize(path) for path in paths)} bytes)")
+    return paths
@@ -0,0 +1,105 @@
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Typed schema of the ResideoDashboardOrderStatus report; columns missing from a report are skipped
+DATETIME_COLUMNS = {
+    "Order Date": "%m/%d/%Y %H:%M:%S",
+    "Date Needed By": "%m/%d/%Y",
+    "Date Completed": "%m/%d/%Y %H:%M:%S",
+}
+FLAG_COLUMNS = [
+    "Unprocessed Order Flag",
+    "Pending Order Flag",
+    "Backordered Order Flag",
+    "Shipped Order Flag",
+    "Complete Order Flag",
+    "Canceled Order Flag",
+    "Rush Order",
+]
+CATEGORY_COLUMNS = [
+    "Order Status All",
+    "Order Ship To Requested Freight Carrier",
+]
+INTEGER_COLUMNS = [
+    "Total # of Product Lines Ordered",
+    "Total # of Product Units Ordered",
+]
+
+# File extension and pandas writer for each columnar format
+COLUMNAR_FORMATS = {
+    "parquet": ".parquet",
+    "feather": ".arrow",
+}
+
+
+def read_report_csv(csv_path):
+    """Read a report CSV keeping IDs as text and low-cardinality columns as categoricals"""
+    import pandas as pd
+
+    dtypes = {"Order ID": str}
+    dtypes.update({col: "category" for col in CATEGORY_COLUMNS})
+    return pd.read_csv(csv_path, dtype=dtypes, keep_default_na=False, na_values=[""])
+
+
+def normalize_order_status(df):
+    """Return a copy of an OrderStatus frame with compact, typed columns.
+
+    Dates become datetimes (unparseable values become NaT), 0/1 flags become
+    nullable booleans, counts become nullable integers and the low-cardinality
+    text columns become categoricals. Other columns are left as text.
+    """
+    import pandas as pd
+
+    df = df.copy()
+    for col, fmt in DATETIME_COLUMNS.items():
+        if col in df:
+            df[col] = pd.to_datetime(df[col], format=fmt, errors="coerce")
+    for col in FLAG_COLUMNS:
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int8").astype("boolean")
+    for col in INTEGER_COLUMNS:
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int64")
+    for col in CATEGORY_COLUMNS:
+        if col in df:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def write_columnar(df, output_path, fmt="parquet", compression="zstd"):
+    """Write a typed frame as Parquet or Arrow IPC (Feather v2); needs pyarrow"""
+    if fmt == "parquet":
+        df.to_parquet(output_path, index=False, compression=compression)
+    elif fmt == "feather":
+        df.reset_index(drop=True).to_feather(output_path, compression=compression)
+    else:
+        raise ValueError(f"Unsupported columnar format: {fmt}")
+    return output_path
+
+
+def write_columnar_outputs(csv_path, formats, compression="zstd"):
+    """Write each requested columnar format next to csv_path and return the created paths.
+
+    Returns an empty list (with a warning) when pyarrow is not installed so
+    the CSV upload still goes ahead.
+    """
+    formats = [fmt for fmt in formats if fmt in COLUMNAR_FORMATS]
+    if not formats:
+        return []
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logger.warning(f"pyarrow is not installed, skipping {', '.join(formats)} output")
+        return []
+
+    df = normalize_order_status(read_report_csv(csv_path))
+    base = os.path.splitext(csv_path)[0]
+    paths = []
+    for fmt in formats:
+        output_path = write_columnar(df, base + COLUMNAR_FORMATS[fmt], fmt, compression)
+        logger.info(f"Wrote {fmt} output {os.path.basename(output_path)} "
+                    f"({os.path.getsize(output_path)} bytes vs {os.path.getsize(csv_path)} bytes CSV)")
+        paths.append(output_path)
+    return paths
@@ -0,0 +1,173 @@
+import csv
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date, datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Date format VeraCore uses for report filters and output columns
+VERACORE_DATE_FORMAT = "%m/%d/%Y"
+
+SLICE_DONE = "done"
+SLICE_TOO_LARGE = "too_large"
+SLICE_FAILED = "failed"
+
+# Bounds of the edge slices that pick up rows dated before or after the partition window
+PARTITION_FLOOR = date(1900, 1, 1)
+PARTITION_CEILING = date(9999, 12, 31)
+
+
+def parse_date(value):
+    """Accept a date, datetime, ISO string or MM/DD/YYYY string"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in ("%Y-%m-%d", VERACORE_DATE_FORMAT):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized date: {value}")
+
+
+def date_range_filters(field, start, end):
+    """VeraCore filters selecting rows whose ``field`` falls in [start, end).
+
+    The range is sent inclusive of both ends at day granularity, so the
+    last day of the half-open range is end - 1 day.
+    """
+    last_day = end - timedelta(days=1)
+    return [
+        {
+            "FilterName": field,
+            "Operator": "Between",
+            "Values": [start.strftime(VERACORE_DATE_FORMAT), last_day.strftime(VERACORE_DATE_FORMAT)]
+        }
+    ]
+
+
+class DateSlice:
+    """Half-open date range [start, end) of a partitioned report"""
+
+    def __init__(self, start, end, depth=0):
+        self.start = start
+        self.end = end
+        self.depth = depth
+
+    @property
+    def days(self):
+        return (self.end - self.start).days
+
+    def split(self, parts=2):
+        """Split into up to ``parts`` contiguous slices of whole days"""
+        parts = max(1, min(parts, self.days))
+        step, extra = divmod(self.days, parts)
+        slices = []
+        cursor = self.start
+        for i in range(parts):
+            size = step + (1 if i < extra else 0)
+            slices.append(DateSlice(cursor, cursor + timedelta(days=size), self.depth + 1))
+            cursor += timedelta(days=size)
+        return slices
+
+    def label(self):
+        return f"{self.start.isoformat()}..{(self.end - timedelta(days=1)).isoformat()}"
+
+    def __repr__(self):
+        return f"DateSlice({self.label()})"
+
+
+def run_partitioned(run_slice, start, end, initial_slices=4, max_workers=4, split_factor=2, edges=False):
+    """Run a report as concurrent date slices, re-splitting any slice that is still too large.
+
+    ``run_slice(date_slice)`` must return ``(status, output_path)`` where status is
+    SLICE_DONE, SLICE_TOO_LARGE or SLICE_FAILED. With ``edges`` two more slices,
+    from PARTITION_FLOOR to ``start`` and from ``end`` to PARTITION_CEILING, pick
+    up rows dated outside the window. Returns the output paths of the finished
+    slices in date order, or None if any slice failed or could not be split any
+    further.
+    """
+    pending = DateSlice(start, end).split(initial_slices)
+    if edges:
+        pending += [s for s in (DateSlice(PARTITION_FLOOR, start), DateSlice(end, PARTITION_CEILING)) if s.days > 0]
+    finished = []
+    failed = False
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="slice") as executor:
+        futures = {executor.submit(run_slice, s): s for s in pending}
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                date_slice = futures.pop(future)
+                if future.cancelled():
+                    continue
+                try:
+                    status, output_path = future.result()
+                except Exception as e:
+                    logger.error(f"Slice {date_slice.label()} raised: {str(e)}")
+                    status, output_path = SLICE_FAILED, None
+
+                if status == SLICE_DONE:
+                    finished.append((date_slice.start, output_path))
+                elif status == SLICE_TOO_LARGE and date_slice.days > 1:
+                    if failed:
+                        continue
+                    children = date_slice.split(split_factor)
+                    logger.info(f"Slice {date_slice.label()} still too large, splitting into {len(children)}")
+                    for child in children:
+                        futures[executor.submit(run_slice, child)] = child
+                else:
+                    if status == SLICE_TOO_LARGE:
+                        logger.error(f"Slice {date_slice.label()} is too large and cannot be split further")
+                    failed = True
+                    for other in futures:
+                        other.cancel()
+
+    if failed:
+        for _, output_path in finished:
+            if output_path and os.path.exists(output_path):
+                os.remove(output_path)
+        return None
+
+    return [output_path for _, output_path in sorted(finished, key=lambda item: item[0])]
+
+
+def merge_csv_parts(part_paths, output_path, remove_parts=True):
+    """Concatenate CSV parts into one file with a single header and return the row count.
+
+    Empty parts are skipped. The header is the union of the parts' columns in
+    order of first appearance, and rows are aligned to it by name, so a column
+    that only some slices return is kept.
+    """
+    header = []
+    for part_path in part_paths:
+        with open(part_path, newline="", encoding="utf-8") as part_file:
+            part_header = next(csv.reader(part_file), None)
+        if part_header and part_header != [""]:
+            header.extend(col for col in part_header if col not in header)
+
+    row_count = 0
+    with open(output_path, "w", newline="", encoding="utf-8") as out_file:
+        writer = csv.writer(out_file)
+        if header:
+            writer.writerow(header)
+        for part_path in part_paths:
+            with open(part_path, newline="", encoding="utf-8") as part_file:
+                reader = csv.reader(part_file)
+                part_header = next(reader, None)
+                if not part_header or part_header == [""]:
+                    continue
+                positions = [part_header.index(col) if col in part_header else None for col in header]
+                for row in reader:
+                    writer.writerow([row[i] if i is not None and i < len(row) else "" for i in positions])
+                    row_count += 1
+
+    if remove_parts:
+        for part_path in part_paths:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+    return row_count
@@ -0,0 +1,247 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from rate_limit import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+STATUS_DONE = "Done"
+STATUS_TOO_LARGE = "Request too Large"
+STATUS_TIMEOUT = "Timeout"
+STATUS_ERROR = "Error"
+
+# Statuses after which a task is no longer polled
+FINAL_STATUSES = (STATUS_DONE, STATUS_TOO_LARGE, STATUS_TIMEOUT, STATUS_ERROR)
+
+# Status check responses worth retrying: throttling and server-side errors
+TRANSIENT_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# (connect, read) timeout of one status check; a slow check must not hold up the other tasks for long
+STATUS_TIMEOUT_SECONDS = (10, 20)
+
+# How long wait() gives the poller past a task's deadline before giving up on it
+WAIT_GRACE_SECONDS = 120.0
+
+
+class ReportTask:
+    """A VeraCore report task being watched by the poller"""
+
+    def __init__(self, task_id, report_name, auth_header, deadline, interval):
+        self.task_id = task_id
+        self.report_name = report_name
+        self.auth_header = auth_header
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline
+        self.interval = interval
+        self.next_check = self.started
+        self.attempts = 0
+        self.errors = 0
+        self.status = None
+        self.message = ""
+        self.completed = threading.Event()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def succeeded(self):
+        return self.status == STATUS_DONE
+
+
+class ReportTaskPoller:
+    """Watch many report tasks from a single background loop.
+
+    Each task gets its own adaptive interval: the first check happens right
+    away, then the wait grows by ``backoff`` up to ``max_interval`` so short
+    reports finish fast and long ones are not hammered. A task that has not
+    reached a final status by its deadline is marked as timed out.
+    Throttled or failed status checks (429, 5xx, connection errors) are
+    retried on the same backoff; only ``max_errors`` of them in a row fail
+    the task. While the client's circuit breaker is open the task is simply
+    checked again once the breaker allows a trial request, without counting
+    an error, since VeraCore keeps working on the report meanwhile.
+
+    When a task finishes its ``completed`` event is set and every
+    ``on_complete`` callback is called with the task, so the next stage can
+    start as soon as VeraCore reports it ``Done``.
+    """
+
+    def __init__(self, client, initial_interval=1.0, max_interval=30.0, backoff=1.6,
+                 deadline=600.0, on_complete=None, max_errors=5, status_timeout=STATUS_TIMEOUT_SECONDS,
+                 wait_grace=WAIT_GRACE_SECONDS):
+        self.client = client
+        self.status_timeout = status_timeout
+        self.wait_grace = wait_grace
+        self.max_errors = max_errors
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.deadline = deadline
+        self.callbacks = [on_complete] if on_complete else []
+
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def watch(self, task_id, report_name, auth_header, deadline=None):
+        """Start watching a task and return its ReportTask handle"""
+        task = ReportTask(task_id, report_name, auth_header, deadline or self.deadline, self.initial_interval)
+        with self._condition:
+            heapq.heappush(self._queue, (task.next_check, next(self._counter), task))
+            self._ensure_running()
+            self._condition.notify()
+        return task
+
+    def wait(self, task, timeout=None):
+        """Block until the task reaches a final status and return it.
+
+        Without ``timeout`` the wait ends ``wait_grace`` seconds after the
+        task's deadline. If that passes, or the poller thread has died, the
+        task is returned as timed out or failed instead of blocking forever.
+        """
+        if timeout is None:
+            timeout = max(0.0, task.deadline - time.monotonic()) + self.wait_grace
+        give_up = time.monotonic() + timeout
+        while not task.completed.wait(min(1.0, max(0.0, give_up - time.monotonic()))):
+            if self._thread is None or not self._thread.is_alive():
+                self._abandon(task, STATUS_ERROR, "the report poller stopped before the task finished")
+                break
+            if time.monotonic() >= give_up:
+                self._abandon(task, STATUS_TIMEOUT, f"no final status after waiting {timeout:.1f} seconds")
+                break
+        return task
+
+    def _abandon(self, task, status, message):
+        with self._condition:
+            if task.completed.is_set():
+                return
+            task.status = status
+            task.message = message
+        logger.error(f"Report {task.report_name} (task {task.task_id}): {message}")
+
+    def stop(self):
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_running(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="report-poller", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopping:
+                    if self._queue:
+                        wait = self._queue[0][0] - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._condition.wait(wait)
+                    else:
+                        self._condition.wait()
+                if self._stopping:
+                    return
+                _, _, task = heapq.heappop(self._queue)
+
+            try:
+                self._check(task)
+            except Exception as e:
+                # Keep the loop alive for the other tasks
+                task.status = STATUS_ERROR
+                task.message = f"Exception checking report status: {str(e)}"
+
+            if task.status in FINAL_STATUSES:
+                self._finish(task)
+            else:
+                with self._condition:
+                    heapq.heappush(self._queue, (task.next_check, next(self._counter), task))
+
+    def _check(self, task):
+        task.attempts += 1
+        status_url = self.client.url(f"reports/{task.task_id}/status")
+        try:
+            status_response = self.client.get(status_url, headers=task.auth_header, timeout=self.status_timeout)
+        except CircuitOpenError:
+            self._wait_for_circuit(task)
+            return
+        except Exception as e:
+            self._transient_error(task, f"Exception checking report status: {str(e)}")
+            return
+        if status_response.status_code in TRANSIENT_STATUS_CODES:
+            self._transient_error(task, f"Status Check Failed: {status_response.status_code} {status_response.text}")
+            return
+        try:
+            if status_response.status_code != 200:
+                task.status = STATUS_ERROR
+                task.message = f"Status Check Failed: {status_response.status_code} {status_response.text}"
+                return
+            status = status_response.json().get("Status")
+        except Exception as e:
+            task.status = STATUS_ERROR
+            task.message = f"Exception checking report status: {str(e)}"
+            return
+        task.errors = 0
+
+        if status in (STATUS_DONE, STATUS_TOO_LARGE):
+            task.status = status
+            task.message = status_response.text
+            return
+
+        if status != task.status:
+            logger.info(f"Report {task.report_name} (task {task.task_id}) status: {status} "
+                        f"(attempt {task.attempts}, {task.elapsed:.1f}s)")
+        task.status = status
+        self._reschedule(task)
+
+    def _transient_error(self, task, message):
+        task.errors += 1
+        if task.errors >= self.max_errors:
+            task.status = STATUS_ERROR
+            task.message = f"{message} ({task.errors} failed status checks in a row)"
+            return
+        logger.warning(f"Report {task.report_name} (task {task.task_id}): {message}, "
+                       f"retrying in {task.interval:.1f}s")
+        self._reschedule(task)
+
+    def _wait_for_circuit(self, task):
+        limiter = getattr(self.client, "limiter", None)
+        retry_in = limiter.breaker.retry_in() if limiter else task.interval
+        logger.debug(f"Report {task.report_name} (task {task.task_id}): circuit open, checking again in {retry_in:.1f}s")
+        # Another task's trial request may be running (retry_in is 0 then), so never spin
+        self._reschedule(task, delay=max(retry_in, self.initial_interval))
+
+    def _reschedule(self, task, delay=None):
+        """Schedule the next check after ``delay`` seconds, or the task's backoff interval"""
+        now = time.monotonic()
+        if now >= task.deadline:
+            task.status = STATUS_TIMEOUT
+            task.message = f"did not complete within {task.deadline - task.started:g} seconds"
+            return
+
+        if delay is not None:
+            task.next_check = min(now + delay, task.deadline)
+            return
+        task.next_check = min(now + task.interval, task.deadline)
+        task.interval = min(task.interval * self.backoff, self.max_interval)
+
+    def _finish(self, task):
+        task.completed.set()
+        for callback in self.callbacks:
+            try:
+                callback(task)
+            except Exception as e:
+                logger.error(f"Report poller callback failed for task {task.task_id}: {str(e)}")
@@ -0,0 +1,196 @@
+import codecs
+import csv
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from the response per network chunk
+READ_CHUNK_BYTES = 64 * 1024
+
+# Rows buffered before they are written to the output file
+WRITE_CHUNK_ROWS = 5000
+
+_WHITESPACE = " \t\n\r"
+
+
+class _JsonStream:
+    """Text buffer over an iterator of decoded chunks that drops consumed input"""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        if self.eof:
+            return False
+        for chunk in self.chunks:
+            if chunk:
+                self.buf = self.buf[self.pos:] + chunk
+                self.pos = 0
+                return True
+        self.eof = True
+        return False
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}, found '{self.buf[self.pos]}'")
+        self.pos += 1
+
+    def value(self):
+        """Decode one complete JSON value, reading more input until it is whole"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may continue in the next chunk
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_array(chunks, key="Data"):
+    """Yield the elements of a JSON array one at a time from a stream of text chunks.
+
+    With ``key`` the array is looked up as a member of the top-level object
+    (the VeraCore report shape ``{"Data": [...]}``); with ``key=None`` the
+    document itself must be an array. Only one element is held in memory at a time.
+    """
+    stream = _JsonStream(chunks)
+
+    if key is None:
+        yield from _iter_array(stream)
+        return
+
+    stream.expect("{")
+    if stream.peek() == "}":
+        raise KeyError(key)
+    while True:
+        name = stream.value()
+        stream.expect(":")
+        if name == key:
+            yield from _iter_array(stream)
+            return
+        stream.value()
+        if stream.peek() == ",":
+            stream.pos += 1
+            continue
+        stream.expect("}")
+        raise KeyError(key)
+
+
+def _iter_array(stream):
+    if stream.peek() == "n":
+        stream.value()
+        return
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.pos += 1
+        return
+    while True:
+        yield stream.value()
+        if stream.peek() == ",":
+            stream.pos += 1
+            continue
+        stream.expect("]")
+        return
+
+
+def iter_response_text(response, chunk_size=READ_CHUNK_BYTES):
+    """Decode a streamed requests response body into text chunks"""
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8-sig")(errors="replace")
+    # Body bytes consumed so far, read back by veracore_client.bytes_received for run metrics
+    response.bytes_read = 0
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        response.bytes_read += len(chunk)
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def write_rows_to_csv(rows, output_path, chunk_rows=WRITE_CHUNK_ROWS):
+    """Write an iterable of dict rows to CSV in bounded batches and return the row count.
+
+    Columns are the union of the rows' keys in order of first appearance,
+    like pandas builds them for a list of records; a row without a column
+    gets an empty cell. A column first seen after the header was written
+    costs one extra pass over the file to widen the rows before it.
+    """
+    row_count = 0
+    fieldnames = []
+    known = set()
+    header_size = None
+    with open(output_path, "w", newline="", encoding="utf-8") as csv_file:
+        writer = csv.writer(csv_file)
+        batch = []
+        for row in rows:
+            new_columns = [key for key in row if key not in known]
+            if new_columns:
+                fieldnames.extend(new_columns)
+                known.update(new_columns)
+                if header_size is None:
+                    header_size = len(fieldnames)
+                    writer.writerow(fieldnames)
+                else:
+                    logger.info(f"Row {row_count + len(batch) + 1} adds column(s) {', '.join(new_columns)}")
+            batch.append([row.get(key) for key in fieldnames])
+            if len(batch) >= chunk_rows:
+                writer.writerows(batch)
+                row_count += len(batch)
+                batch = []
+        if batch:
+            writer.writerows(batch)
+            row_count += len(batch)
+
+    if header_size is not None and len(fieldnames) > header_size:
+        _widen_csv(output_path, fieldnames, chunk_rows)
+    return row_count
+
+
+def _widen_csv(output_path, fieldnames, chunk_rows=WRITE_CHUNK_ROWS):
+    """Rewrite a CSV under the full header, padding rows written before later columns appeared"""
+    tmp_path = f"{output_path}.tmp"
+    os.replace(output_path, tmp_path)
+    with open(tmp_path, newline="", encoding="utf-8") as source, \
+            open(output_path, "w", newline="", encoding="utf-8") as target:
+        reader = csv.reader(source)
+        writer = csv.writer(target)
+        next(reader)
+        writer.writerow(fieldnames)
+        padding = [""] * len(fieldnames)
+        batch = []
+        for row in reader:
+            batch.append(row + padding[len(row):])
+            if len(batch) >= chunk_rows:
+                writer.writerows(batch)
+                batch = []
+        writer.writerows(batch)
+    os.remove(tmp_path)
+
+
+def stream_report_to_csv(response, output_path, key="Data", chunk_rows=WRITE_CHUNK_ROWS):
+    """Stream the report array in a response straight to a CSV file and return the row count"""
+    rows = iter_json_array(iter_response_text(response), key=key)
+    return write_rows_to_csv(rows, output_path, chunk_rows=chunk_rows)
@@ -1,81 +1,331 @@
-import requests
-from dotenv import set_key, load_dotenv
 import os
-import pandas as pd
-import numpy as np
-import time
 import logging
 import sys
-from datetime import datetime
-from office365.sharepoint.client_context import ClientContext
-from office365.runtime.auth.client_credential import ClientCredential
-from office365.runtime.auth.authentication_context import AuthenticationContext
+import shutil
+import re
+import signal
+import argparse
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from veracore_client import VeraCoreClient, VERACORE_BASE_URL as DEFAULT_VERACORE_BASE_URL, bytes_received
+from token_manager import TokenManager
+from report_stream import stream_report_to_csv
+from report_partition import (
+    date_range_filters, merge_csv_parts, parse_date, run_partitioned,
+    SLICE_DONE, SLICE_FAILED, SLICE_TOO_LARGE
+)
+from incremental import WatermarkStore, compute_watermark, delta_window_start, merge_delta, seed_full_dataset
+from report_output import write_columnar_outputs
+from report_kpis import write_kpi_outputs
+from change_feed import write_change_feed
+from upload_manifest import UploadManifest, fingerprint_csv
+from sharepoint_session import SharePointSession
+from scheduler import Scheduler, parse_schedule
+from report_poller import ReportTaskPoller, STATUS_DONE, STATUS_TIMEOUT, STATUS_TOO_LARGE
+from rate_limit import ApiLimiter
+from report_catalog import ReportCatalog
+from checkpoint import CheckpointStore, request_signature, STAGE_PREPARED, STAGE_QUEUED
+from snapshot_store import SnapshotStore
+from run_metrics import PrometheusTextfile, RunMetrics, append_jsonl, build_run_record
 
-pd.set_option("display.max_rows", None)
-pd.set_option("display.max_columns", None)
-pd.set_option("display.width", 0)
-pd.set_option("display.max_colwidth", None)
+# Importing this module has no side effects: pandas and office365 are imported where they are
+# used, and configuration, folders, logging and the shared clients are set up by initialize().
+logger = logging.getLogger(__name__)
 
-CSV_FOLDER = os.path.join(os.getcwd(), "csvs")
-ARCHIVE_FOLDER = os.path.join(os.getcwd(), "archive")
-OUTPUT_FOLDER = os.path.join(os.getcwd(), f"output_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
-os.makedirs(CSV_FOLDER, exist_ok=True)
-os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+# Uploaded report files that are moved to Archive/<timestamp>/ once a newer version exists
+ARCHIVE_EXTENSIONS = (".csv", ".parquet", ".arrow", ".json")
+ARCHIVE_TIMESTAMP_PATTERN = re.compile(r"_(\d{8}_\d{6})\.[^.]+$")
+archive_lock = threading.Lock()
+
+# List of reports to run
+REPORTS_TO_RUN = [
+    {
+        "report_name": "ResideoDashboardOrderStatus",
+        "filters": [],
+        "output_csv": "OrderStatus.csv"
+    }
+]
+
+# Configuration read from the environment by load_config()
+CSV_FOLDER = ARCHIVE_FOLDER = DATA_FOLDER = OUTPUT_FOLDER = LOG_FOLDER = None
+ACCOUNT_NAME = None
+USERNAME = PASSWORD = SYSTEM_ID = TOKEN = None
+SHAREPOINT_URL = SHAREPOINT_FOLDER = None
+SHAREPOINT_CLIENT_ID = SHAREPOINT_CLIENT_SECRET = SHAREPOINT_TENANT_ID = None
+VERACORE_BASE_URL = REPORT_WORKERS = VERACORE_POOL_SIZE = VERACORE_TOKEN_TTL_HOURS = None
+VERACORE_RATE_LIMIT = VERACORE_RATE_BURST = VERACORE_MAX_CONCURRENCY = None
+VERACORE_BREAKER_FAILURES = VERACORE_BREAKER_RESET_SECONDS = None
+REPORT_POLL_INITIAL_SECONDS = REPORT_POLL_MAX_SECONDS = REPORT_DEADLINE_SECONDS = None
+REPORT_STREAMING = REPORT_WRITE_CHUNK_ROWS = None
+REPORT_PARTITION_FIELD = REPORT_PARTITION_START = REPORT_PARTITION_SLICES = None
+REPORT_INCREMENTAL = REPORT_INCREMENTAL_LOOKBACK_DAYS = None
+REPORT_OUTPUT_FORMATS = REPORT_COLUMNAR_COMPRESSION = UPLOAD_SKIP_UNCHANGED = None
+SHAREPOINT_LARGE_UPLOAD_BYTES = SHAREPOINT_UPLOAD_CHUNK_BYTES = None
+DAEMON_INTERVAL_MINUTES = DAEMON_CRON = None
+RUN_METRICS_FILE = RUN_METRICS_PROMETHEUS_FILE = None
+REPORT_CHECKPOINTS = CHECKPOINT_MAX_AGE_HOURS = None
+SNAPSHOT_STORE = SNAPSHOT_RETENTION_DAYS = SNAPSHOT_DAILY_AFTER_DAYS = None
+REPORT_CATALOG_TTL_HOURS = None
+
+# Shared clients and local state built by initialize()
+veracore = token_manager = report_poller = sharepoint = None
+watermarks = upload_manifest = checkpoints = snapshots = report_catalog = None
+_initialized = False
+
+# Per-stage timings of the current run, written out by write_run_metrics()
+run_metrics = RunMetrics()
+prometheus_textfile = PrometheusTextfile()
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def load_config(base_dir=None):
+    """Read every setting from the environment into the module globals"""
+    global CSV_FOLDER, ARCHIVE_FOLDER, DATA_FOLDER, OUTPUT_FOLDER, LOG_FOLDER, ACCOUNT_NAME
+    global USERNAME, PASSWORD, SYSTEM_ID, TOKEN
+    global SHAREPOINT_URL, SHAREPOINT_FOLDER, SHAREPOINT_CLIENT_ID, SHAREPOINT_CLIENT_SECRET, SHAREPOINT_TENANT_ID
+    global VERACORE_BASE_URL, REPORT_WORKERS, VERACORE_POOL_SIZE, VERACORE_TOKEN_TTL_HOURS
+    global VERACORE_RATE_LIMIT, VERACORE_RATE_BURST, VERACORE_MAX_CONCURRENCY
+    global VERACORE_BREAKER_FAILURES, VERACORE_BREAKER_RESET_SECONDS
+    global REPORT_POLL_INITIAL_SECONDS, REPORT_POLL_MAX_SECONDS, REPORT_DEADLINE_SECONDS
+    global REPORT_STREAMING, REPORT_WRITE_CHUNK_ROWS
+    global REPORT_PARTITION_FIELD, REPORT_PARTITION_START, REPORT_PARTITION_SLICES
+    global REPORT_INCREMENTAL, REPORT_INCREMENTAL_LOOKBACK_DAYS
+    global REPORT_OUTPUT_FORMATS, REPORT_COLUMNAR_COMPRESSION, UPLOAD_SKIP_UNCHANGED
+    global SHAREPOINT_LARGE_UPLOAD_BYTES, SHAREPOINT_UPLOAD_CHUNK_BYTES
+    global DAEMON_INTERVAL_MINUTES, DAEMON_CRON
+    global RUN_METRICS_FILE, RUN_METRICS_PROMETHEUS_FILE
+    global REPORT_CHECKPOINTS, CHECKPOINT_MAX_AGE_HOURS
+    global SNAPSHOT_STORE, SNAPSHOT_RETENTION_DAYS, SNAPSHOT_DAILY_AFTER_DAYS, REPORT_CATALOG_TTL_HOURS
+
+    base_dir = base_dir or os.getcwd()
+    CSV_FOLDER = os.path.join(base_dir, "csvs")
+    ARCHIVE_FOLDER = os.path.join(base_dir, "archive")
+    DATA_FOLDER = os.path.join(base_dir, "data")
+    # Working folder for the current run's files; history lives in the snapshot store instead
+    OUTPUT_FOLDER = os.path.join(base_dir, "output")
+    LOG_FOLDER = os.path.join(base_dir, "logs")
+
+    # Set by multi_account.py so each account's log lines and run metrics say whose they are
+    ACCOUNT_NAME = os.getenv("ACCOUNT_NAME")
+
+    USERNAME = os.getenv("USERNAME")
+    PASSWORD = os.getenv("PASSWORD")
+    SYSTEM_ID = os.getenv("SYSTEM_ID")
+    TOKEN = os.getenv("W_TOKEN")
+
+    # Point at another VeraCore API root, e.g. the local stand-in in fake_services.py
+    VERACORE_BASE_URL = os.getenv("VERACORE_BASE_URL", DEFAULT_VERACORE_BASE_URL)
+
+    SHAREPOINT_URL = os.getenv("SHAREPOINT_URL")
+    SHAREPOINT_FOLDER=os.getenv("SHAREPOINT_FOLDER")
+
+    SHAREPOINT_CLIENT_ID = os.getenv("SHAREPOINT_CLIENT_ID")
+    SHAREPOINT_CLIENT_SECRET = os.getenv("SHAREPOINT_CLIENT_SECRET")
+    SHAREPOINT_TENANT_ID = os.getenv("SHAREPOINT_TENANT_ID")
+
+    # Files above SHAREPOINT_LARGE_UPLOAD_BYTES are streamed in resumable chunks of SHAREPOINT_UPLOAD_CHUNK_BYTES
+    SHAREPOINT_LARGE_UPLOAD_BYTES = int(os.getenv("SHAREPOINT_LARGE_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+    SHAREPOINT_UPLOAD_CHUNK_BYTES = int(os.getenv("SHAREPOINT_UPLOAD_CHUNK_BYTES", str(5 * 1024 * 1024)))
+
+    # Number of reports processed at the same time (1 = run one after another)
+    REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "4"))
+
+    # Shared keep-alive session for every VeraCore call; sized so each report worker gets a connection
+    VERACORE_POOL_SIZE = int(os.getenv("VERACORE_POOL_SIZE", str(max(10, REPORT_WORKERS * 2))))
+
+    # Client-side limits for every VeraCore call: requests per second (token bucket), an in-flight cap
+    # that halves on 429/503 or rising latency and grows back slowly, and a circuit breaker that fails
+    # fast after VERACORE_BREAKER_FAILURES consecutive failures for VERACORE_BREAKER_RESET_SECONDS
+    VERACORE_RATE_LIMIT = float(os.getenv("VERACORE_RATE_LIMIT", "10"))
+    VERACORE_RATE_BURST = float(os.getenv("VERACORE_RATE_BURST", str(VERACORE_RATE_LIMIT)))
+    VERACORE_MAX_CONCURRENCY = int(os.getenv("VERACORE_MAX_CONCURRENCY", str(VERACORE_POOL_SIZE)))
+    VERACORE_BREAKER_FAILURES = int(os.getenv("VERACORE_BREAKER_FAILURES", "5"))
+    VERACORE_BREAKER_RESET_SECONDS = float(os.getenv("VERACORE_BREAKER_RESET_SECONDS", "30"))
+
+    # Cached VeraCore token shared by every worker; refreshed ahead of expiry and after a 401
+    VERACORE_TOKEN_TTL_HOURS = float(os.getenv("VERACORE_TOKEN_TTL_HOURS", "12"))
+
+    # One background loop polls every outstanding report task with per-task backoff
+    REPORT_POLL_INITIAL_SECONDS = float(os.getenv("REPORT_POLL_INITIAL_SECONDS", "1"))
+    REPORT_POLL_MAX_SECONDS = float(os.getenv("REPORT_POLL_MAX_SECONDS", "30"))
+    REPORT_DEADLINE_SECONDS = float(os.getenv("REPORT_DEADLINE_SECONDS", "600"))
+
+    # Stream report Data straight to CSV instead of building the whole JSON document and DataFrame
+    REPORT_STREAMING = _env_flag("REPORT_STREAMING", "true")
+    REPORT_WRITE_CHUNK_ROWS = int(os.getenv("REPORT_WRITE_CHUNK_ROWS", "5000"))
+
+    # "Request too Large" reports are re-run as date slices of this field (per-report "partition" overrides)
+    REPORT_PARTITION_FIELD = os.getenv("REPORT_PARTITION_FIELD", "Order Date")
+    REPORT_PARTITION_START = os.getenv("REPORT_PARTITION_START", "2015-01-01")
+    REPORT_PARTITION_SLICES = int(os.getenv("REPORT_PARTITION_SLICES", "4"))
+
+    # Incremental mode: request only orders that are new or still open and merge them into data/<output_csv>
+    REPORT_INCREMENTAL = _env_flag("REPORT_INCREMENTAL", "false")
+    REPORT_INCREMENTAL_LOOKBACK_DAYS = int(os.getenv("REPORT_INCREMENTAL_LOOKBACK_DAYS", "1"))
+
+    # Files uploaded per report: "csv", the typed columnar formats "parquet" / "feather" and
+    # "kpi" (small dashboard summary tables computed from the extract) and "changes" (orders that are
+    # new, changed status or disappeared since the previous uploaded extract)
+    REPORT_OUTPUT_FORMATS = [fmt.strip().lower() for fmt in os.getenv("REPORT_OUTPUT_FORMATS", "csv,kpi,changes").split(",") if fmt.strip()]
+    REPORT_COLUMNAR_COMPRESSION = os.getenv("REPORT_COLUMNAR_COMPRESSION", "zstd")
+
+    # Skip the SharePoint upload when a report's rows are the same as the last uploaded version
+    UPLOAD_SKIP_UNCHANGED = _env_flag("UPLOAD_SKIP_UNCHANGED", "true")
+
+    # Daemon mode: default schedule for reports without their own "schedule" entry
+    DAEMON_INTERVAL_MINUTES = float(os.getenv("DAEMON_INTERVAL_MINUTES", "60"))
+    DAEMON_CRON = os.getenv("DAEMON_CRON")
+
+    # One JSON line of per-stage timings per run (empty disables); optional node_exporter textfile
+    RUN_METRICS_FILE = os.getenv("RUN_METRICS_FILE", os.path.join(base_dir, "logs", "run_metrics.jsonl"))
+    RUN_METRICS_PROMETHEUS_FILE = os.getenv("RUN_METRICS_PROMETHEUS_FILE")
+
+    # Resume an interrupted report from its queued TaskId or downloaded CSV instead of regenerating it
+    REPORT_CHECKPOINTS = _env_flag("REPORT_CHECKPOINTS", "true")
+    CHECKPOINT_MAX_AGE_HOURS = float(os.getenv("CHECKPOINT_MAX_AGE_HOURS", "12"))
+
+    # Keep every run's rows as Order ID level changes in data/snapshots.sqlite; snapshots older than
+    # SNAPSHOT_DAILY_AFTER_DAYS are thinned to one per day and dropped after SNAPSHOT_RETENTION_DAYS
+    SNAPSHOT_STORE = _env_flag("SNAPSHOT_STORE", "true")
+    SNAPSHOT_RETENTION_DAYS = float(os.getenv("SNAPSHOT_RETENTION_DAYS", "90"))
+    SNAPSHOT_DAILY_AFTER_DAYS = float(os.getenv("SNAPSHOT_DAILY_AFTER_DAYS", "7"))
+
+    # Report names are checked against VeraCore's report list, cached in data/report_catalog.json
+    # and revalidated (ETag / Last-Modified) once it is older than this
+    REPORT_CATALOG_TTL_HOURS = float(os.getenv("REPORT_CATALOG_TTL_HOURS", "24"))
+
+
+def load_env(dotenv_path=None):
+    """Load .env next to this script into the environment (existing variables win)"""
+    from dotenv import load_dotenv
+
+    load_dotenv(dotenv_path or os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
 
-dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
-load_dotenv(dotenv_path)
 
-USERNAME = os.getenv("USERNAME")
-PASSWORD = os.getenv("PASSWORD")
-SYSTEM_ID = os.getenv("SYSTEM_ID")
-TOKEN = os.getenv("W_TOKEN")
+def build_clients():
+    """Create the shared VeraCore, SharePoint and local-state objects from the loaded config"""
+    global veracore, token_manager, report_poller, sharepoint, watermarks, upload_manifest, checkpoints, snapshots
+    global report_catalog
 
-SHAREPOINT_URL = os.getenv("SHAREPOINT_URL")
-SHAREPOINT_FOLDER=os.getenv("SHAREPOINT_FOLDER")
+    # Authenticated once per run and shared by archiving and every upload
+    sharepoint = SharePointSession(
+        SHAREPOINT_URL,
+        SHAREPOINT_CLIENT_ID,
+        SHAREPOINT_CLIENT_SECRET,
+        SHAREPOINT_FOLDER,
+        large_file_threshold=SHAREPOINT_LARGE_UPLOAD_BYTES,
+        chunk_size=SHAREPOINT_UPLOAD_CHUNK_BYTES,
+        upload_state_dir=os.path.join(DATA_FOLDER, "uploads")
+    )
+
+    limiter = ApiLimiter(
+        rate=VERACORE_RATE_LIMIT,
+        burst=VERACORE_RATE_BURST,
+        initial_concurrency=max(1, min(REPORT_WORKERS * 2, VERACORE_MAX_CONCURRENCY)),
+        max_concurrency=VERACORE_MAX_CONCURRENCY,
+        failure_threshold=VERACORE_BREAKER_FAILURES,
+        reset_timeout=VERACORE_BREAKER_RESET_SECONDS
+    )
+    veracore = VeraCoreClient(VERACORE_BASE_URL, pool_size=VERACORE_POOL_SIZE, limiter=limiter)
+    token_manager = TokenManager(
+        veracore,
+        USERNAME,
+        PASSWORD,
+        SYSTEM_ID,
+        os.path.join(DATA_FOLDER, "veracore_token.json"),
+        ttl=timedelta(hours=VERACORE_TOKEN_TTL_HOURS),
+        seed_token=TOKEN
+    )
+    veracore.token_manager = token_manager
+
+    report_poller = ReportTaskPoller(
+        veracore,
+        initial_interval=REPORT_POLL_INITIAL_SECONDS,
+        max_interval=REPORT_POLL_MAX_SECONDS,
+        deadline=REPORT_DEADLINE_SECONDS
+    )
+    report_poller.add_callback(record_poll_metrics)
+
+    watermarks = WatermarkStore(os.path.join(DATA_FOLDER, "watermarks.json"))
+    upload_manifest = UploadManifest(os.path.join(DATA_FOLDER, "upload_manifest.json"))
+    checkpoints = CheckpointStore(os.path.join(DATA_FOLDER, "checkpoint.json"),
+                                  max_age=timedelta(hours=CHECKPOINT_MAX_AGE_HOURS))
+    snapshots = SnapshotStore(os.path.join(DATA_FOLDER, "snapshots.sqlite")) if SNAPSHOT_STORE else None
+    report_catalog = ReportCatalog(os.path.join(DATA_FOLDER, "report_catalog.json"),
+                                   ttl=timedelta(hours=REPORT_CATALOG_TTL_HOURS))
+
+
+def initialize(dotenv_path=None, base_dir=None, log_to_file=True):
+    """Load .env and configuration, create the working folders, set up logging and build the clients.
+
+    Call once before main() or run_daemon(); the CLI does this for you.
+    """
+    global _initialized
+    load_env(dotenv_path)
+    load_config(base_dir)
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    os.makedirs(CSV_FOLDER, exist_ok=True)
+    os.makedirs(ARCHIVE_FOLDER, exist_ok=True)
+    setup_logging(log_to_file)
+    build_clients()
+    _initialized = True
+
+
+def shutdown():
+    """Stop the poller thread and close HTTP connections"""
+    if report_poller:
+        report_poller.stop()
+    if veracore:
+        veracore.close()
 
-SHAREPOINT_CLIENT_ID = os.getenv("SHAREPOINT_CLIENT_ID")
-SHAREPOINT_CLIENT_SECRET = os.getenv("SHAREPOINT_CLIENT_SECRET")
-SHAREPOINT_TENANT_ID = os.getenv("SHAREPOINT_TENANT_ID")
 
 #Set up logging
-def setup_logging():
-    log_dir = 'logs'
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    log_file = os.path.join(log_dir, f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
-    
-    # Create formatters
-    file_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    console_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    
-    # Create file handler with UTF-8 encoding
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(file_formatter)
-    
+def setup_logging(log_to_file=True):
+    log_format = '%(asctime)s - %(levelname)s - %(message)s'
+    if ACCOUNT_NAME:
+        log_format = f'%(asctime)s - {ACCOUNT_NAME} - %(levelname)s - %(message)s'
+    console_formatter = logging.Formatter(log_format)
+
     # Create console handler with UTF-8 encoding for Windows
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(console_formatter)
-    
+    handlers = [console_handler]
+
+    log_file = None
+    if log_to_file:
+        log_dir = LOG_FOLDER or 'logs'
+        if not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+        log_file = os.path.join(log_dir, f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+
+        # Create file handler with UTF-8 encoding
+        file_formatter = logging.Formatter(log_format)
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setLevel(logging.INFO)
+        file_handler.setFormatter(file_formatter)
+        handlers.insert(0, file_handler)
+
     # Configure the root logger
     logging.basicConfig(
         level=logging.INFO,
-        handlers=[file_handler, console_handler]
+        handlers=handlers,
+        force=True
     )
-    
-    logger = logging.getLogger(__name__)
-    logger.info(f"Logging initialized. Log file: {log_file}")
-    return logger
 
-logger = setup_logging()
+    if log_file:
+        logger.info(f"Logging initialized. Log file: {log_file}")
+    return logger
 
 
 
-def archive_sharepoint_csvs():
-    """Separate function to archive existing CSVs before uploading new ones"""
+def archive_sharepoint_csvs(keep=(), patterns=None):
+    """Separate function to archive the CSVs superseded by this run's uploads"""
     try:
         logger.info("=" * 50)
         logger.info("ARCHIVING EXISTING CSV FILES")
@@ -87,21 +337,17 @@ def archive_sharepoint_csvs():
         logger.info(f"ARCHIVE: SHAREPOINT_CLIENT_ID = {'SET' if SHAREPOINT_CLIENT_ID else 'NOT SET'}")
         logger.info(f"ARCHIVE: SHAREPOINT_CLIENT_SECRET = {'SET' if SHAREPOINT_CLIENT_SECRET else 'NOT SET'}")
         
-        # Connect to SharePoint
-        credentials = ClientCredential(SHAREPOINT_CLIENT_ID, SHAREPOINT_CLIENT_SECRET)
-        ctx = ClientContext(SHAREPOINT_URL).with_credentials(credentials)
-        
-        # Archive existing CSV files
-        success = archive_existing_csvs(ctx, SHAREPOINT_FOLDER)
+        # Archive existing CSV files using the shared SharePoint session
+        success = archive_existing_csvs(sharepoint, SHAREPOINT_FOLDER, keep, patterns)
         
         if success:
             logger.info("=" * 50)
             logger.info("ARCHIVING COMPLETED SUCCESSFULLY")
             logger.info("=" * 50)
         else:
-            logger.warning("=" * 50)
-            logger.warning("ARCHIVING HAD ISSUES")
-            logger.warning("=" * 50)
+            logger.error("=" * 50)
+            logger.error("ARCHIVING FAILED")
+            logger.error("=" * 50)
         
         return success
     
@@ -111,97 +357,70 @@ def archive_sharepoint_csvs():
         logger.error(f"Traceback: {traceback.format_exc()}")
         return False
 
-# Just add these debug lines to your existing archive_existing_csvs function
-def archive_existing_csvs(ctx, relative_folder_url):
-    """Archive all CSV files in the SharePoint folder to an Archive subfolder, grouped by timestamp"""
+
+# Pull the _YYYYmmdd_HHMMSS suffix out of an uploaded report file name
+def archive_timestamp(file_properties):
+    match = ARCHIVE_TIMESTAMP_PATTERN.search(file_properties["Name"])
+    if match:
+        return match.group(1)
+    modified = str(file_properties.get("TimeLastModified") or "")
+    try:
+        return datetime.fromisoformat(modified.replace("Z", "+00:00")).strftime("%Y%m%d_%H%M%S")
+    except ValueError:
+        return "undated"
+
+
+def archive_existing_csvs(session, relative_folder_url, keep=(), patterns=None):
+    """Archive report files in the SharePoint folder to Archive/<timestamp>/ subfolders.
+
+    The folder is listed once with only the needed properties, files are
+    grouped by their timestamp suffix, and the subfolders and moves are sent
+    as batched requests, so wall time stays flat as the folder grows. Files
+    named in ``keep`` (the current version of each report) stay in place.
+    With ``patterns`` only file names matching one of them are archived.
+    """
     try:
         logger.info(f"ARCHIVE: Starting archive process for folder: {relative_folder_url}")
-        
-        # Verify web access
-        ctx.load(ctx.web)
-        ctx.execute_query()
-        logger.info(f"ARCHIVE: Connected to site: {ctx.web.properties['Title']}")
-        
-        # Load the target folder
-        target_folder = ctx.web.get_folder_by_server_relative_url(relative_folder_url)
-        ctx.load(target_folder)
-        ctx.load(target_folder.files)
-        
-        # ALSO load folders to see subfolders
-        ctx.load(target_folder.folders)
-        
-        ctx.execute_query()
-        
-        logger.info(f"ARCHIVE: Folder exists: {target_folder.exists}")
-        logger.info(f"ARCHIVE: Folder ServerRelativeUrl: {target_folder.serverRelativeUrl}")
-        
-        # Check for subfolders
-        logger.info(f"ARCHIVE: Number of subfolders: {len(target_folder.folders)}")
-        for subfolder in target_folder.folders:
-            logger.info(f"ARCHIVE: Subfolder found: {subfolder.properties.get('Name', 'Unknown')}")
-        
-        # Detailed file logging
-        logger.info(f"ARCHIVE: Files collection type: {type(target_folder.files)}")
-        logger.info(f"ARCHIVE: Files collection length: {len(target_folder.files)}")
-        
-        # Try to iterate through files with detailed logging
-        all_files = []
-        try:
-            for idx, f in enumerate(target_folder.files):
-                # Force load each file's properties
-                ctx.load(f)
-                ctx.execute_query()
-                
-                file_info = {
-                    'Index': idx,
-                    'Name': f.properties.get("Name", "Unknown"),
-                    'ServerRelativeUrl': f.properties.get("ServerRelativeUrl", "Unknown"),
-                    'Length': f.properties.get("Length", 0),
-                    'TimeLastModified': f.properties.get("TimeLastModified", "Unknown")
-                }
-                all_files.append(file_info)
-                logger.info(f"ARCHIVE: File {idx}: {file_info}")
-        except Exception as file_enum_error:
-            logger.error(f"ARCHIVE: Error enumerating files: {file_enum_error}")
-            import traceback
-            logger.error(f"ARCHIVE: Traceback: {traceback.format_exc()}")
-        
+
+        all_files = session.list_files(relative_folder_url)
         logger.info(f"ARCHIVE: Total files enumerated: {len(all_files)}")
-        
-        # Alternative method: Try using list items
-        logger.info("ARCHIVE: Attempting alternative method using list items...")
-        try:
-            # Get the parent list/library
-            list_title = "Documents"  # Default document library name
-            doc_library = ctx.web.lists.get_by_title(list_title)
-            
-            # Query for items in the specific folder
-            from office365.sharepoint.caml_query import CamlQuery
-            caml = CamlQuery()
-            caml.folder_server_relative_url = relative_folder_url
-            
-            items = doc_library.get_items(caml)
-            ctx.load(items)
-            ctx.execute_query()
-            
-            logger.info(f"ARCHIVE: List items found: {len(items)}")
-            for item in items:
-                logger.info(f"ARCHIVE: List item: {item.properties}")
-                
-        except Exception as list_error:
-            logger.error(f"ARCHIVE: List method failed: {list_error}")
-        
-        # Filter CSV files
-        csv_files = [f for f in target_folder.files if f.properties["Name"].lower().endswith(".csv")]
-        
-        if not csv_files:
-            logger.info(f"ARCHIVE: No CSV files to archive")
+
+        if not all_files:
+            # Folder.Files can come back empty for app-only contexts; query the library instead
+            logger.info("ARCHIVE: Folder listing is empty, querying the document library for the folder...")
+            try:
+                all_files = session.list_folder_items(relative_folder_url, extensions=ARCHIVE_EXTENSIONS)
+                logger.info(f"ARCHIVE: Library query found {len(all_files)} files")
+            except Exception as list_error:
+                logger.error(f"ARCHIVE: Library query failed: {list_error}")
+
+        keep = set(keep)
+        archive_files = [
+            f for f in all_files
+            if f["Name"].lower().endswith(ARCHIVE_EXTENSIONS) and f["Name"] not in keep
+            and (patterns is None or any(pattern.match(f["Name"]) for pattern in patterns))
+        ]
+
+        if not archive_files:
+            logger.info("ARCHIVE: No CSV files to archive")
             return True
-            
-        logger.info(f"ARCHIVE: Found {len(csv_files)} CSV files to archive")
-        
-        # ... rest of your existing archiving code ...
-        
+
+        groups = {}
+        for f in archive_files:
+            groups.setdefault(archive_timestamp(f), []).append(f)
+        logger.info(f"ARCHIVE: Found {len(archive_files)} files to archive in {len(groups)} timestamp groups")
+
+        archive_root = session.archive_folder_url
+        moves = [
+            (f["ServerRelativeUrl"], f"{archive_root}/{timestamp}/{f['Name']}")
+            for timestamp, files in groups.items()
+            for f in files
+        ]
+        session.move_files(moves, create_folders=[f"{archive_root}/{timestamp}" for timestamp in groups])
+
+        logger.info(f"ARCHIVE: Moved {len(moves)} files into {archive_root}")
+        return True
+
     except Exception as e:
         logger.error(f"ARCHIVE: Critical error: {e}")
         import traceback
@@ -209,34 +428,23 @@ def archive_existing_csvs(ctx, relative_folder_url):
         return False
 
 
-
-
 # Upload function with SharePoint path handling
-def upload_to_sharepoint(local_file_path, sharepoint_filename):
+def upload_to_sharepoint(local_file_path, sharepoint_filename, report_name=None):
     try:
-        logger.info(f"Starting SharePoint upload process...")
+        logger.info("Starting SharePoint upload process...")
         logger.info(f"Local file: {local_file_path}")
         logger.info(f"SharePoint filename: {sharepoint_filename}")
 
-        # Connect to SharePoint
-        credentials = ClientCredential(SHAREPOINT_CLIENT_ID, SHAREPOINT_CLIENT_SECRET)
-        ctx = ClientContext(SHAREPOINT_URL).with_credentials(credentials)
-        logger.info("SharePoint Client Credential authentication successful")
-
-        # Get target folder for upload
-        target_folder = ctx.web.get_folder_by_server_relative_url(SHAREPOINT_FOLDER)
-        ctx.load(target_folder)
-        ctx.execute_query()
-        
-        # Upload the new file
+        # Upload into the session's cached target folder (authenticates on first use)
         logger.info(f"Uploading file: {sharepoint_filename}")
-        with open(local_file_path, "rb") as content_file:
-            file_content = content_file.read()
-            target_folder.upload_file(sharepoint_filename, file_content)
-            ctx.execute_query()
+        with run_metrics.stage("upload", report_name, file=sharepoint_filename) as upload_stage:
+            stats = sharepoint.upload_file(local_file_path, sharepoint_filename) or {}
+            upload_stage["bytes"] = stats.get("bytes_sent", os.path.getsize(local_file_path))
+            upload_stage["chunks"] = stats.get("chunks", 1)
+            upload_stage["retries"] = stats.get("attempts", 1) - 1
 
         logger.info(f"Successfully uploaded: {sharepoint_filename}")
-        logger.info(f"SharePoint URL: {SHAREPOINT_URL}{SHAREPOINT_FOLDER}/{sharepoint_filename}")
+        logger.info(f"SharePoint URL: {sharepoint.file_url(sharepoint_filename)}")
         return True
 
     except Exception as e:
@@ -257,51 +465,12 @@ def get_token():
         logger.info(f"USERNAME value: {USERNAME}")
     if SYSTEM_ID:
         logger.info(f"SYSTEM_ID value: {SYSTEM_ID}")
-    if TOKEN:
-        logger.info("Attempting direct token authentication...")
-        auth_header = {"Authorization": f"bearer {TOKEN}"}
-
-    # Test the token with a simple API call
-
-    test_url = "https://wms.3plwinner.com/VeraCore/Public.Api/api/reports"
-
-    try:
-        logger.info(f"Testing direct token against: {test_url}")
-        test_response = requests.get(test_url, headers=auth_header, timeout=30)
-        logger.info(f"Direct token test - Status Code: {test_response.status_code}")
-        logger.info(f"Direct token test - Response Headers: {dict(test_response.headers)}")
-            
-        if test_response.status_code == 200:
-            logger.info("✓ Direct token authentication successful!")
-            return auth_header
-        else:
-            logger.warning(f"✗ Direct token failed - Response: {test_response.text[:500]}")
-    except Exception as e:
-        logger.warning(f"✗ Direct token test error: {str(e)}")
-
-
-
-
-    endpoint = 'https://wms.3plwinner.com/VeraCore/Public.Api/api/Login'
-
-    body = {
-        "userName" : USERNAME,
-        "password" : PASSWORD,
-        "systemId" : SYSTEM_ID
-    }
     try:
-        response = requests.post(endpoint, data=body, timeout=120)
-        if response.status_code != 200:
-            logger.error("Login Failed:", response.status_code, response.text)
-            return None
-        
-        token = response.json()["Token"]
-
-        auth_header = {
-            "Authorization" : "bearer "+ token
-        }
-
-        logger.info("Authentication Successful.")
+        with run_metrics.stage("token") as token_stage:
+            cached_token = token_manager.token
+            auth_header = token_manager.header()
+            token_stage["login"] = cached_token is None or cached_token != token_manager.token
+        logger.info("Authorization token ready")
         return auth_header
     except Exception as e:
         logger.error(f"Authentication error: {str(e)}")
@@ -309,14 +478,17 @@ def get_token():
 
 
 def start_report_task(report_name, filters, auth_header):
-    url = "https://wms.3plwinner.com/VeraCore/Public.Api/api/reports"
+    url = veracore.url("reports")
 
     payload = {
         "reportName": report_name,
         "filters": filters
     }
     try:
-        response = requests.post(url, json=payload, headers=auth_header, timeout=30)
+        with run_metrics.stage("start_task", report_name) as start_stage:
+            response = veracore.post(url, json=payload, headers=auth_header, timeout=30)
+            start_stage["retries"] = getattr(response, "retries", 0)
+            start_stage["ok"] = response.status_code == 200
         if response.status_code == 200:
             response_data = response.json()
             task_id = response_data["TaskId"]
@@ -330,127 +502,447 @@ def start_report_task(report_name, filters, auth_header):
         return None
     
 
-def run_report_task(report_name, filters, auth_header, output_csv_name):
-    logger.info(f"Processing report: {report_name}")
+# Queue a report task and block until the poller sees it finish
+def wait_for_report(report_name, filters, auth_header, deadline=None, on_queued=None):
     task_id = start_report_task(report_name, filters, auth_header)
     if not task_id:
-        print("Failed to start report task.")
-        return False
-    
-    status_url = f"https://wms.3plwinner.com/VeraCore/Public.Api/api/reports/{task_id}/status"
-    max_attempts = 20
-    for attempt in range(max_attempts):
-        try:
-            status_response = requests.get(status_url, headers=auth_header, timeout=90)
-            if status_response.status_code == 200:
-                status = status_response.json().get("Status")
-                if status == "Done":
-                    logger.info(f"Report Completed")
-                    break
-                elif status == "Request too Large":
-                    logger.error("Report Request too large: %s %s", status_response.status_code, status_response.text)
-                    return False
-                else:
-                    if attempt % 5 == 0:
-                        logger.info(f"Report status: {status} (attempt {attempt + 1})")
-                    time.sleep(3)
-            else:
-                logger.error(f"Status Check Failed: {status_response.status_code} {status_response.text}")
+        return None
+    if on_queued:
+        on_queued(task_id)
+    return report_poller.wait(report_poller.watch(task_id, report_name, auth_header, deadline))
+
+
+def run_report_task(report_name, filters, auth_header, output_csv_name, deadline=None, stream=None,
+                    partition=None, incremental=None):
+    """Pull one report and upload it, resuming from its checkpoint when an earlier run stopped part way.
+
+    A checkpoint for the same request (same filters and partitioning) lets
+    the run skip straight to the uploads still missing when the CSV is
+    already on disk, or pick up the queued VeraCore task by its TaskId
+    instead of queueing a new one.
+    """
+    logger.info(f"Processing report: {report_name}")
+    requested_filters, requested_partition = filters, partition
+
+    incremental = resolve_incremental(incremental)
+    window_start = None
+    full_path = os.path.join(DATA_FOLDER, output_csv_name)
+    if incremental:
+        watermark = watermarks.get(report_name)
+        if watermark and os.path.exists(full_path):
+            window_start = delta_window_start(watermark, incremental["lookback_days"])
+        if window_start:
+            logger.info(f"Incremental run of {report_name}: requesting {incremental['date_field']} from {window_start}")
+            window_end = datetime.now().date() + timedelta(days=1)
+            filters = list(filters) + date_range_filters(incremental["date_field"], window_start, window_end)
+            if partition is not False:
+                partition = dict(partition or {}, start=window_start)
+        else:
+            logger.info(f"No watermark for {report_name}, pulling the full report to seed {full_path}")
+
+    signature = request_signature(report_name, filters, partition)
+    checkpoint = checkpoints.get(report_name, signature) if REPORT_CHECKPOINTS else None
+
+    if checkpoint and checkpoint["stage"] == STAGE_PREPARED and os.path.exists(checkpoint["output_path"]):
+        output_path, row_count = checkpoint["output_path"], checkpoint["rows"]
+        logger.info(f"Resuming {report_name} from its checkpoint: {os.path.basename(output_path)} "
+                    f"({row_count} rows) is already downloaded, "
+                    f"{len(checkpoint['uploaded'])} upload(s) already done")
+        new_watermark = compute_watermark(full_path, incremental["date_field"]) if incremental else None
+    else:
+        resumed_task_id = checkpoint.get("task_id") if checkpoint else None
+
+        def record_queued(task_id):
+            if REPORT_CHECKPOINTS:
+                checkpoints.update(report_name, signature, stage=STAGE_QUEUED, task_id=task_id)
+
+        if resumed_task_id:
+            logger.info(f"Resuming {report_name} from its checkpoint: waiting for task {resumed_task_id}")
+            task = report_poller.wait(report_poller.watch(resumed_task_id, report_name, auth_header, deadline))
+            if task.status not in (STATUS_DONE, STATUS_TOO_LARGE):
+                logger.warning(f"Checkpointed task {resumed_task_id} of {report_name} is no longer usable "
+                               f"({task.status}), queueing a new one")
+                task = wait_for_report(report_name, filters, auth_header, deadline, on_queued=record_queued)
+        else:
+            task = wait_for_report(report_name, filters, auth_header, deadline, on_queued=record_queued)
+        if task is None:
+            print("Failed to start report task.")
+            return False
+
+        output_path = os.path.join(OUTPUT_FOLDER, output_csv_name)
+        if task.status == STATUS_DONE:
+            logger.info(f"Report Completed after {task.elapsed:.1f}s ({task.attempts} status checks)")
+            row_count = download_report(task.task_id, auth_header, output_path, stream, report_name)
+            if row_count is None and task.task_id == resumed_task_id:
+                # The checkpointed result may have expired on VeraCore: start over once with a new task
+                logger.warning(f"Could not download checkpointed task {resumed_task_id}, queueing a new one")
+                checkpoints.clear(report_name)
+                return run_report_task(report_name, requested_filters, auth_header, output_csv_name, deadline,
+                                       stream, requested_partition, incremental)
+        elif task.status == STATUS_TOO_LARGE:
+            partition = resolve_partition(partition)
+            if not partition:
+                logger.error("Report Request too large: %s", task.message)
                 return False
-                time.sleep(3)
-        except Exception as e:
-            logger.error(f"Exception checking report status: {str(e)}")
+            logger.warning(f"Report {report_name} is too large, splitting it by {partition['field']}")
+            row_count = run_partitioned_report(report_name, filters, auth_header, output_path, partition,
+                                               deadline, stream)
+        elif task.status == STATUS_TIMEOUT:
+            logger.error(f"Report timeout - {task.message}")
+            return False
+        else:
+            logger.error(task.message)
             return False
+
+        if row_count is None:
+            return False
+        logger.info(f"Report data saved to {output_csv_name} ({row_count} rows)")
+
+        new_watermark = None
+        if incremental:
+            try:
+                if window_start:
+                    row_count, delta_rows, removed_rows = merge_delta(
+                        full_path, output_path, window_start, incremental["key"], incremental["date_field"]
+                    )
+                    logger.info(f"Merged {delta_rows} changed rows into {full_path} "
+                                f"({removed_rows} removed, {row_count} total)")
+                else:
+                    seed_full_dataset(full_path, output_path)
+                shutil.copyfile(full_path, output_path)
+                new_watermark = compute_watermark(full_path, incremental["date_field"])
+            except Exception as e:
+                logger.error(f"Error merging incremental data for {report_name}: {str(e)}")
+                return False
+
+        record_snapshot(report_name, output_path)
+        if REPORT_CHECKPOINTS:
+            checkpoint = checkpoints.update(report_name, signature, stage=STAGE_PREPARED,
+                                            output_path=output_path, rows=row_count)
+
+    fingerprint = None
+    if UPLOAD_SKIP_UNCHANGED:
+        with run_metrics.stage("fingerprint", report_name) as fingerprint_stage:
+            fingerprint, fingerprint_stage["rows"] = fingerprint_csv(output_path)
+        if upload_manifest.is_unchanged(report_name, fingerprint, REPORT_OUTPUT_FORMATS):
+            logger.info(f"{output_csv_name} is unchanged since the last upload, skipping SharePoint upload")
+            upload_manifest.record_skip(report_name)
+            if not os.path.exists(change_baseline_path(output_csv_name)):
+                save_change_baseline(output_csv_name, output_path)
+            if new_watermark:
+                watermarks.set(report_name, new_watermark)
+            checkpoints.clear(report_name)
+            return True
+
+    # A resumed run re-sends the same file names so SharePoint does not end up with two copies
+    uploads = [tuple(upload) for upload in (checkpoint or {}).get("uploads") or []]
+    if not uploads or not all(os.path.exists(local_path) for local_path, _ in uploads):
+        uploads = plan_uploads(report_name, output_path, output_csv_name)
+        if REPORT_CHECKPOINTS:
+            checkpoint = checkpoints.update(report_name, signature, uploads=uploads)
+    already_uploaded = set((checkpoint or {}).get("uploaded") or [])
+
+    upload_results = []
+    for local_path, sharepoint_name in uploads:
+        if sharepoint_name in already_uploaded:
+            logger.info(f"{sharepoint_name} was uploaded by an earlier run, skipping it")
+            upload_results.append(True)
+            continue
+        uploaded = upload_to_sharepoint(local_path, sharepoint_name, report_name)
+        if uploaded and REPORT_CHECKPOINTS:
+            checkpoints.mark_uploaded(report_name, sharepoint_name)
+        upload_results.append(uploaded)
+    upload_success = all(upload_results)
+    if os.path.exists(output_csv_name):
+        os.remove(output_csv_name)
+        logger.info("Cleaned up local file")
+    if upload_success:
+        logger.info(f"Successfully uploaded {output_csv_name} to SharePoint")
+        upload_manifest.record_upload(report_name, fingerprint, row_count,
+                                      [sharepoint_name for _, sharepoint_name in uploads],
+                                      REPORT_OUTPUT_FORMATS)
+        save_change_baseline(output_csv_name, output_path)
+        if new_watermark:
+            watermarks.set(report_name, new_watermark)
+        checkpoints.clear(report_name)
+        return True
     else:
-        logger.error("Report timeout - did not complete within 90 seconds")
+        logger.error(f"Failed to upload {output_csv_name} to SharePoint, the next run resumes from the upload")
         return False
-    
+
+
+# Add the downloaded rows to the snapshot store (a failure here never fails the report)
+def record_snapshot(report_name, output_path):
+    if snapshots is None:
+        return None
     try:
-        report_url = f"https://wms.3plwinner.com/VeraCore/Public.Api/api/reports/{task_id}"
-        report_response = requests.get(report_url, headers=auth_header, timeout=90)
-        if report_response.status_code == 200:
-            report_data = report_response.json()["Data"]
-            df = pd.DataFrame(report_data)
-            output_path = os.path.join(OUTPUT_FOLDER, output_csv_name)
-            df.to_csv(output_path, index=False)
-            logger.info(f"Report data saved to {output_csv_name}")
-            basename = Path(output_csv_name).stem
-            timestamped_filename = f"{basename}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"
-
-
-            upload_success = upload_to_sharepoint(output_path, timestamped_filename)
-            if os.path.exists(output_csv_name):
-                os.remove(output_csv_name)
-                logger.info(f"Cleaned up local file")
-            if upload_success:
-                logger.info(f"Successfully uploaded {output_csv_name} to SharePoint")
-                return True
-            else:
-                logger.error(f"Failed to upload {output_csv_name} to SharePoint")
-                return False
+        with run_metrics.stage("snapshot", report_name) as snapshot_stage:
+            summary = snapshots.add_snapshot(report_name, output_path)
+            snapshot_stage["rows"] = summary["rows"]
+            snapshot_stage["changed_rows"] = summary["added"] + summary["changed"] + summary["removed"]
+        return summary
+    except Exception as e:
+        logger.error(f"Error recording snapshot of {report_name}: {str(e)}")
+        return None
+
+
+# Apply the snapshot retention policy for every report
+def compact_snapshots(reports_to_run):
+    if snapshots is None:
+        return
+    for report in reports_to_run:
+        try:
+            with run_metrics.stage("snapshot_compact", report["report_name"]):
+                snapshots.compact(report["report_name"], SNAPSHOT_RETENTION_DAYS, SNAPSHOT_DAILY_AFTER_DAYS)
+        except Exception as e:
+            logger.error(f"Error compacting snapshots of {report['report_name']}: {str(e)}")
 
-        else:
-            logger.error("Error retrieving report data: %s %s", report_response.status_code, report_response.text)
-            return False
 
+# Local files and timestamped SharePoint names to upload for one report (CSV, columnar, KPI and change feed)
+def plan_uploads(report_name, output_path, output_csv_name):
+    basename = Path(output_csv_name).stem
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    uploads = []
+    if "csv" in REPORT_OUTPUT_FORMATS:
+        uploads.append((output_path, f"{basename}_{timestamp}.csv"))
+    try:
+        with run_metrics.stage("columnar", report_name) as columnar_stage:
+            columnar_paths = write_columnar_outputs(output_path, REPORT_OUTPUT_FORMATS, REPORT_COLUMNAR_COMPRESSION)
+            columnar_stage["bytes_written"] = sum(os.path.getsize(path) for path in columnar_paths)
+        for columnar_path in columnar_paths:
+            uploads.append((columnar_path, f"{basename}_{timestamp}{Path(columnar_path).suffix}"))
     except Exception as e:
-        logger.error(f"Exception getting report data: {str(e)}")
-        return False
+        logger.error(f"Error writing columnar output for {report_name}: {str(e)}")
+    if "kpi" in REPORT_OUTPUT_FORMATS:
+        try:
+            with run_metrics.stage("kpi", report_name) as kpi_stage:
+                kpi_paths = write_kpi_outputs(output_path)
+                kpi_stage["bytes_written"] = sum(os.path.getsize(path) for path in kpi_paths)
+            for kpi_path in kpi_paths:
+                uploads.append((kpi_path, f"{Path(kpi_path).stem}_{timestamp}{Path(kpi_path).suffix}"))
+        except Exception as e:
+            logger.error(f"Error computing KPIs for {report_name}: {str(e)}")
+    if "changes" in REPORT_OUTPUT_FORMATS:
+        baseline_path = change_baseline_path(output_csv_name)
+        if os.path.exists(baseline_path):
+            changes_path = f"{os.path.splitext(output_path)[0]}_changes.csv"
+            try:
+                with run_metrics.stage("changes", report_name) as changes_stage:
+                    counts = write_change_feed(baseline_path, output_path, changes_path)
+                    changes_stage["rows"] = sum(counts.values())
+                uploads.append((changes_path, f"{basename}_changes_{timestamp}.csv"))
+            except Exception as e:
+                logger.error(f"Error computing the change feed for {report_name}: {str(e)}")
+        else:
+            logger.info(f"No previous extract of {report_name} yet, its change feed starts with the next run")
+    if not uploads:
+        uploads.append((output_path, f"{basename}_{timestamp}.csv"))
+    return uploads
+
 
-# Get data from APi endpoint
-def get_dataframe_from_api(endpoint, auth_header, name):
+# The last uploaded extract of a report, which the next run's change feed is computed against
+def change_baseline_path(output_csv_name):
+    return os.path.join(DATA_FOLDER, "baseline", output_csv_name)
+
+
+def save_change_baseline(output_csv_name, output_path):
+    if "changes" not in REPORT_OUTPUT_FORMATS:
+        return
+    baseline_path = change_baseline_path(output_csv_name)
     try:
-        logger.info(f"Fetching data from API endpoint: {endpoint}")
-        response = requests.get(endpoint, headers=auth_header)
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        shutil.copyfile(output_path, baseline_path)
+    except OSError as e:
+        logger.error(f"Error saving the change feed baseline {baseline_path}: {str(e)}")
+
+
+# Fill in the defaults for a report's partition settings (None when partitioning is disabled)
+def resolve_partition(partition):
+    if partition is False:
+        return None
+    partition = dict(partition or {})
+    partition.setdefault("field", REPORT_PARTITION_FIELD)
+    partition.setdefault("start", REPORT_PARTITION_START)
+    partition.setdefault("slices", REPORT_PARTITION_SLICES)
+    return partition
+
+
+# Fill in the defaults for a report's incremental settings (None when the report is pulled in full)
+def resolve_incremental(incremental):
+    if incremental is None:
+        incremental = REPORT_INCREMENTAL
+    if not incremental:
+        return None
+    incremental = dict(incremental) if isinstance(incremental, dict) else {}
+    incremental.setdefault("key", "Order ID")
+    incremental.setdefault("date_field", "Order Date")
+    incremental.setdefault("lookback_days", REPORT_INCREMENTAL_LOOKBACK_DAYS)
+    return incremental
+
+
+# Re-run a too large report as concurrent date slices and merge them into one CSV
+def run_partitioned_report(report_name, filters, auth_header, output_path, partition, deadline=None, stream=None):
+    """Split the report on partition['field'] into date slices and return the merged row count.
+
+    Slices that VeraCore still rejects as too large are split again until
+    they are a single day wide. Unless the filters already limit the field,
+    rows dated before the start or after the end are fetched as two edge
+    slices. Rows with no value in the field match no slice and are not
+    included. Returns None if any slice fails.
+    """
+    field = partition["field"]
+    start = parse_date(partition["start"])
+    end = parse_date(partition.get("end")) or (datetime.now().date() + timedelta(days=1))
+    base, ext = os.path.splitext(output_path)
+
+    def run_slice(date_slice):
+        slice_filters = list(filters) + date_range_filters(field, date_slice.start, date_slice.end)
+        task = wait_for_report(report_name, slice_filters, auth_header, deadline)
+        if task is None:
+            return SLICE_FAILED, None
+        if task.status == STATUS_TOO_LARGE:
+            return SLICE_TOO_LARGE, None
+        if task.status != STATUS_DONE:
+            logger.error(f"Slice {date_slice.label()} of {report_name} failed: {task.status} {task.message}")
+            return SLICE_FAILED, None
+        part_path = f"{base}.{date_slice.start:%Y%m%d}_{date_slice.end:%Y%m%d}{ext}"
+        row_count = download_report(task.task_id, auth_header, part_path, stream, report_name)
+        if row_count is None:
+            return SLICE_FAILED, None
+        logger.info(f"Slice {date_slice.label()} of {report_name}: {row_count} rows")
+        return SLICE_DONE, part_path
+
+    part_paths = run_partitioned(
+        run_slice,
+        start,
+        end,
+        initial_slices=partition["slices"],
+        max_workers=max(1, REPORT_WORKERS),
+        edges=not any(f.get("FilterName") == field for f in filters)
+    )
+    if part_paths is None:
+        logger.error(f"Partitioned run of {report_name} failed")
+        return None
+
+    row_count = merge_csv_parts(part_paths, output_path)
+    logger.info(f"Merged {len(part_paths)} slices of {report_name} into {os.path.basename(output_path)}")
+    return row_count
+
+
+# Download a finished report's Data rows to a CSV file
+def download_report(task_id, auth_header, output_path, stream=None, report_name=None):
+    """Save the report rows to output_path and return the row count, or None on failure.
+
+    In streaming mode the Data array is parsed incrementally from the response
+    body and written in bounded batches, so memory stays flat for any report size.
+    Otherwise building the DataFrame and writing the CSV is timed as its own stage.
+    """
+    if stream is None:
+        stream = REPORT_STREAMING
+    report_url = veracore.url(f"reports/{task_id}")
+    try:
+        with run_metrics.stage("download", report_name, task_id=task_id, streamed=stream) as download_stage:
+            with veracore.get(report_url, headers=auth_header, timeout=90, stream=stream) as report_response:
+                download_stage["retries"] = getattr(report_response, "retries", 0)
+                if report_response.status_code != 200:
+                    logger.error("Error retrieving report data: %s %s", report_response.status_code, report_response.text)
+                    download_stage["ok"] = False
+                    return None
+
+                if stream:
+                    row_count = stream_report_to_csv(report_response, output_path, chunk_rows=REPORT_WRITE_CHUNK_ROWS)
+                    download_stage["bytes"] = bytes_received(report_response)
+                    download_stage["rows"] = row_count
+                    download_stage["bytes_written"] = os.path.getsize(output_path)
+                    return row_count
+
+                report_data = report_response.json()["Data"]
+                download_stage["bytes"] = bytes_received(report_response)
+                download_stage["rows"] = len(report_data)
+
+        import pandas as pd
+
+        with run_metrics.stage("serialize", report_name, task_id=task_id) as serialize_stage:
+            df = pd.DataFrame(report_data)
+            df.to_csv(output_path, index=False)
+            serialize_stage["rows"] = len(df)
+            serialize_stage["bytes_written"] = os.path.getsize(output_path)
+        return len(df)
 
-        if response.status_code == 200:
-            data = response.json()
-            if isinstance(data, list) and all(isinstance(item, dict) for item in data):
-                df = pd.DataFrame(data)
-                filename = f"{name}.csv"
-                output_path = os.path.join(OUTPUT_FOLDER, filename)
-                df.to_csv(output_path, index=False)
-
-                if name == "available_reports_endpoint":
-                    logger.info(f"Skipping SharePoint upload for {filename}")
-                    if os.path.exists(output_path):
-                        os.remove(output_path)
-                        logger.info(f"Deleted local file: {output_path}")
-                    return True
-                
-                upload_success = upload_to_sharepoint(output_path, filename)
-                if os.path.exists(filename):
-                    os.remove(filename)
-                if upload_success:
-                    logger.info(f"Successfully uploaded {filename} to SharePoint")
-                    return True
-                else:
-                    logger.error(f"Failed to upload {filename} to SharePoint")
-                    return False
-            else:
-                logger.error(f"Unexpected data format: {name}")
-                return False
-        else:
-            logger.error(f"API Error for {name}: {response.status_code}")
-            return False
     except Exception as e:
-        logger.error(f"Exception fetching data from {name}: {str(e)}")
-        return False
+        logger.error(f"Exception getting report data: {str(e)}")
+        return None
 
+# Names in reports_to_run that are not in VeraCore's report catalog (empty when the catalog is unavailable)
+def find_unknown_reports(reports_to_run, auth_header):
+    with run_metrics.stage("catalog") as catalog_stage:
+        unknown = report_catalog.unknown([report["report_name"] for report in reports_to_run], veracore, auth_header)
+        catalog_stage["unknown"] = sorted(unknown)
+    for name in sorted(unknown):
+        logger.error(f"Report {name} is not in the VeraCore report catalog, check REPORTS_TO_RUN for a typo")
+    return unknown
 
-def main():
-    logger.info("=" * 50)
-    logger.info("Starting Veracore Data Pipeline")
-    logger.info(f"Execution time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info("=" * 50)
 
+# Run one entry of reports_to_run
+def run_report(report, auth_header):
+    return run_report_task(
+        report["report_name"],
+        report["filters"],
+        auth_header,
+        report["output_csv"],
+        deadline=report.get("deadline"),
+        stream=report.get("stream"),
+        partition=report.get("partition"),
+        incremental=report.get("incremental")
+    )
+
+
+# Run every report, concurrently when more than one worker is allowed
+def run_reports(reports_to_run, auth_header, max_workers=None):
+    """Run all report tasks and return the number that succeeded"""
+    max_workers = REPORT_WORKERS if max_workers is None else max_workers
+    total_reports = len(reports_to_run)
+    successful_reports = 0
+
+    if max_workers <= 1 or total_reports <= 1:
+        for i, report in enumerate(reports_to_run, 1):
+            logger.info(f"Processing report {i}/{total_reports}: {report['report_name']}")
+            success = run_report(report, auth_header)
+            if success:
+                successful_reports += 1
+        return successful_reports
+
+    workers = min(max_workers, total_reports)
+    logger.info(f"Running {total_reports} reports concurrently with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="report") as executor:
+        futures = {
+            executor.submit(run_report, report, auth_header): report
+            for report in reports_to_run
+        }
+        for finished, future in enumerate(as_completed(futures), 1):
+            report = futures[future]
+            try:
+                success = future.result()
+            except Exception as e:
+                logger.error(f"Unhandled error in report {report['report_name']}: {str(e)}")
+                success = False
+            logger.info(f"Finished report {finished}/{total_reports}: {report['report_name']} "
+                        f"({'success' if success else 'failed'})")
+            if success:
+                successful_reports += 1
+
+    return successful_reports
+
+
+# Make sure every credential the pipeline needs is configured
+def check_required_vars():
     required_vars = {
         "USERNAME": USERNAME,
         "PASSWORD": PASSWORD,
         "SYSTEM_ID": SYSTEM_ID,
         "SharePoint Client ID": SHAREPOINT_CLIENT_ID,
-        "SharePoint Client Secret": SHAREPOINT_CLIENT_SECRET,
-        "W_TOKEN": TOKEN
+        "SharePoint Client Secret": SHAREPOINT_CLIENT_SECRET
     }
     missing_vars = [var for var, value in required_vars.items() if not value]
     if missing_vars:
@@ -458,65 +950,217 @@ def main():
         logger.error("Make sure all GitHub Secrets are properly configured.")
         return False
     logger.info("All required environment variables are set.")
+    return True
+
+
+# Archive everything except the latest uploaded files of each report (reports that failed
+# or were skipped as unchanged keep their previous files in place). With only_these, files
+# of other reports are left alone: the daemon archives each report when it finishes, while
+# other reports may still be uploading files their manifest entries do not list yet.
+def archive_superseded_files(reports_to_run, only_these=False):
+    current_files = []
+    for report in reports_to_run:
+        entry = upload_manifest.get(report["report_name"])
+        if entry:
+            current_files.extend(entry.get("uploaded_files") or [])
+    patterns = [report_file_pattern(report["output_csv"]) for report in reports_to_run] if only_these else None
+    with archive_lock, run_metrics.stage("archive") as archive_stage:
+        archive_stage["ok"] = archive_sharepoint_csvs(keep=current_files, patterns=patterns)
+        return archive_stage["ok"]
+
+
+# SharePoint names plan_uploads gives a report's files: <basename>[_kpi_<table>|_changes]_<timestamp>.<ext>
+def report_file_pattern(output_csv_name):
+    basename = re.escape(Path(output_csv_name).stem)
+    return re.compile(rf"^{basename}_(?:(?:kpi_[a-z_]+|changes)_)?\d{{8}}_\d{{6}}\.[^.]+$")
+
+
+# Poller callback: one "poll" stage per finished report task
+def record_poll_metrics(task):
+    run_metrics.add("poll", task.elapsed, report=task.report_name, task_id=task.task_id,
+                    polls=task.attempts, status=task.status, ok=task.succeeded)
 
 
-    archive_sharepoint_csvs()
+# Append the run's stage timings to RUN_METRICS_FILE and refresh the Prometheus textfile
+# (job is the report name for a daemon job, so every report keeps its own gauges)
+def write_run_metrics(stages, started, success, job=None, **fields):
+    if veracore is not None and veracore.limiter is not None:
+        fields.setdefault("veracore_limiter", veracore.limiter.stats())
+    if ACCOUNT_NAME:
+        fields.setdefault("account", ACCOUNT_NAME)
+    record = build_run_record(stages, started, success, **fields)
+    try:
+        if RUN_METRICS_FILE:
+            append_jsonl(RUN_METRICS_FILE, record)
+        if RUN_METRICS_PROMETHEUS_FILE:
+            prometheus_textfile.write(RUN_METRICS_PROMETHEUS_FILE, record, job)
+    except Exception as e:
+        logger.error(f"Error writing run metrics: {str(e)}")
+    slowest = sorted(record["totals"].items(), key=lambda item: item[1]["seconds"], reverse=True)[:3]
+    logger.info(f"Run took {record['seconds']}s; slowest stages: "
+                + ", ".join(f"{name} {total['seconds']:.2f}s" for name, total in slowest))
+    return record
+
+
+def main(reports_to_run=None):
+    if not _initialized:
+        initialize()
+    reports_to_run = reports_to_run or REPORTS_TO_RUN
+    started = datetime.now()
+    run_metrics.drain()
+
+    logger.info("=" * 50)
+    logger.info("Starting Veracore Data Pipeline")
+    logger.info(f"Execution time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    logger.info("=" * 50)
+
+    if not check_required_vars():
+        return False
+
 
     auth_header = get_token()
     if auth_header:
         print("Authorization header obtained successfully.")
     else:
         logger.error("Failed to obtain authorization header.")
+        write_run_metrics(run_metrics.drain(), started, False, mode="batch",
+                          reports_total=len(reports_to_run), reports_succeeded=0)
         return False
     
-    endpoints = {
-    "available_reports_endpoint": "https://wms.3plwinner.com/VeraCore/Public.Api/api/reports", # GETS available reports
-    }
-
-    for name, url in endpoints.items():
-        get_dataframe_from_api(url, auth_header, name)
-
-
-    # List of reports to run
-    reports_to_run = [
-        {
-            "report_name": "ResideoDashboardOrderStatus",
-            "filters": [],
-            "output_csv": "OrderStatus.csv"
-        }
-    ]
+    # Reports VeraCore does not know fail here, before anything is queued
+    unknown_reports = find_unknown_reports(reports_to_run, auth_header)
+    runnable_reports = [report for report in reports_to_run if report["report_name"] not in unknown_reports]
 
-    successful_reports = 0
     total_reports = len(reports_to_run)
+    successful_reports = run_reports(runnable_reports, auth_header, REPORT_WORKERS)
 
-    for i, report in enumerate(reports_to_run, 1):
-        logger.info(f"Processing report {i}/{total_reports}: {report['report_name']}")
-        success = run_report_task(
-            report["report_name"],
-            report["filters"],
-            auth_header,
-            report["output_csv"]
-        )
-        if success:
-            successful_reports += 1
+    archive_superseded_files(reports_to_run)
+    compact_snapshots(reports_to_run)
+    write_run_metrics(run_metrics.drain(), started, successful_reports == total_reports, mode="batch",
+                      reports_total=total_reports, reports_succeeded=successful_reports)
 
     logger.info("=" * 50)
-    logger.info(f"Pipeline Summary:")
+    logger.info("Pipeline Summary:")
     logger.info(f"Successful reports: {successful_reports} / {total_reports}")
     logger.info(f"Completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     logger.info("=" * 50)
     return successful_reports == total_reports
 
 
-if __name__ == "__main__":
+# Refresh one report inside the long-running daemon
+def run_scheduled_report(report):
+    logger.info(f"Scheduled refresh of {report['report_name']} starting")
+    started = datetime.now()
+    auth_header = get_token()
+    if not auth_header:
+        logger.error("Failed to obtain authorization header.")
+        success = False
+    elif find_unknown_reports([report], auth_header):
+        success = False
+    else:
+        success = run_report(report, auth_header)
+        archive_superseded_files([report], only_these=True)
+        compact_snapshots([report])
+    write_run_metrics(run_metrics.drain(report["report_name"]), started, success, job=report["report_name"],
+                      mode="daemon", reports_total=1, reports_succeeded=int(bool(success)))
+    return success
+
+
+def run_daemon(reports_to_run=None):
+    """Stay resident and refresh each report on its own schedule.
+
+    The VeraCore session, token and SharePoint context stay warm between
+    runs. A report's "schedule" entry may be a number of minutes, a cron
+    string or {"interval_minutes": n} / {"cron": "..."}; reports without one
+    use DAEMON_CRON if set, otherwise every DAEMON_INTERVAL_MINUTES.
+    A report that is still running when it comes due again is skipped.
+    """
+    if not _initialized:
+        initialize()
+    reports_to_run = reports_to_run or REPORTS_TO_RUN
+
+    logger.info("=" * 50)
+    logger.info("Starting Veracore Data Pipeline daemon")
+    logger.info("=" * 50)
+    if not check_required_vars():
+        return False
+
+    scheduler = Scheduler(max_workers=max(1, REPORT_WORKERS))
+    default_schedule = DAEMON_CRON or DAEMON_INTERVAL_MINUTES
+    for report in reports_to_run:
+        scheduler.add_job(
+            report["report_name"],
+            parse_schedule(report.get("schedule", default_schedule), DAEMON_INTERVAL_MINUTES),
+            lambda report=report: run_scheduled_report(report)
+        )
+
+    def handle_stop(signum, frame):
+        logger.info(f"Received signal {signum}, stopping after running reports finish")
+        scheduler.stop()
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    return True
+
+
+# Print what a run would do without contacting VeraCore or SharePoint
+def describe_plan(reports_to_run=None, daemon=False):
+    reports_to_run = reports_to_run or REPORTS_TO_RUN
+    default_schedule = DAEMON_CRON or DAEMON_INTERVAL_MINUTES
+    print(f"Workers: {REPORT_WORKERS}, streaming: {REPORT_STREAMING}, incremental: {REPORT_INCREMENTAL}, "
+          f"formats: {', '.join(REPORT_OUTPUT_FORMATS)}")
+    print(f"SharePoint: {SHAREPOINT_URL}{SHAREPOINT_FOLDER or ''}")
+    for report in reports_to_run:
+        line = f"  {report['report_name']} -> {report['output_csv']} ({len(report.get('filters', []))} filter(s))"
+        if daemon:
+            line += f", {parse_schedule(report.get('schedule', default_schedule), DAEMON_INTERVAL_MINUTES)}"
+        print(line)
+
+
+def cli(argv=None):
+    """Command line entry point; returns the process exit code"""
+    parser = argparse.ArgumentParser(description="Pull VeraCore reports and upload them to SharePoint")
+    parser.add_argument("--daemon", action="store_true",
+                        help="stay resident and refresh reports on their schedules")
+    parser.add_argument("--check", action="store_true",
+                        help="validate the configuration and exit without contacting any service")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print the reports that would run and exit without contacting any service")
+    parser.add_argument("--accounts", metavar="FILE",
+                        help="run every account listed in this JSON file in parallel (see multi_account.py)")
+    args = parser.parse_args(argv)
+
+    if args.accounts:
+        from multi_account import run_accounts_file
+
+        return run_accounts_file(args.accounts)
+
+    if args.check or args.dry_run:
+        # No folders, log file or clients: only .env and the configuration are loaded
+        load_env()
+        load_config()
+        setup_logging(log_to_file=False)
+        if args.dry_run:
+            describe_plan(daemon=args.daemon)
+        return 0 if check_required_vars() else 1
+
     try:
-        success = main()
+        initialize()
+        success = run_daemon() if args.daemon else main()
         if success:
             logger.info("Pipeline Completed Successfully")
-            sys.exit(0)
-        else:
-            logger.error("Pipeline completed with errors!")
-            sys.exit(1)
+            return 0
+        logger.error("Pipeline completed with errors!")
+        return 1
     except Exception as e:
         logger.error(f"Critical error: {str(e)}")
-        sys.exit(1)
\ No newline at end of file
+        return 1
+    finally:
+        shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
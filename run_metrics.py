@@ -0,0 +1,181 @@
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+# Numeric stage fields summed into the per-run totals
+TOTAL_FIELDS = ("bytes", "rows", "retries", "polls")
+
+# Prefix of every metric in the Prometheus textfile
+PROMETHEUS_PREFIX = "veracore_pipeline"
+
+
+class RunMetrics:
+    """Thread-safe collector of per-stage timings for one pipeline run.
+
+    Every stage record holds the stage name, the report it belongs to (None
+    for run-wide stages such as the token), its duration and whatever
+    counters the stage sets: bytes transferred, rows, retries, polls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = []
+
+    @contextmanager
+    def stage(self, name, report=None, **fields):
+        """Time a block; the yielded dict takes extra fields (bytes, rows, retries, ...)"""
+        record = {"stage": name, "report": report, **fields}
+        started_at = datetime.now()
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception:
+            record["ok"] = False
+            raise
+        finally:
+            record.setdefault("ok", True)
+            self.add(name, time.perf_counter() - started, started_at=started_at, **record)
+
+    def add(self, name, seconds, report=None, started_at=None, **fields):
+        fields.pop("stage", None)
+        record = {
+            "stage": name,
+            "report": report,
+            "started_at": (started_at or datetime.now()).isoformat(timespec="milliseconds"),
+            "seconds": round(seconds, 4),
+            **fields,
+        }
+        with self._lock:
+            self._stages.append(record)
+        return record
+
+    def drain(self, report=None):
+        """Remove and return the collected stages (only ``report``'s and run-wide ones when given)"""
+        with self._lock:
+            if report is None:
+                taken, self._stages = self._stages, []
+            else:
+                taken = [s for s in self._stages if s["report"] in (report, None)]
+                self._stages = [s for s in self._stages if s["report"] not in (report, None)]
+        return taken
+
+
+def build_run_record(stages, started, success, **fields):
+    """One JSON-lines record for a run: run fields, every stage and per-stage totals"""
+    totals = {}
+    for stage in stages:
+        total = totals.setdefault(stage["stage"], {"count": 0, "seconds": 0.0})
+        total["count"] += 1
+        total["seconds"] = round(total["seconds"] + stage["seconds"], 4)
+        for field in TOTAL_FIELDS:
+            if isinstance(stage.get(field), (int, float)):
+                total[field] = total.get(field, 0) + stage[field]
+    finished = datetime.now()
+    return {
+        "run_id": uuid.uuid4().hex[:12],
+        "started_at": started.isoformat(timespec="seconds"),
+        "finished_at": finished.isoformat(timespec="seconds"),
+        "seconds": round((finished - started).total_seconds(), 3),
+        "success": bool(success),
+        **fields,
+        "totals": totals,
+        "stages": stages,
+    }
+
+
+def append_jsonl(path, record):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_prometheus(records):
+    """Render run records in the Prometheus text exposition format.
+
+    ``records`` maps a job to its latest record: None for a batch run, the
+    report name for a daemon job. Run-level gauges of a daemon job carry a
+    ``report`` label, and its run-wide stages are attributed to that report.
+    """
+    lines = []
+
+    def gauge(name, help_text, samples):
+        metric = f"{PROMETHEUS_PREFIX}_{name}"
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{_label_value(val)}"' for key, val in labels.items())
+            lines.append(f"{metric}{{{label_text}}} {value}" if label_text else f"{metric} {value}")
+
+    jobs = sorted(records.items(), key=lambda item: item[0] or "")
+
+    def job_labels(job):
+        return {"report": job} if job is not None else {}
+
+    gauge("last_run_timestamp_seconds", "Unix time the last run finished",
+          [(job_labels(job), round(datetime.fromisoformat(record["finished_at"]).timestamp())) for job, record in jobs])
+    gauge("last_run_seconds", "Wall time of the last run", [(job_labels(job), record["seconds"]) for job, record in jobs])
+    gauge("last_run_success", "1 if every report of the last run succeeded",
+          [(job_labels(job), int(record["success"])) for job, record in jobs])
+    succeeded = [(job_labels(job), record["reports_succeeded"]) for job, record in jobs if "reports_succeeded" in record]
+    if succeeded:
+        gauge("last_run_reports_succeeded", "Reports that succeeded in the last run", succeeded)
+
+    per_report = {}
+    for job, record in jobs:
+        for stage in record["stages"]:
+            key = (stage["stage"], stage["report"] or job or "")
+            entry = per_report.setdefault(key, {"seconds": 0.0})
+            entry["seconds"] += stage["seconds"]
+            for field in TOTAL_FIELDS:
+                if isinstance(stage.get(field), (int, float)):
+                    entry[field] = entry.get(field, 0) + stage[field]
+
+    def samples(field):
+        return [({"stage": stage, "report": report}, round(values[field], 4) if field == "seconds" else values[field])
+                for (stage, report), values in sorted(per_report.items()) if field in values]
+
+    gauge("stage_seconds", "Seconds spent in each stage during the last run", samples("seconds"))
+    gauge("stage_bytes", "Bytes transferred by each stage during the last run", samples("bytes"))
+    gauge("stage_rows", "Rows handled by each stage during the last run", samples("rows"))
+    gauge("stage_retries", "Retries made by each stage during the last run", samples("retries"))
+    gauge("stage_polls", "Status checks made while waiting for reports during the last run", samples("polls"))
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path, records):
+    """Write the records for node_exporter's textfile collector (atomically, as it requires)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Unique per process and thread, so concurrent writers never share a temporary file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(format_prometheus(records))
+    os.replace(tmp_path, path)
+
+
+class PrometheusTextfile:
+    """The Prometheus textfile of this process, holding the latest record of every job.
+
+    In daemon mode each report is its own job, so the file keeps every
+    report's last run instead of only the job that finished last. Writes
+    are serialized.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._path = None
+        self._records = {}
+
+    def write(self, path, record, job=None):
+        with self._lock:
+            if path != self._path:
+                self._path, self._records = path, {}
+            self._records[job] = record
+            write_prometheus_textfile(path, self._records)
@@ -0,0 +1,205 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class IntervalSchedule:
+    """Run every ``minutes`` minutes, the first time right away"""
+
+    def __init__(self, minutes):
+        if minutes <= 0:
+            raise ValueError("Interval must be positive")
+        self.interval = timedelta(minutes=minutes)
+
+    def next_after(self, moment, last_run=None):
+        if last_run is None:
+            return moment
+        return max(moment, last_run + self.interval)
+
+    def __repr__(self):
+        return f"every {self.interval.total_seconds() / 60:g} min"
+
+
+class CronSchedule:
+    """Standard five-field cron expression: minute hour day-of-month month day-of-week.
+
+    Supports ``*``, lists (``1,15``), ranges (``1-5``) and steps (``*/5``,
+    ``0-30/10``). Day-of-week is 0-6 with Sunday as 0 (7 is accepted too).
+    As in cron, when both day fields are restricted a day matches if either does.
+    """
+
+    _RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.expression = expression
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, self._RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        self.weekdays = {0 if d == 7 else d for d in weekdays}
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse_field(field, low, high):
+        values = set()
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+                if step <= 0:
+                    raise ValueError(f"Invalid cron step: {field!r}")
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start_text, end_text = part.split("-", 1)
+                start, end = int(start_text), int(end_text)
+            else:
+                start = int(part)
+                end = high if step > 1 else start
+            if start < low or end > high or start > end:
+                raise ValueError(f"Cron field out of range: {field!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, moment):
+        day_ok = moment.day in self.days
+        weekday_ok = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day and self.any_weekday:
+            return True
+        if self.any_day:
+            return weekday_ok
+        if self.any_weekday:
+            return day_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment, last_run=None):
+        """First matching minute at or after ``moment`` (and after ``last_run``)"""
+        candidate = moment.replace(second=0, microsecond=0)
+        if candidate < moment:
+            candidate += timedelta(minutes=1)
+        if last_run is not None and candidate <= last_run:
+            candidate = last_run.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+                continue
+            return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+    def __repr__(self):
+        return f"cron '{self.expression}'"
+
+
+def parse_schedule(schedule, default_minutes=60):
+    """Build a schedule from a report's "schedule" setting.
+
+    Accepts a number of minutes, a cron string, or a dict with
+    ``interval_minutes`` or ``cron``; None falls back to ``default_minutes``.
+    """
+    if schedule is None:
+        return IntervalSchedule(default_minutes)
+    if isinstance(schedule, (int, float)):
+        return IntervalSchedule(schedule)
+    if isinstance(schedule, str):
+        return CronSchedule(schedule)
+    if "cron" in schedule:
+        return CronSchedule(schedule["cron"])
+    return IntervalSchedule(schedule.get("interval_minutes", default_minutes))
+
+
+class ScheduledJob:
+    def __init__(self, name, schedule, run):
+        self.name = name
+        self.schedule = schedule
+        self.run = run
+        self.last_run = None
+        self.next_run = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+
+
+class Scheduler:
+    """Run jobs on their own schedules inside one long-lived process.
+
+    A job that is still running when it comes due again is skipped rather
+    than started twice. Jobs run on a small thread pool so slow reports do
+    not delay the others.
+    """
+
+    def __init__(self, max_workers=4, tick_seconds=1.0):
+        self.jobs = []
+        self.max_workers = max_workers
+        self.tick_seconds = tick_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def add_job(self, name, schedule, run):
+        job = ScheduledJob(name, schedule, run)
+        job.next_run = schedule.next_after(datetime.now())
+        self.jobs.append(job)
+        logger.info(f"Scheduled {name} ({schedule}), first run at {job.next_run:%Y-%m-%d %H:%M:%S}")
+        return job
+
+    def stop(self):
+        self._stop.set()
+
+    def run_forever(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job") as executor:
+            while not self._stop.is_set():
+                now = datetime.now()
+                for job in self.jobs:
+                    if job.next_run > now:
+                        continue
+                    with self._lock:
+                        if job.running:
+                            job.skipped += 1
+                            logger.warning(f"{job.name} is still running, skipping the run due at "
+                                           f"{job.next_run:%H:%M:%S}")
+                            job.next_run = job.schedule.next_after(now + timedelta(seconds=1), job.next_run)
+                            continue
+                        job.running = True
+                        job.last_run = now
+                        job.next_run = job.schedule.next_after(now + timedelta(seconds=1), now)
+                    executor.submit(self._run_job, job)
+                self._stop.wait(self._seconds_until_next(now))
+        logger.info("Scheduler stopped")
+
+    def _seconds_until_next(self, now):
+        if not self.jobs:
+            return self.tick_seconds
+        soonest = min(job.next_run for job in self.jobs)
+        return min(max((soonest - now).total_seconds(), 0.0), self.tick_seconds * 60)
+
+    def _run_job(self, job):
+        try:
+            success = job.run()
+            job.runs += 1
+            if not success:
+                job.failures += 1
+            logger.info(f"{job.name} finished ({'success' if success else 'failed'}), "
+                        f"next run at {job.next_run:%Y-%m-%d %H:%M:%S}")
+        except Exception as e:
+            job.failures += 1
+            logger.error(f"{job.name} raised: {str(e)}")
+        finally:
+            with self._lock:
+                job.running = False
@@ -0,0 +1,424 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FOLDER_NAME = "Archive"
+
+# File properties loaded when listing a folder
+FILE_PROPERTIES = ("Name", "ServerRelativeUrl", "Length", "TimeLastModified")
+
+# Document library queried by list_folder_items, and the list item field behind each file property
+DOCUMENT_LIBRARY_TITLE = "Documents"
+LIST_ITEM_FIELDS = {
+    "FileLeafRef": "Name",
+    "FileRef": "ServerRelativeUrl",
+    "File_x0020_Size": "Length",
+    "Modified": "TimeLastModified",
+}
+
+# Items per CAML page; SharePoint's list view threshold is 5000
+FOLDER_PAGE_SIZE = 500
+FOLDER_ROW_LIMIT = 5000
+
+# MoveOperations.Overwrite
+MOVE_OVERWRITE = 1
+
+# Files at or above this size are uploaded in chunks through an upload session
+LARGE_FILE_THRESHOLD = 10 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+
+
+class SharePointSession:
+    """One authenticated SharePoint ClientContext shared by archiving and uploads.
+
+    The context is created on first use and the target and archive folders
+    are resolved once and cached, so each upload afterwards is a single
+    request. ClientContext queues pending queries on the context itself, so
+    every build-and-execute sequence runs under ``lock``; that makes the
+    session safe to share between concurrent report workers.
+    """
+
+    def __init__(self, site_url, client_id, client_secret, folder_url, archive_folder_name=ARCHIVE_FOLDER_NAME,
+                 large_file_threshold=LARGE_FILE_THRESHOLD, chunk_size=UPLOAD_CHUNK_SIZE, upload_state_dir=None):
+        self.site_url = site_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.folder_url = folder_url
+        self.archive_folder_url = f"{folder_url.rstrip('/')}/{archive_folder_name}" if folder_url else None
+        self.large_file_threshold = large_file_threshold
+        self.chunk_size = chunk_size
+        self.upload_state_dir = upload_state_dir or os.path.join(os.getcwd(), "data", "uploads")
+        self.lock = threading.RLock()
+        self._ctx = None
+        self._folders = {}
+
+    @property
+    def ctx(self):
+        with self.lock:
+            if self._ctx is None:
+                # office365 pulls in a large dependency tree, so it is imported on first use
+                from office365.runtime.auth.client_credential import ClientCredential
+                from office365.sharepoint.client_context import ClientContext
+
+                credentials = ClientCredential(self.client_id, self.client_secret)
+                self._ctx = ClientContext(self.site_url).with_credentials(credentials)
+                logger.info("SharePoint Client Credential authentication successful")
+            return self._ctx
+
+    def get_folder(self, relative_url, create=False):
+        """Resolve a folder once and return the cached Folder object.
+
+        With ``create`` the folder is added if it does not exist yet (its
+        parent must exist); adding an existing folder returns it unchanged.
+        """
+        with self.lock:
+            folder = self._folders.get(relative_url)
+            if folder is None:
+                if create:
+                    # Web.ensure_folder_path in the pinned client only handles web-relative paths
+                    folder = self.ctx.web.folders.add(relative_url)
+                else:
+                    folder = self.ctx.web.get_folder_by_server_relative_url(relative_url)
+                    self.ctx.load(folder)
+                self.ctx.execute_query()
+                self._folders[relative_url] = folder
+            return folder
+
+    @property
+    def target_folder(self):
+        return self.get_folder(self.folder_url)
+
+    @property
+    def archive_folder(self):
+        return self.get_folder(self.archive_folder_url, create=True)
+
+    def list_files(self, relative_url=None, properties=FILE_PROPERTIES):
+        """List a folder's files in one request, loading only ``properties``"""
+        folder = self.get_folder(relative_url or self.folder_url)
+        with self.lock:
+            files = folder.files
+            self.ctx.load(files, list(properties))
+            self.ctx.execute_query()
+        return [f.properties for f in files]
+
+    def list_folder_items(self, relative_url=None, extensions=None, page_size=FOLDER_PAGE_SIZE,
+                          row_limit=FOLDER_ROW_LIMIT, list_title=DOCUMENT_LIBRARY_TITLE):
+        """List a folder's files with a CAML query on the document library, filtered on the server.
+
+        The query is scoped to the folder (files only, no subfolders), can be
+        limited to file ``extensions``, returns only the fields in
+        LIST_ITEM_FIELDS and is paged by item ID, so the cost follows the
+        folder's size rather than the library's. At most ``row_limit`` files
+        are returned, shaped like list_files() results. This also works when
+        Folder.Files comes back empty for an app-only context.
+        """
+        from office365.sharepoint.listitems.listitem_collection_position import ListItemCollectionPosition
+
+        caml_query = _paged_caml_query_class()
+        folder_url = relative_url or self.folder_url
+        select = "$select=" + ",".join(["ID"] + list(LIST_ITEM_FIELDS))
+        files = []
+        last_id = None
+        while len(files) < row_limit:
+            limit = min(page_size, row_limit - len(files))
+            query = caml_query(viewXml=folder_items_view_xml(limit, extensions), folderServerRelativeUrl=folder_url)
+            if last_id is not None:
+                query.ListItemCollectionPosition = ListItemCollectionPosition()
+                query.ListItemCollectionPosition.PagingInfo = f"Paged=TRUE&p_ID={last_id}"
+            with self.lock:
+                items = self.ctx.web.lists.get_by_title(list_title).get_items(query)
+                # GetItems ignores ViewFields, so the fields are selected on the request URL
+                self.ctx.before_execute(lambda request: setattr(request, "url", _add_query_option(request.url, select)))
+                self.ctx.execute_query()
+            page = [item.properties for item in items]
+            files.extend(_file_properties(properties) for properties in page)
+            if len(page) < limit:
+                break
+            last_id = page[-1].get("ID") or page[-1].get("Id")
+        return files
+
+    def move_files(self, moves, create_folders=(), batch_size=100):
+        """Move files with batched requests.
+
+        ``moves`` is a list of (source server-relative URL, destination
+        server-relative URL). The parents of ``create_folders`` are created
+        if needed, then the folders and after them the moves are sent
+        ``batch_size`` per batch.
+        """
+        with self.lock:
+            for parent_url in {folder_url.rstrip("/").rsplit("/", 1)[0] for folder_url in create_folders}:
+                self.get_folder(parent_url, create=True)
+            # ClientContext.execute_batch() sends every pending query at once, so chunks are queued one at a time
+            for start in range(0, len(create_folders), batch_size):
+                for folder_url in create_folders[start:start + batch_size]:
+                    self.ctx.web.folders.add(folder_url)
+                self.ctx.execute_batch()
+            for start in range(0, len(moves), batch_size):
+                results = [(source_url, self._queue_move(source_url, destination_url))
+                           for source_url, destination_url in moves[start:start + batch_size]]
+                self.ctx.execute_batch()
+                # A failed part of a batch does not raise; its error body is mapped onto the result
+                failed = [(source_url, result.value) for source_url, result in results
+                          if isinstance(result.value, dict) and "code" in result.value]
+                if failed:
+                    source_url, error = failed[0]
+                    raise RuntimeError(f"{len(failed)} of {len(results)} moves failed, first {source_url}: "
+                                       f"{(error.get('message') or {}).get('value', error['code'])}")
+
+    def _queue_move(self, source_url, destination_url):
+        """Queue File.moveto with a result to map the response onto.
+
+        The pinned client's batch parser maps every response body onto a
+        query result, and File.moveto() has none, so it is queued here.
+        """
+        from office365.runtime.client_result import ClientResult
+        from office365.runtime.queries.service_operation_query import ServiceOperationQuery
+
+        source = self.ctx.web.get_file_by_server_relative_url(source_url)
+        result = ClientResult(None)
+        parameters = {"newurl": destination_url, "flags": MOVE_OVERWRITE}
+        self.ctx.add_query(ServiceOperationQuery(source, "moveto", parameters, None, None, result))
+        return result
+
+    def upload_file(self, local_file_path, sharepoint_filename, folder=None):
+        """Upload a local file into the target folder (or ``folder``) and return upload stats.
+
+        Files at or above ``large_file_threshold`` go through upload_large_file;
+        smaller ones are sent in a single request.
+        """
+        folder = folder or self.target_folder
+        size = os.path.getsize(local_file_path)
+        # A file that fits in one chunk gains nothing from an upload session
+        if size >= self.large_file_threshold and size > self.chunk_size:
+            return self.upload_large_file(local_file_path, sharepoint_filename, folder)
+        return self._upload_whole_file(local_file_path, sharepoint_filename, folder)
+
+    def _upload_whole_file(self, local_file_path, sharepoint_filename, folder):
+        size = os.path.getsize(local_file_path)
+        started = time.monotonic()
+        with open(local_file_path, "rb") as content_file:
+            file_content = content_file.read()
+        with self.lock:
+            folder.upload_file(sharepoint_filename, file_content)
+            self.ctx.execute_query()
+        return self._upload_stats(sharepoint_filename, size, started, chunks=1, resumed_from=0)
+
+    def upload_large_file(self, local_file_path, sharepoint_filename, folder=None, max_attempts=3):
+        """Stream a file to SharePoint in ``chunk_size`` pieces through an upload session.
+
+        Progress (upload id and confirmed offset) is saved to a small state
+        file after every chunk. When a chunk fails, or the same local file is
+        uploaded under the same name again later, the saved session is
+        continued from the last confirmed offset; if SharePoint rejects the
+        saved session (expired, or the offset is stale) its state file is
+        deleted and a new session is started. Only one chunk is held in
+        memory at a time; a file that fits in one chunk is sent in a single
+        request instead.
+        """
+        folder = folder or self.target_folder
+        if os.path.getsize(local_file_path) <= self.chunk_size:
+            return self._upload_whole_file(local_file_path, sharepoint_filename, folder)
+        for attempt in range(1, max_attempts + 1):
+            try:
+                stats = self._upload_large_file(local_file_path, sharepoint_filename, folder)
+                stats["attempts"] = attempt
+                return stats
+            except Exception as e:
+                if attempt == max_attempts:
+                    raise
+                logger.warning(f"Chunked upload of {sharepoint_filename} interrupted (attempt {attempt}): {e}")
+                time.sleep(2 ** attempt)
+
+    def _upload_large_file(self, local_file_path, sharepoint_filename, folder):
+        from office365.runtime.client_request_exception import ClientRequestException
+
+        size = os.path.getsize(local_file_path)
+        state_path = self._upload_state_path(sharepoint_filename)
+        state = self._load_upload_state(state_path, local_file_path, size)
+        started = time.monotonic()
+        chunks = 0
+
+        target_file = None
+        if state:
+            try:
+                target_file = self._resume_target(folder, sharepoint_filename)
+                logger.info(f"Resuming upload of {sharepoint_filename} at byte {state['offset']} of {size}")
+            except Exception as e:
+                logger.warning(f"Could not resume upload of {sharepoint_filename}, restarting: {e}")
+                state = None
+        resumed_from = state["offset"] if state else 0
+
+        with open(local_file_path, "rb") as content_file:
+            while True:
+                if not state:
+                    state = {
+                        "upload_id": str(uuid.uuid4()),
+                        "offset": 0,
+                        "size": size,
+                        "mtime": os.path.getmtime(local_file_path),
+                        "local_file_path": os.path.abspath(local_file_path),
+                    }
+                    with self.lock:
+                        # Empty placeholder the upload session writes into
+                        target_file = folder.upload_file(sharepoint_filename, b"")
+                        self.ctx.execute_query()
+
+                content_file.seek(state["offset"])
+                chunk = content_file.read(self.chunk_size)
+                is_last = state["offset"] + len(chunk) >= size
+                try:
+                    with self.lock:
+                        if state["offset"] == 0:
+                            result = target_file.start_upload(state["upload_id"], chunk)
+                        elif is_last:
+                            target_file.finish_upload(state["upload_id"], state["offset"], chunk)
+                        else:
+                            result = target_file.continue_upload(state["upload_id"], state["offset"], chunk)
+                        self.ctx.execute_query()
+                except ClientRequestException as e:
+                    if not resumed_from or chunks:
+                        raise
+                    # The saved session is gone or its offset is stale: start over with a new one
+                    logger.warning(f"SharePoint rejected the saved upload session of {sharepoint_filename}, "
+                                   f"starting a new one: {e}")
+                    os.remove(state_path)
+                    state = None
+                    resumed_from = 0
+                    continue
+                chunks += 1
+                if is_last:
+                    break
+                state["offset"] = int(result.value)
+                self._save_upload_state(state_path, state)
+
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        return self._upload_stats(sharepoint_filename, size, started, chunks, resumed_from)
+
+    def _resume_target(self, folder, sharepoint_filename):
+        with self.lock:
+            target_file = folder.files.get_by_url(sharepoint_filename)
+            self.ctx.load(target_file)
+            self.ctx.execute_query()
+        return target_file
+
+    def _upload_state_path(self, sharepoint_filename):
+        return os.path.join(self.upload_state_dir, f"{sharepoint_filename}.upload.json")
+
+    def _load_upload_state(self, state_path, local_file_path, size):
+        """Return saved progress for this exact local file, or None"""
+        if not os.path.exists(state_path):
+            return None
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (state.get("size") != size
+                or state.get("mtime") != os.path.getmtime(local_file_path)
+                or state.get("local_file_path") != os.path.abspath(local_file_path)):
+            return None
+        return state
+
+    def _save_upload_state(self, state_path, state):
+        os.makedirs(self.upload_state_dir, exist_ok=True)
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+
+    def _upload_stats(self, sharepoint_filename, size, started, chunks, resumed_from):
+        seconds = max(time.monotonic() - started, 1e-6)
+        sent = size - resumed_from
+        stats = {
+            "file": sharepoint_filename,
+            "bytes": size,
+            "bytes_sent": sent,
+            "chunks": chunks,
+            "resumed_from": resumed_from,
+            "seconds": round(seconds, 3),
+            "mb_per_second": round(sent / seconds / (1024 * 1024), 3),
+        }
+        logger.info(f"Uploaded {sharepoint_filename}: {sent} bytes in {seconds:.2f}s "
+                    f"({stats['mb_per_second']} MB/s, {chunks} chunk(s)"
+                    f"{f', resumed at byte {resumed_from}' if resumed_from else ''})")
+        return stats
+
+    def file_url(self, sharepoint_filename):
+        return f"{self.site_url}{self.folder_url}/{sharepoint_filename}"
+
+    def reset(self):
+        """Forget the context and cached folders, e.g. after an authentication failure"""
+        with self.lock:
+            self._ctx = None
+            self._folders.clear()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            os.getenv("SHAREPOINT_URL"),
+            os.getenv("SHAREPOINT_CLIENT_ID"),
+            os.getenv("SHAREPOINT_CLIENT_SECRET"),
+            os.getenv("SHAREPOINT_FOLDER"),
+            large_file_threshold=int(os.getenv("SHAREPOINT_LARGE_UPLOAD_BYTES", str(LARGE_FILE_THRESHOLD))),
+            chunk_size=int(os.getenv("SHAREPOINT_UPLOAD_CHUNK_BYTES", str(UPLOAD_CHUNK_SIZE))),
+        )
+
+
+def folder_items_view_xml(row_limit, extensions=None):
+    """CAML view for one page of a folder's files, ordered by ID, optionally only the given extensions"""
+    where = ""
+    conditions = [
+        f'<Eq><FieldRef Name="File_x0020_Type" /><Value Type="Text">{ext.lstrip(".").lower()}</Value></Eq>'
+        for ext in extensions or ()
+    ]
+    if conditions:
+        condition = conditions[0]
+        for other in conditions[1:]:
+            condition = f"<Or>{condition}{other}</Or>"
+        where = f"<Where>{condition}</Where>"
+    view_fields = "".join(f'<FieldRef Name="{field}" />' for field in LIST_ITEM_FIELDS)
+    return (f'<View Scope="FilesOnly"><Query>{where}<OrderBy><FieldRef Name="ID" Ascending="TRUE" /></OrderBy>'
+            f'</Query><ViewFields>{view_fields}</ViewFields><RowLimit Paged="TRUE">{row_limit}</RowLimit></View>')
+
+
+@functools.lru_cache(maxsize=None)
+def _paged_caml_query_class():
+    """CamlQuery whose ListItemCollectionPosition is sent as an SP.ListItemCollectionPosition.
+
+    The client serializes a nested ClientValue under the operation's
+    parameter name and with its Python class name as the type, which
+    SharePoint rejects, so the position is rendered here instead.
+    """
+    from office365.sharepoint.listitems.caml.caml_query import CamlQuery
+
+    class PagedCamlQuery(CamlQuery):
+        def to_json(self):
+            json_value = super().to_json()
+            position = json_value.get("ListItemCollectionPosition")
+            if position is not None:
+                json_value["ListItemCollectionPosition"] = dict(
+                    position.to_json(), __metadata={"type": "SP.ListItemCollectionPosition"})
+            return json_value
+
+    return PagedCamlQuery
+
+
+def _add_query_option(url, option):
+    return f"{url}{'&' if '?' in url else '?'}{option}"
+
+
+def _file_properties(item_properties):
+    """Map list item fields to the file properties list_files() returns"""
+    file_properties = {name: item_properties.get(field) for field, name in LIST_ITEM_FIELDS.items()}
+    try:
+        file_properties["Length"] = int(file_properties["Length"])
+    except (TypeError, ValueError):
+        pass
+    return file_properties
@@ -0,0 +1,314 @@
+"""Row-level change store for report snapshots, kept in one SQLite file.
+
+Every run adds a snapshot, but only rows that are new, changed or removed
+since the previous snapshot are written. Each stored row version is valid
+from the snapshot that introduced it until the snapshot that replaced or
+removed it, so any kept snapshot can be rebuilt with one indexed query and
+an order's history is a lookup on (report, Order ID).
+
+    python snapshot_store.py list --report ResideoDashboardOrderStatus
+    python snapshot_store.py export --report ResideoDashboardOrderStatus --as-of "2026-01-20 12:00" --out old.csv
+    python snapshot_store.py history --report ResideoDashboardOrderStatus --order-id 8378181226
+    python snapshot_store.py import-folders --report ResideoDashboardOrderStatus --csv-name OrderStatus.csv
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEY = "Order ID"
+
+# Legacy per-run folders: output_YYYYmmdd_HHMMSS
+OUTPUT_FOLDER_PATTERN = re.compile(r"output_(\d{8}_\d{6})$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    added INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    removed INTEGER NOT NULL,
+    columns TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_report_taken ON snapshots (report, taken_at);
+
+CREATE TABLE IF NOT EXISTS versions (
+    report TEXT NOT NULL,
+    order_id TEXT NOT NULL,
+    valid_from INTEGER NOT NULL,
+    valid_to INTEGER,
+    row_hash TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_order ON versions (report, order_id, valid_from);
+CREATE INDEX IF NOT EXISTS versions_from ON versions (report, valid_from);
+CREATE INDEX IF NOT EXISTS versions_open ON versions (report, valid_to);
+"""
+
+
+def _row_hash(values):
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+class SnapshotStore:
+    """Snapshots of keyed report CSVs stored as row-level changes in SQLite"""
+
+    def __init__(self, path, key=DEFAULT_KEY):
+        self.path = path
+        self.key = key
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Connection that commits on success, rolls back on error and is always closed"""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            db.execute("PRAGMA journal_mode=WAL")
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def add_snapshot(self, report, csv_path, taken_at=None):
+        """Record csv_path as the report's newest snapshot and return its summary.
+
+        Rows are streamed from the CSV; only one hash per open order is held
+        in memory. When an order id appears more than once, its last row wins,
+        as in the pipeline's merges.
+        """
+        taken_at = taken_at or datetime.now()
+        with self._lock, self._connect() as db:
+            current = dict(db.execute(
+                "SELECT order_id, row_hash FROM versions WHERE report = ? AND valid_to IS NULL", (report,)
+            ))
+            with open(csv_path, newline="", encoding="utf-8") as csv_file:
+                reader = csv.reader(csv_file)
+                columns = next(reader, None) or []
+                if self.key not in columns:
+                    raise ValueError(f"{csv_path} has no {self.key} column")
+                key_index = columns.index(self.key)
+                # First pass: the last row of each order id, so duplicates are dropped before diffing
+                last_row = {}
+                for index, values in enumerate(reader):
+                    if values:
+                        last_row[values[key_index] if key_index < len(values) else ""] = index
+                csv_file.seek(0)
+                reader = csv.reader(csv_file)
+                next(reader)
+
+                cursor = db.execute(
+                    "INSERT INTO snapshots (report, taken_at, rows, added, changed, removed, columns) "
+                    "VALUES (?, ?, 0, 0, 0, 0, ?)",
+                    (report, taken_at.isoformat(timespec="seconds"), json.dumps(columns))
+                )
+                snapshot_id = cursor.lastrowid
+                rows = added = changed = 0
+                for index, values in enumerate(reader):
+                    if not values:
+                        continue
+                    values = values + [""] * (len(columns) - len(values))
+                    order_id = values[key_index]
+                    if last_row[order_id] != index:
+                        continue
+                    row_hash = _row_hash([columns[i] + "\x1e" + values[i] for i in range(len(columns))])
+                    data = json.dumps(dict(zip(columns, values)))
+                    rows += 1
+                    previous = current.get(order_id)
+                    if previous == row_hash:
+                        continue
+                    if previous is None:
+                        added += 1
+                    else:
+                        changed += 1
+                        db.execute("UPDATE versions SET valid_to = ? "
+                                   "WHERE report = ? AND order_id = ? AND valid_to IS NULL",
+                                   (snapshot_id, report, order_id))
+                    db.execute("INSERT INTO versions (report, order_id, valid_from, valid_to, row_hash, data) "
+                               "VALUES (?, ?, ?, NULL, ?, ?)", (report, order_id, snapshot_id, row_hash, data))
+
+            removed_ids = [order_id for order_id in current if order_id not in last_row]
+            db.executemany("UPDATE versions SET valid_to = ? WHERE report = ? AND order_id = ? AND valid_to IS NULL",
+                           [(snapshot_id, report, order_id) for order_id in removed_ids])
+            db.execute("UPDATE snapshots SET rows = ?, added = ?, changed = ?, removed = ? WHERE id = ?",
+                       (rows, added, changed, len(removed_ids), snapshot_id))
+
+        summary = {"snapshot_id": snapshot_id, "rows": rows, "added": added, "changed": changed,
+                   "removed": len(removed_ids)}
+        logger.info(f"Snapshot {snapshot_id} of {report}: {rows} rows, {added} added, {changed} changed, "
+                    f"{len(removed_ids)} removed")
+        return summary
+
+    def snapshots(self, report):
+        with self._connect() as db:
+            db.row_factory = sqlite3.Row
+            return [dict(row) for row in db.execute(
+                "SELECT id, taken_at, rows, added, changed, removed FROM snapshots WHERE report = ? ORDER BY id",
+                (report,)
+            )]
+
+    def snapshot_at(self, report, as_of=None):
+        """Id of the newest snapshot taken at or before ``as_of`` (the latest when None)"""
+        as_of = (as_of or datetime.now()).isoformat(timespec="seconds")
+        with self._connect() as db:
+            row = db.execute("SELECT id FROM snapshots WHERE report = ? AND taken_at <= ? ORDER BY id DESC LIMIT 1",
+                             (report, as_of)).fetchone()
+        return row[0] if row else None
+
+    def iter_snapshot(self, report, snapshot_id):
+        """Yield the rows (dicts) of a snapshot, rebuilt from the versions valid at that point"""
+        with self._connect() as db:
+            for (data,) in db.execute(
+                "SELECT data FROM versions WHERE report = ? AND valid_from <= ? "
+                "AND (valid_to IS NULL OR valid_to > ?) ORDER BY valid_from, rowid",
+                (report, snapshot_id, snapshot_id)
+            ):
+                yield json.loads(data)
+
+    def export_snapshot(self, report, output_path, as_of=None, snapshot_id=None):
+        """Write a past snapshot back out as a CSV and return its row count (None if there is none)"""
+        snapshot_id = snapshot_id or self.snapshot_at(report, as_of)
+        if snapshot_id is None:
+            return None
+        with self._connect() as db:
+            row = db.execute("SELECT columns FROM snapshots WHERE id = ? AND report = ?",
+                             (snapshot_id, report)).fetchone()
+        if row is None:
+            return None
+        row_count = 0
+        with open(output_path, "w", newline="", encoding="utf-8") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=json.loads(row[0]), extrasaction="ignore")
+            writer.writeheader()
+            for record in self.iter_snapshot(report, snapshot_id):
+                writer.writerow(record)
+                row_count += 1
+        return row_count
+
+    def order_history(self, report, order_id, start=None, end=None):
+        """Every version of one order that was valid at some point in [start, end].
+
+        When compact() has removed the snapshot a version starts or ends at,
+        the next retained snapshot's time is used instead.
+        """
+        start = start.isoformat(timespec="seconds") if start else ""
+        end = end.isoformat(timespec="seconds") if end else "9999"
+        next_retained = ("(SELECT s.taken_at FROM snapshots s WHERE s.report = v.report AND s.id > v.{} "
+                         "ORDER BY s.id LIMIT 1)")
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT valid_from_at, valid_to_at, data FROM ("
+                "SELECT v.valid_from, v.data, "
+                f"COALESCE(first.taken_at, {next_retained.format('valid_from')}) AS valid_from_at, "
+                f"CASE WHEN v.valid_to IS NOT NULL THEN COALESCE(last.taken_at, {next_retained.format('valid_to')}) "
+                "END AS valid_to_at "
+                "FROM versions v "
+                "LEFT JOIN snapshots first ON first.id = v.valid_from "
+                "LEFT JOIN snapshots last ON last.id = v.valid_to "
+                "WHERE v.report = ? AND v.order_id = ?) "
+                "WHERE valid_from_at <= ? AND (valid_to_at IS NULL OR valid_to_at > ?) ORDER BY valid_from",
+                (report, order_id, end, start)
+            ).fetchall()
+        return [{"valid_from": first, "valid_to": last, "row": json.loads(data)} for first, last, data in rows]
+
+    def compact(self, report, retention_days=90, daily_after_days=7, vacuum=False):
+        """Apply the retention policy and drop row versions no kept snapshot can see.
+
+        Snapshots older than ``retention_days`` are removed; between that and
+        ``daily_after_days`` only the last snapshot of each day is kept. The
+        latest snapshot is always kept. Returns (snapshots removed, versions removed).
+        """
+        now = datetime.now()
+        retention_cutoff = (now - timedelta(days=retention_days)).isoformat(timespec="seconds")
+        daily_cutoff = (now - timedelta(days=daily_after_days)).isoformat(timespec="seconds")
+        with self._lock, self._connect() as db:
+            snapshots = db.execute("SELECT id, taken_at FROM snapshots WHERE report = ? ORDER BY id",
+                                   (report,)).fetchall()
+            if not snapshots:
+                return 0, 0
+            latest_id = snapshots[-1][0]
+            last_of_day = {}
+            for snapshot_id, taken_at in snapshots:
+                last_of_day[taken_at[:10]] = snapshot_id
+            drop = [
+                snapshot_id for snapshot_id, taken_at in snapshots
+                if snapshot_id != latest_id and (
+                    taken_at < retention_cutoff
+                    or (taken_at < daily_cutoff and last_of_day[taken_at[:10]] != snapshot_id)
+                )
+            ]
+            db.executemany("DELETE FROM snapshots WHERE id = ?", [(snapshot_id,) for snapshot_id in drop])
+            versions_removed = db.execute(
+                "DELETE FROM versions WHERE report = ? AND valid_to IS NOT NULL AND NOT EXISTS ("
+                "SELECT 1 FROM snapshots s WHERE s.report = versions.report "
+                "AND s.id >= versions.valid_from AND s.id < versions.valid_to)",
+                (report,)
+            ).rowcount
+        if vacuum:
+            with self._connect() as db:
+                db.execute("VACUUM")
+        if drop or versions_removed:
+            logger.info(f"Compacted {report} snapshots: removed {len(drop)} snapshots and "
+                        f"{versions_removed} row versions")
+        return len(drop), versions_removed
+
+    def import_output_folders(self, report, csv_name, base_dir="."):
+        """Load legacy output_YYYYmmdd_HHMMSS/<csv_name> folders as snapshots, oldest first"""
+        imported = 0
+        for folder in sorted(glob.glob(os.path.join(base_dir, "output_*"))):
+            match = OUTPUT_FOLDER_PATTERN.search(os.path.basename(folder))
+            csv_path = os.path.join(folder, csv_name)
+            if not match or not os.path.exists(csv_path):
+                continue
+            self.add_snapshot(report, csv_path, taken_at=datetime.strptime(match.group(1), "%Y%m%d_%H%M%S"))
+            imported += 1
+        return imported
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the report snapshot store")
+    parser.add_argument("command", choices=["list", "export", "history", "compact", "import-folders"])
+    parser.add_argument("--db", default=os.path.join(os.getcwd(), "data", "snapshots.sqlite"))
+    parser.add_argument("--report", default="ResideoDashboardOrderStatus")
+    parser.add_argument("--as-of", help="ISO time for export (default: latest)")
+    parser.add_argument("--out", help="CSV path for export")
+    parser.add_argument("--order-id", help="order for history")
+    parser.add_argument("--start", help="ISO start time for history")
+    parser.add_argument("--end", help="ISO end time for history")
+    parser.add_argument("--csv-name", default="OrderStatus.csv", help="file name inside output_* folders")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    store = SnapshotStore(args.db)
+    if args.command == "list":
+        for snapshot in store.snapshots(args.report):
+            print(f"{snapshot['id']:>6}  {snapshot['taken_at']}  rows={snapshot['rows']}  +{snapshot['added']} "
+                  f"~{snapshot['changed']} -{snapshot['removed']}")
+    elif args.command == "export":
+        count = store.export_snapshot(args.report, args.out or f"{args.report}_snapshot.csv",
+                                      as_of=_parse_time(args.as_of))
+        print(f"Exported {count} rows" if count is not None else "No snapshot at that time")
+    elif args.command == "history":
+        for version in store.order_history(args.report, args.order_id, _parse_time(args.start), _parse_time(args.end)):
+            print(json.dumps(version))
+    elif args.command == "compact":
+        print(store.compact(args.report, vacuum=True))
+    else:
+        print(f"Imported {store.import_output_folders(args.report, args.csv_name)} folders")
@@ -0,0 +1,252 @@
+"""Synthetic ResideoDashboardOrderStatus data at any size.
+
+The rows follow the real extract: the same columns in the same order, the
+same date formats, the flag combinations that occur together with their
+observed shares (e.g. "S C " = shipped + complete), the carrier mix and
+the lines/units distributions of the January 2026 sample. Output is
+deterministic for a given seed, as CSV or in the VeraCore report JSON
+shape ({"Data": [...]}):
+
+    python synthetic_data.py --rows 1000000 --csv OrderStatus.csv --json OrderStatus.json
+"""
+import argparse
+import csv
+import json
+import random
+from datetime import datetime, timedelta
+
+from report_partition import parse_date
+
+COLUMNS = [
+    "Order ID",
+    "Order Status All",
+    "Unprocessed Order Flag",
+    "Pending Order Flag",
+    "Backordered Order Flag",
+    "Shipped Order Flag",
+    "Complete Order Flag",
+    "Canceled Order Flag",
+    "Order Date",
+    "Date Needed By",
+    "Rush Order",
+    "Total # of Product Lines Ordered",
+    "Total # of Product Units Ordered",
+    "Order Ship To Requested Freight Carrier",
+    "Date Completed",
+]
+
+# Order Status All, its flags (Unprocessed, Pending, Backordered, Shipped, Complete, Canceled) and weight;
+# backorders did not occur in the sample but are kept rare rather than absent
+STATES = [
+    ("S C ", ("1", "0", "0", "1", "1", "0"), 256),
+    ("P ", ("1", "1", "0", "0", "0", "0"), 92),
+    ("X C ", ("1", "0", "0", "0", "1", "1"), 20),
+    ("S X C ", ("1", "0", "0", "1", "1", "1"), 13),
+    ("P X ", ("1", "1", "0", "0", "0", "1"), 4),
+    ("B ", ("1", "0", "1", "0", "0", "0"), 3),
+]
+SHIPPED_STATE = STATES[0]
+CANCELED_STATE = STATES[2]
+
+CARRIERS = [
+    ("UPS", 190), ("DHL eCommerce", 135), ("Virtual Ve", 51), ("SAIA", 3),
+    ("YRC Inc", 2), ("Southwest", 2), ("FEDEX", 1), ("", 1),
+]
+LINES = [(1, 307), (2, 45), (3, 9), (4, 8), (5, 3), (6, 4), (7, 2), (8, 1), (10, 1), (14, 2)]
+ROUND_UNITS = [(100, 43), (20, 38), (200, 21), (300, 13), (40, 11), (50, 8), (10, 8), (500, 5), (1000, 3)]
+
+# Days from order to Date Needed By
+NEEDED_BY_DAYS = [(0, 7), (1, 19), (2, 14), (3, 15), (4, 13), (5, 4), (6, 4), (7, 16), (8, 5), (9, 3)]
+
+# Most orders arrive in the 08:00 and 15:30 batch imports, the rest during the working day
+IMPORT_WINDOWS = [(8 * 3600, 0.45), (15 * 3600 + 30 * 60, 0.25)]
+WORKDAY = (8 * 3600, 18 * 3600)
+
+# Default span of the generated orders is capped at about a year of working days
+MAX_DEFAULT_DAYS = 260
+
+FIRST_ORDER_ID = 8378181226
+RUSH_RATE = 0.01
+
+
+def _picker(rng, weighted):
+    values = [value for value, _ in weighted]
+    cum_weights = []
+    total = 0
+    for _, weight in weighted:
+        total += weight
+        cum_weights.append(total)
+    return lambda: rng.choices(values, cum_weights=cum_weights)[0]
+
+
+def _workdays(start, count):
+    days = []
+    day = start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def iter_rows(count, seed=0, start="2026-01-12", days=None, first_order_id=FIRST_ORDER_ID):
+    """Yield ``count`` OrderStatus rows (dicts in extract column order) over ``days`` working days.
+
+    ``days`` defaults to about 40 orders per working day as in the sample,
+    up to a year of working days; larger extracts get busier days instead.
+    """
+    rng = random.Random(seed)
+    pick_state = _picker(rng, [((status, flags), weight) for status, flags, weight in STATES])
+    pick_carrier = _picker(rng, CARRIERS)
+    pick_lines = _picker(rng, LINES)
+    pick_round_units = _picker(rng, ROUND_UNITS)
+    pick_needed_by = _picker(rng, NEEDED_BY_DAYS)
+
+    calendar = _workdays(datetime.combine(parse_date(start), datetime.min.time()), days or min(max(1, count // 40), MAX_DEFAULT_DAYS))
+    per_day = count / len(calendar)
+    order_id = first_order_id
+
+    for index in range(count):
+        day = calendar[min(int(index / per_day), len(calendar) - 1)]
+        roll = rng.random()
+        seconds = None
+        for window_start, share in IMPORT_WINDOWS:
+            if roll < share:
+                seconds = window_start + rng.randrange(180)
+                break
+            roll -= share
+        if seconds is None:
+            seconds = rng.randrange(*WORKDAY)
+        order_date = day + timedelta(seconds=seconds)
+
+        status, flags = pick_state()
+        lines = pick_lines()
+        unit_roll = rng.random()
+        if unit_roll < 0.05:
+            units = 0
+        elif unit_roll < 0.65:
+            units = pick_round_units()
+        else:
+            units = lines * rng.randint(1, 60)
+        completed = ""
+        if flags[4] == "1":
+            hours = min(rng.lognormvariate(3.4, 0.8), 24 * 21)
+            completed = (order_date + timedelta(hours=hours)).strftime("%m/%d/%Y %H:%M:%S")
+
+        yield {
+            "Order ID": str(order_id),
+            "Order Status All": status,
+            "Unprocessed Order Flag": flags[0],
+            "Pending Order Flag": flags[1],
+            "Backordered Order Flag": flags[2],
+            "Shipped Order Flag": flags[3],
+            "Complete Order Flag": flags[4],
+            "Canceled Order Flag": flags[5],
+            "Order Date": order_date.strftime("%m/%d/%Y %H:%M:%S"),
+            "Date Needed By": (order_date + timedelta(days=pick_needed_by())).strftime("%m/%d/%Y"),
+            "Rush Order": "1" if rng.random() < RUSH_RATE else "0",
+            "Total # of Product Lines Ordered": str(lines),
+            "Total # of Product Units Ordered": str(units),
+            "Order Ship To Requested Freight Carrier": pick_carrier(),
+            "Date Completed": completed,
+        }
+        order_id += 1 if rng.random() < 0.9 else rng.randint(2, 120)
+
+
+def write_csv(output_path, rows):
+    """Write dict rows to a CSV in extract column order and return the row count"""
+    count = 0
+    with open(output_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def iter_report_json(rows, batch_rows=1000):
+    """Text chunks of the VeraCore report body {"Data": [...]} for the given rows"""
+    yield '{"Data":['
+    batch = []
+    first = True
+    for row in rows:
+        batch.append(json.dumps(row))
+        if len(batch) >= batch_rows:
+            yield ("" if first else ",") + ",".join(batch)
+            first = False
+            batch = []
+    if batch:
+        yield ("" if first else ",") + ",".join(batch)
+    yield "]}"
+
+
+def write_report_json(output_path, rows):
+    with open(output_path, "w", encoding="utf-8") as f:
+        for chunk in iter_report_json(rows):
+            f.write(chunk)
+    return output_path
+
+
+def iter_next_extract(previous_path, seed=1, progress=0.3, removed=0.02, new_orders=0.05):
+    """Rows of the run after ``previous_path``: open orders move on, old ones drop off, new ones arrive.
+
+    A ``progress`` share of pending orders ship and complete (a few are
+    canceled instead), the oldest ``removed`` share of orders leaves the
+    extract and ``new_orders`` times the row count is appended.
+    """
+    rng = random.Random(seed)
+    # A first pass finds the size and the newest order so the rows can then be streamed
+    count = 0
+    last = None
+    with open(previous_path, newline="", encoding="utf-8") as f:
+        for last in csv.DictReader(f):
+            count += 1
+    if not count:
+        return
+
+    now = datetime.strptime(last["Order Date"], "%m/%d/%Y %H:%M:%S") + timedelta(days=1)
+    with open(previous_path, newline="", encoding="utf-8") as f:
+        for index, row in enumerate(csv.DictReader(f)):
+            if index < int(count * removed):
+                continue
+            if row["Complete Order Flag"] != "1" and rng.random() < progress:
+                status, flags, _ = CANCELED_STATE if rng.random() < 0.1 else SHIPPED_STATE
+                row.update(zip(COLUMNS[1:8], (status,) + flags))
+                row["Date Completed"] = (now - timedelta(minutes=rng.randrange(600))).strftime("%m/%d/%Y %H:%M:%S")
+            yield row
+
+    next_day = (now + timedelta(days=1)).strftime("%Y-%m-%d")
+    yield from iter_rows(int(count * new_orders), seed=seed, start=next_day,
+                         first_order_id=int(last["Order ID"]) + 1000)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic ResideoDashboardOrderStatus data")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2026-01-12", help="first order day")
+    parser.add_argument("--days", type=int, help="working days to spread the orders over (default: ~40 orders/day)")
+    parser.add_argument("--csv", help="write the rows as an extract CSV")
+    parser.add_argument("--json", help="write the rows as a VeraCore report body")
+    parser.add_argument("--next-from", metavar="CSV",
+                        help="instead of new data, write the run that follows this extract (to --csv)")
+    args = parser.parse_args(argv)
+
+    if args.next_from:
+        if not args.csv:
+            parser.error("--next-from needs --csv")
+        print(f"{write_csv(args.csv, iter_next_extract(args.next_from, seed=args.seed))} rows -> {args.csv}")
+        return 0
+    if not args.csv and not args.json:
+        parser.error("give --csv and/or --json")
+    if args.csv:
+        print(f"{write_csv(args.csv, iter_rows(args.rows, args.seed, args.start, args.days))} rows -> {args.csv}")
+    if args.json:
+        write_report_json(args.json, iter_rows(args.rows, args.seed, args.start, args.days))
+        print(f"{args.rows} rows -> {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
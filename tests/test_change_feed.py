@@ -0,0 +1,41 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from change_feed import CHANGE_NEW, CHANGE_REMOVED, CHANGE_TRANSITION, iter_changes
+
+
+class IterChangesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, rows):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows([["Order ID", "Order Status All"]] + rows)
+        return path
+
+    def changes(self, previous_rows, current_rows):
+        previous = self.write("previous.csv", previous_rows)
+        current = self.write("current.csv", current_rows)
+        return sorted((c["change"], c["Order ID"], c["status"]) for c in iter_changes(previous, current))
+
+    def test_new_changed_and_removed_orders(self):
+        self.assertEqual(self.changes([["1", "Pending"], ["2", "Pending"]], [["1", "Shipped"], ["3", "Pending"]]), [
+            (CHANGE_NEW, "3", "Pending"),
+            (CHANGE_REMOVED, "2", ""),
+            (CHANGE_TRANSITION, "1", "Shipped"),
+        ])
+
+    def test_duplicate_order_ids_in_the_current_extract_keep_the_last_row(self):
+        self.assertEqual(self.changes([["1", "Pending"], ["2", "Pending"]],
+                                      [["1", "Pending"], ["2", "Pending"], ["1", "Shipped"], ["2", "Pending"]]),
+                         [(CHANGE_TRANSITION, "1", "Shipped")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from multi_account import apply_account_env, load_accounts
+
+
+@unittest.skipUnless(importlib.util.find_spec("dotenv"), "python-dotenv is not installed")
+class AccountEnvTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmp.name, ".env.acme"), "w", encoding="utf-8") as f:
+            f.write("SYSTEM_ID=from-dotenv\nSHAREPOINT_FOLDER=from-dotenv\nSHAREPOINT_URL=from-dotenv\n")
+        self.accounts_path = os.path.join(self.tmp.name, "accounts.json")
+        with open(self.accounts_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "env": {"SYSTEM_ID": "from-shared", "SHAREPOINT_FOLDER": "from-shared",
+                        "SHAREPOINT_URL": "from-shared", "W_TOKEN": "from-shared"},
+                "accounts": [{"name": "acme", "dotenv": ".env.acme", "env": {"SYSTEM_ID": "from-account"}}],
+            }, f)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_account_env_then_dotenv_then_shared_env(self):
+        accounts, _ = load_accounts(self.accounts_path)
+        with mock.patch.dict(os.environ, clear=True):
+            apply_account_env(accounts[0])
+            self.assertEqual(os.environ["SYSTEM_ID"], "from-account")
+            self.assertEqual(os.environ["SHAREPOINT_FOLDER"], "from-dotenv")
+            self.assertEqual(os.environ["SHAREPOINT_URL"], "from-dotenv")
+            self.assertEqual(os.environ["W_TOKEN"], "from-shared")
+            self.assertEqual(os.environ["ACCOUNT_NAME"], "acme")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from report_catalog import ReportCatalog
+
+
+class FakeResponse:
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.headers = {}
+
+    def json(self):
+        return self.data
+
+
+class FakeClient:
+    def __init__(self, data):
+        self.data = data
+        self.calls = 0
+
+    def get(self, path, headers=None, timeout=None):
+        self.calls += 1
+        return FakeResponse(self.data)
+
+
+class ReportCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "report_catalog.json")
+        self.catalog = ReportCatalog(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_names_are_read_and_cached(self):
+        client = FakeClient([{"ReportName": "Orders"}, {"name": "Returns"}])
+        self.assertEqual(self.catalog.names(client, {}), {"Orders", "Returns"})
+        self.assertEqual(self.catalog.unknown(["Orders", "Missing"], client, {}), {"Missing"})
+        self.assertEqual(client.calls, 2)
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_entries_without_a_known_name_field_are_not_trusted(self):
+        client = FakeClient([{"Title": "Orders"}, {"Title": "Returns"}])
+        self.assertIsNone(self.catalog.names(client, {}))
+        self.assertEqual(self.catalog.unknown(["Orders"], client, {}), set())
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+import csv
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from report_partition import (
+    PARTITION_CEILING, PARTITION_FLOOR, SLICE_DONE, merge_csv_parts, run_partitioned,
+)
+
+
+class MergeCsvPartsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_part(self, name, rows):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(rows)
+        return path
+
+    def test_columns_that_differ_between_parts_are_kept(self):
+        parts = [
+            self.write_part("a.csv", [["Order ID", "Status"], ["1", "P"]]),
+            self.write_part("empty.csv", []),
+            self.write_part("b.csv", [["Status", "Order ID", "Carrier"], ["S", "2", "UPS"]]),
+            self.write_part("c.csv", [["Order ID", "Rush"], ["3", "1"]]),
+        ]
+        output_path = os.path.join(self.tmp.name, "merged.csv")
+        self.assertEqual(merge_csv_parts(parts, output_path), 3)
+        with open(output_path, newline="", encoding="utf-8") as f:
+            self.assertEqual(list(csv.reader(f)), [
+                ["Order ID", "Status", "Carrier", "Rush"],
+                ["1", "P", "", ""],
+                ["2", "S", "UPS", ""],
+                ["3", "", "", "1"],
+            ])
+        self.assertFalse(any(os.path.exists(part) for part in parts))
+
+
+class RunPartitionedTest(unittest.TestCase):
+    def test_edge_slices_cover_dates_outside_the_window(self):
+        ranges = []
+
+        def run_slice(date_slice):
+            ranges.append((date_slice.start, date_slice.end))
+            return SLICE_DONE, date_slice.label()
+
+        start, end = date(2020, 1, 1), date(2020, 1, 5)
+        run_partitioned(run_slice, start, end, initial_slices=2, max_workers=1, edges=True)
+        self.assertEqual(sorted(ranges), [
+            (PARTITION_FLOOR, start),
+            (start, date(2020, 1, 3)),
+            (date(2020, 1, 3), end),
+            (end, PARTITION_CEILING),
+        ])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import threading
+import unittest
+
+from rate_limit import CircuitOpenError
+from report_poller import STATUS_DONE, STATUS_ERROR, STATUS_TIMEOUT, ReportTaskPoller
+
+
+class FakeResponse:
+    def __init__(self, status, status_code=200):
+        self.status_code = status_code
+        self.text = status
+        self._status = status
+
+    def json(self):
+        return {"Status": self._status}
+
+
+class FakeBreaker:
+    def __init__(self, retry_in):
+        self._retry_in = retry_in
+
+    def retry_in(self):
+        return self._retry_in
+
+
+class FakeLimiter:
+    def __init__(self, retry_in):
+        self.breaker = FakeBreaker(retry_in)
+
+
+class FakeClient:
+    """Answers status checks from a list of responses or exceptions, repeating the last one"""
+
+    def __init__(self, answers, limiter=None):
+        self.answers = list(answers)
+        self.limiter = limiter
+        self.calls = 0
+
+    def url(self, path):
+        return path
+
+    def get(self, path, **kwargs):
+        self.calls += 1
+        self.kwargs = kwargs
+        answer = self.answers.pop(0) if len(self.answers) > 1 else self.answers[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class ReportTaskPollerTest(unittest.TestCase):
+    def make_poller(self, client, **kwargs):
+        poller = ReportTaskPoller(client, initial_interval=0.01, max_interval=0.02, max_errors=3, **kwargs)
+        self.addCleanup(poller.stop)
+        return poller
+
+    def test_done(self):
+        client = FakeClient([FakeResponse("Processing"), FakeResponse(STATUS_DONE)])
+        poller = self.make_poller(client)
+        task = poller.wait(poller.watch("t1", "Orders", {}), timeout=5)
+        self.assertEqual(task.status, STATUS_DONE)
+        self.assertEqual(task.attempts, 2)
+
+    def test_open_circuit_does_not_count_as_errors(self):
+        client = FakeClient([CircuitOpenError("open")] * 6 + [FakeResponse(STATUS_DONE)], limiter=FakeLimiter(0.02))
+        poller = self.make_poller(client)
+        task = poller.wait(poller.watch("t1", "Orders", {}), timeout=5)
+        self.assertEqual(task.status, STATUS_DONE)
+        self.assertEqual(task.errors, 0)
+        self.assertEqual(client.calls, 7)
+
+    def test_wait_gives_up_after_the_deadline_and_grace(self):
+        release = threading.Event()
+
+        class StuckClient(FakeClient):
+            def get(self, path, **kwargs):
+                release.wait()
+                return FakeResponse(STATUS_DONE)
+
+        poller = self.make_poller(StuckClient([]), wait_grace=0.1)
+        # Cleanups run last-in first-out: unblock the check before the poller is stopped
+        self.addCleanup(release.set)
+        task = poller.wait(poller.watch("t1", "Orders", {}, deadline=0.1))
+        self.assertEqual(task.status, STATUS_TIMEOUT)
+
+    def test_wait_returns_when_the_poller_thread_is_gone(self):
+        poller = self.make_poller(FakeClient([FakeResponse("Processing")]))
+        task = poller.watch("t1", "Orders", {}, deadline=60)
+        poller.stop()
+        task = poller.wait(task)
+        self.assertEqual(task.status, STATUS_ERROR)
+
+    def test_status_checks_use_a_short_timeout(self):
+        client = FakeClient([FakeResponse(STATUS_DONE)])
+        poller = self.make_poller(client, status_timeout=(1, 2))
+        poller.wait(poller.watch("t1", "Orders", {}), timeout=5)
+        self.assertEqual(client.kwargs["timeout"], (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from report_stream import iter_json_array, write_rows_to_csv
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+class WriteRowsToCsvTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "out.csv")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_header_from_first_row(self):
+        rows = [{"Order ID": "1", "Status": "P"}, {"Order ID": "2", "Status": "S"}]
+        self.assertEqual(write_rows_to_csv(rows, self.path), 2)
+        self.assertEqual(read_csv(self.path), [["Order ID", "Status"], ["1", "P"], ["2", "S"]])
+
+    def test_columns_first_seen_in_later_rows_are_kept(self):
+        rows = [
+            {"Order ID": "1", "Status": "P"},
+            {"Order ID": "2", "Status": "S", "Carrier": "UPS"},
+            {"Order ID": "3", "Carrier": "DHL", "Rush": "1"},
+        ]
+        self.assertEqual(write_rows_to_csv(rows, self.path, chunk_rows=1), 3)
+        self.assertEqual(read_csv(self.path), [
+            ["Order ID", "Status", "Carrier", "Rush"],
+            ["1", "P", "", ""],
+            ["2", "S", "UPS", ""],
+            ["3", "", "DHL", "1"],
+        ])
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_no_rows(self):
+        self.assertEqual(write_rows_to_csv([], self.path), 0)
+        self.assertEqual(read_csv(self.path), [])
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    def test_elements_split_across_chunks(self):
+        body = '{"Meta": {"n": 2}, "Data": [{"a": 1}, {"a": 22}]}'
+        chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+        self.assertEqual(list(iter_json_array(chunks)), [{"a": 1}, {"a": 22}])
+
+    def test_missing_key(self):
+        with self.assertRaises(KeyError):
+            list(iter_json_array(['{"Other": []}']))
+
+
+if __name__ == "__main__":
+    unittest.main()
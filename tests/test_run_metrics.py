@@ -0,0 +1,56 @@
+import os
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+from run_metrics import PrometheusTextfile, RunMetrics, build_run_record
+
+
+def daemon_record(report, seconds):
+    metrics = RunMetrics()
+    metrics.add("token", 0.1)
+    metrics.add("download", seconds, report=report, rows=10)
+    return build_run_record(metrics.drain(report), datetime.now(), True, mode="daemon", reports_succeeded=1)
+
+
+class PrometheusTextfileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "pipeline.prom")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_batch_run_has_unlabelled_run_gauges(self):
+        PrometheusTextfile().write(self.path, daemon_record("Orders", 2.0))
+        text = self.read()
+        self.assertIn("veracore_pipeline_last_run_success 1\n", text)
+        self.assertIn('veracore_pipeline_stage_seconds{stage="download",report="Orders"} 2.0\n', text)
+
+    def test_daemon_jobs_keep_every_reports_gauges(self):
+        textfile = PrometheusTextfile()
+        threads = [
+            threading.Thread(target=textfile.write, args=(self.path, daemon_record(f"Report{i}", float(i)), f"Report{i}"))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        textfile.write(self.path, daemon_record("Report0", 5.0), "Report0")
+
+        text = self.read()
+        for i in range(8):
+            self.assertIn(f'veracore_pipeline_last_run_success{{report="Report{i}"}} 1\n', text)
+            self.assertIn(f'veracore_pipeline_stage_seconds{{stage="token",report="Report{i}"}} 0.1\n', text)
+        self.assertIn('veracore_pipeline_stage_seconds{stage="download",report="Report0"} 5.0\n', text)
+        self.assertEqual(os.listdir(self.tmp.name), ["pipeline.prom"])
+
+
+if __name__ == "__main__":
+    unittest.main()
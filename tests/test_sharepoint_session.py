@@ -0,0 +1,136 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+from fake_services import FakeServiceServer, FakeSharePointSession
+
+
+@unittest.skipUnless(importlib.util.find_spec("office365"), "office365-rest-python-client is not installed")
+class SharePointSessionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = FakeServiceServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.sharepoint = self.server.sharepoint
+        self.sharepoint.reset()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.session = FakeSharePointSession(self.server.sharepoint_url, large_file_threshold=1000, chunk_size=300,
+                                             upload_state_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_local(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(content)
+        return path
+
+    def stored(self, name):
+        return self.sharepoint.files[f"{self.session.folder_url}/{name}"]["content"]
+
+    def test_small_file_is_uploaded_in_one_request(self):
+        path = self.write_local("small.csv", b"x" * 100)
+        stats = self.session.upload_file(path, "Small_20260101_080000.csv")
+        self.assertEqual(stats["chunks"], 1)
+        self.assertEqual(self.stored("Small_20260101_080000.csv"), b"x" * 100)
+        self.assertNotIn("POST startUpload", self.sharepoint.counts)
+
+    def test_large_file_is_uploaded_in_chunks(self):
+        content = bytes(range(256)) * 5
+        path = self.write_local("large.csv", content)
+        stats = self.session.upload_file(path, "Large_20260101_080000.csv")
+        self.assertEqual(stats["chunks"], 5)
+        self.assertEqual(self.stored("Large_20260101_080000.csv"), content)
+        self.assertEqual(self.sharepoint.counts["POST continueUpload"], 3)
+        self.assertEqual(os.listdir(self.tmp.name), ["large.csv"])
+
+    def test_large_file_that_fits_in_one_chunk(self):
+        session = FakeSharePointSession(self.server.sharepoint_url, large_file_threshold=10, chunk_size=5000,
+                                        upload_state_dir=self.tmp.name)
+        content = bytes(range(256)) * 5
+        path = self.write_local("large.csv", content)
+        session.upload_large_file(path, "Large.csv")
+        self.assertEqual(self.stored("Large.csv"), content)
+        self.assertNotIn("POST startUpload", self.sharepoint.counts)
+
+    def test_rejected_saved_session_starts_a_new_one(self):
+        content = bytes(range(256)) * 5
+        path = self.write_local("large.csv", content)
+        self.sharepoint.add_file(f"{self.session.folder_url}/Large.csv")
+        with open(os.path.join(self.tmp.name, "Large.csv.upload.json"), "w", encoding="utf-8") as f:
+            json.dump({"upload_id": "expired", "offset": 300, "size": len(content),
+                       "mtime": os.path.getmtime(path), "local_file_path": os.path.abspath(path)}, f)
+        stats = self.session.upload_file(path, "Large.csv")
+        self.assertEqual(stats["resumed_from"], 0)
+        self.assertEqual(self.stored("Large.csv"), content)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, "Large.csv.upload.json")))
+
+    def test_folder_items_are_paged(self):
+        names = [f"Report{i}_20260101_080000.{'csv' if i % 4 else 'json'}" for i in range(12)]
+        for name in names:
+            self.sharepoint.add_file(f"{self.session.folder_url}/{name}", b"x")
+        self.sharepoint.add_file(f"{self.session.archive_folder_url}/Old_20250101_080000.csv", b"x")
+
+        items = self.session.list_folder_items(extensions=(".csv",), page_size=4)
+        self.assertEqual([item["Name"] for item in items], [name for name in names if name.endswith(".csv")])
+        self.assertEqual(items[0]["ServerRelativeUrl"], f"{self.session.folder_url}/{names[1]}")
+        self.assertEqual(self.sharepoint.counts["POST GetItems"], 3)
+
+        self.assertEqual(len(self.session.list_folder_items(page_size=5, row_limit=7)), 7)
+
+    def test_fake_accepts_any_position_shape_sharepoint_accepts(self):
+        for name in ("a.csv", "b.csv", "c.csv"):
+            self.sharepoint.add_file(f"{self.session.folder_url}/{name}", b"x")
+        first_id = self.sharepoint.files[f"{self.session.folder_url}/a.csv"]["id"]
+
+        def get_items(position):
+            payload = {"query": {"ViewXml": '<View Scope="FilesOnly"><RowLimit>10</RowLimit></View>',
+                                 "FolderServerRelativeUrl": self.session.folder_url,
+                                 "ListItemCollectionPosition": position}}
+            return self.sharepoint.handle(
+                "POST", "sites/Fake/_api/Web/lists/GetByTitle('Documents')/GetItems", {},
+                {"Authorization": "Bearer token", "X-RequestDigest": "digest"}, json.dumps(payload).encode())
+
+        paging = f"Paged=TRUE&p_ID={first_id}"
+        typed = {"__metadata": {"type": "SP.ListItemCollectionPosition"}, "PagingInfo": paging}
+        for position in (typed, {"PagingInfo": paging}):
+            status, body = get_items(position)
+            self.assertEqual(status, 200)
+            self.assertEqual([item["FileLeafRef"] for item in body["d"]["results"]], ["b.csv", "c.csv"])
+        for position in ({"__metadata": {"type": "ListItemCollectionPosition"}, "PagingInfo": paging},
+                         {"PagingInfo": paging, "Unknown": 1}):
+            self.assertEqual(get_items(position)[0], 400)
+
+    def test_moves_are_sent_in_batches(self):
+        archive_url = f"{self.session.archive_folder_url}/20260101_080000"
+        moves = []
+        for i in range(5):
+            url = f"{self.session.folder_url}/Report{i}_20260101_080000.csv"
+            self.sharepoint.add_file(url, b"%d" % i)
+            moves.append((url, f"{archive_url}/Report{i}_20260101_080000.csv"))
+        self.session.move_files(moves, create_folders=[archive_url], batch_size=2)
+        self.assertEqual(sorted(self.sharepoint.files), [destination for _, destination in moves])
+        self.assertEqual(self.sharepoint.counts["POST $batch"], 1 + 3)
+        self.assertIn(archive_url, self.sharepoint.folders)
+
+    def test_failed_move_is_reported(self):
+        archive_url = f"{self.session.archive_folder_url}/20260101_080000"
+        present = f"{self.session.folder_url}/Present.csv"
+        self.sharepoint.add_file(present, b"1")
+        moves = [(present, f"{archive_url}/Present.csv"),
+                 (f"{self.session.folder_url}/Missing.csv", f"{archive_url}/Missing.csv")]
+        with self.assertRaisesRegex(RuntimeError, "1 of 2 moves failed.*Missing.csv"):
+            self.session.move_files(moves, create_folders=[archive_url])
+        self.assertIn(f"{archive_url}/Present.csv", self.sharepoint.files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import csv
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from snapshot_store import SnapshotStore
+
+
+class SnapshotStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SnapshotStore(os.path.join(self.tmp.name, "snapshots.sqlite"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add(self, rows, taken_at=None):
+        path = os.path.join(self.tmp.name, "extract.csv")
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows([["Order ID", "Status"]] + rows)
+        return self.store.add_snapshot("Orders", path, taken_at=taken_at)
+
+    def test_duplicate_order_ids_keep_the_last_row(self):
+        self.add([["1", "Pending"], ["2", "Pending"]])
+        summary = self.add([["1", "Pending"], ["2", "Pending"], ["1", "Shipped"]])
+        self.assertEqual((summary["rows"], summary["added"], summary["changed"]), (2, 0, 1))
+        snapshot_id = self.store.snapshot_at("Orders")
+        self.assertEqual(sorted((row["Order ID"], row["Status"]) for row in self.store.iter_snapshot("Orders", snapshot_id)),
+                         [("1", "Shipped"), ("2", "Pending")])
+
+    def test_duplicate_order_ids_in_the_first_extract(self):
+        summary = self.add([["1", "Pending"], ["1", "Shipped"]])
+        self.assertEqual((summary["rows"], summary["added"]), (1, 1))
+        history = self.store.order_history("Orders", "1")
+        self.assertEqual([version["row"]["Status"] for version in history], ["Shipped"])
+
+    def test_order_history_after_compact(self):
+        now = datetime.now().replace(microsecond=0)
+        self.add([["1", "Pending"]], taken_at=now - timedelta(days=100))
+        self.add([["1", "Pending"], ["2", "Pending"]], taken_at=now - timedelta(days=50))
+        self.add([["1", "Shipped"], ["2", "Pending"]], taken_at=now)
+        self.assertEqual(self.store.compact("Orders"), (1, 0))
+
+        history = self.store.order_history("Orders", "1")
+        self.assertEqual([version["row"]["Status"] for version in history], ["Pending", "Shipped"])
+        # The version's first snapshot was compacted away: it starts at the earliest retained one
+        self.assertEqual(history[0]["valid_from"], (now - timedelta(days=50)).isoformat())
+        self.assertEqual(history[0]["valid_to"], now.isoformat())
+        self.assertIsNone(history[1]["valid_to"])
+
+
+if __name__ == "__main__":
+    unittest.main()
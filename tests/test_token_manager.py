@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from token_manager import TokenManager
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, data):
+        self.data = data
+        self.text = json.dumps(data)
+
+    def json(self):
+        return self.data
+
+
+class FakeClient:
+    def __init__(self):
+        self.logins = []
+
+    def post(self, path, data=None, timeout=None):
+        self.logins.append(data["userName"])
+        return FakeResponse({"Token": f"token-{data['userName']}-{len(self.logins)}"})
+
+
+class TokenManagerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp.name, "veracore_token.json")
+        self.client = FakeClient()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def manager(self, username, system_id="SYS"):
+        return TokenManager(self.client, username, "secret", system_id, self.cache_path)
+
+    def test_cached_token_is_reused_by_the_same_user(self):
+        first = self.manager("alice").header()
+        self.assertEqual(self.manager("alice").header(), first)
+        self.assertEqual(self.client.logins, ["alice"])
+
+    def test_users_of_the_same_system_do_not_share_tokens(self):
+        alice = self.manager("alice").header()
+        bob = self.manager("bob").header()
+        self.assertNotEqual(alice, bob)
+        self.assertEqual(self.manager("alice").header(), alice)
+        self.assertEqual(self.manager("bob").header(), bob)
+        self.assertEqual(self.client.logins, ["alice", "bob"])
+
+    def test_single_entry_cache_of_another_user_is_ignored(self):
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump({"token": "old", "issued_at": datetime.now().isoformat(timespec="seconds"),
+                       "expires_at": "2999-01-01T00:00:00", "username": "alice", "system_id": "SYS"}, f)
+        self.assertEqual(self.manager("alice").header(), {"Authorization": "bearer old"})
+        self.assertEqual(self.manager("bob").header(), {"Authorization": "bearer token-bob-1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# VeraCore does not return an expiry with the token, so assume this lifetime unless told otherwise
+DEFAULT_TOKEN_TTL = timedelta(hours=12)
+
+# Log in again this long before the assumed expiry
+DEFAULT_REFRESH_MARGIN = timedelta(minutes=30)
+
+# Login response fields that may carry an explicit expiry
+_EXPIRY_FIELDS = ("Expires", "ExpirationDate", "ExpiresOn", "expires")
+
+
+class TokenManager:
+    """Thread-safe VeraCore token cache with expiry tracking.
+
+    The token, when it was issued and when it is assumed to expire are kept
+    in a small JSON file so later runs (and other processes) can reuse it
+    without a probe request. Entries are keyed on system and user name, so
+    accounts sharing the file never pick up each other's token. A fresh token is handed out straight from the
+    cache; within ``refresh_margin`` of expiry, or after the server rejects
+    it with 401, the manager logs in again. Only one worker performs the
+    login; the others wait for it and pick up the new token.
+    """
+
+    def __init__(self, client, username, password, system_id, cache_path,
+                 ttl=DEFAULT_TOKEN_TTL, refresh_margin=DEFAULT_REFRESH_MARGIN, seed_token=None):
+        self.client = client
+        self.username = username
+        self.password = password
+        self.system_id = system_id
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.seed_token = seed_token
+        self._lock = threading.RLock()
+        self._entry = None
+
+    @property
+    def token(self):
+        return self._entry["token"] if self._entry else None
+
+    def header(self):
+        """Return the Authorization header for a fresh token, logging in if needed"""
+        with self._lock:
+            if self._entry is None:
+                self._entry = self._load_cache()
+            if self._entry is None and self.seed_token:
+                self._entry = self._seed(self.seed_token)
+            if self._entry is None or self._needs_refresh(self._entry):
+                self._login()
+            return {"Authorization": f"bearer {self._entry['token']}"}
+
+    def refresh(self, stale_token=None):
+        """Replace a rejected token and return the new header.
+
+        When another worker already replaced ``stale_token`` the current token
+        is returned without logging in again.
+        """
+        with self._lock:
+            if self._entry is None or stale_token is None or self._entry["token"] == stale_token:
+                # Another process may already have refreshed the shared cache file
+                cached = self._load_cache()
+                if cached and cached["token"] != stale_token and not self._needs_refresh(cached):
+                    self._entry = cached
+                else:
+                    self._login()
+            return {"Authorization": f"bearer {self._entry['token']}"}
+
+    def store(self, token, issued_at=None):
+        """Cache a token obtained elsewhere (e.g. APIAuthenticationScript.py)"""
+        with self._lock:
+            self._entry = self._make_entry(token, issued_at or datetime.now())
+            self._save_cache(self._entry)
+
+    def _needs_refresh(self, entry):
+        expires_at = datetime.fromisoformat(entry["expires_at"])
+        return datetime.now() >= expires_at - self.refresh_margin
+
+    def _seed(self, token):
+        """Start from a token configured in .env (W_TOKEN); its issue time is unknown, so it is checked once"""
+        logger.info("Checking configured W_TOKEN")
+        response = self.client.get("reports", headers={"Authorization": f"bearer {token}"}, timeout=30,
+                                   managed_auth=False)
+        if response.status_code != 200:
+            logger.warning(f"Configured W_TOKEN was rejected ({response.status_code})")
+            return None
+        entry = self._make_entry(token, datetime.now())
+        self._save_cache(entry)
+        return entry
+
+    def _login(self):
+        logger.info("Logging in to VeraCore for a new token")
+        body = {
+            "userName": self.username,
+            "password": self.password,
+            "systemId": self.system_id
+        }
+        response = self.client.post("Login", data=body, timeout=120)
+        if response.status_code != 200:
+            raise RuntimeError(f"Login Failed: {response.status_code} {response.text[:500]}")
+        data = response.json()
+        entry = self._make_entry(data["Token"], datetime.now(), self._explicit_expiry(data))
+        self._save_cache(entry)
+        self._entry = entry
+        logger.info(f"Authentication Successful. Token valid until {entry['expires_at']}")
+
+    def _explicit_expiry(self, data):
+        for field in _EXPIRY_FIELDS:
+            value = data.get(field)
+            if value:
+                try:
+                    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).astimezone().replace(tzinfo=None)
+                except ValueError:
+                    continue
+        return None
+
+    def _make_entry(self, token, issued_at, expires_at=None):
+        return {
+            "token": token,
+            "issued_at": issued_at.isoformat(timespec="seconds"),
+            "expires_at": (expires_at or issued_at + self.ttl).isoformat(timespec="seconds"),
+            "username": self.username,
+            "system_id": self.system_id,
+        }
+
+    def _cache_key(self):
+        return f"{self.system_id}/{self.username}"
+
+    def _read_cache(self):
+        """All cached entries by cache key"""
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entries, dict):
+            return {}
+        if "token" in entries:
+            # A single entry, as earlier versions wrote the file
+            entries = {f"{entries.get('system_id')}/{entries.get('username')}": entries}
+        return entries
+
+    def _load_cache(self):
+        entry = self._read_cache().get(self._cache_key())
+        if not entry or entry.get("system_id") != self.system_id or entry.get("username") != self.username:
+            return None
+        return entry
+
+    def _save_cache(self, entry):
+        entries = self._read_cache()
+        entries[self._cache_key()] = entry
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
@@ -0,0 +1,93 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+# Row hashes are summed modulo 2**256 so the fingerprint ignores row order but still counts duplicates
+_MODULUS = 1 << 256
+
+
+def fingerprint_csv(csv_path):
+    """Order-independent content hash of a CSV file.
+
+    Each row is normalized to its sorted (column, stripped value) pairs
+    before hashing, so neither row order nor column order changes the
+    result. The file is read one row at a time.
+    """
+    total = 0
+    rows = 0
+    with open(csv_path, newline="", encoding="utf-8") as csv_file:
+        reader = csv.reader(csv_file)
+        header = next(reader, None) or []
+        columns = [col.strip() for col in header]
+        order = sorted(range(len(columns)), key=lambda i: columns[i])
+        for row in reader:
+            normalized = "\x1f".join(
+                f"{columns[i]}\x1e{row[i].strip() if i < len(row) else ''}" for i in order
+            )
+            total = (total + int.from_bytes(hashlib.sha256(normalized.encode("utf-8")).digest(), "big")) % _MODULUS
+            rows += 1
+
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(sorted(columns)).encode("utf-8"))
+    digest.update(total.to_bytes(32, "big"))
+    digest.update(str(rows).encode("ascii"))
+    return digest.hexdigest(), rows
+
+
+class UploadManifest:
+    """Last uploaded content fingerprint per report, kept in a local JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, manifest):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, report_name):
+        with self._lock:
+            return self._read().get(report_name)
+
+    def is_unchanged(self, report_name, fingerprint, formats=None):
+        """True when the last upload had the same content and the same output formats"""
+        entry = self.get(report_name)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return False
+        return formats is None or sorted(entry.get("formats") or []) == sorted(formats)
+
+    def record_upload(self, report_name, fingerprint, rows, uploaded_files, formats=None):
+        with self._lock:
+            manifest = self._read()
+            manifest[report_name] = {
+                "fingerprint": fingerprint,
+                "rows": rows,
+                "uploaded_files": list(uploaded_files),
+                "formats": sorted(formats or []),
+                "uploaded_at": datetime.now().isoformat(timespec="seconds"),
+                "skipped_runs": 0,
+                "last_skipped_at": None,
+            }
+            self._write(manifest)
+
+    def record_skip(self, report_name):
+        with self._lock:
+            manifest = self._read()
+            entry = manifest.get(report_name)
+            if entry is None:
+                return
+            entry["skipped_runs"] = entry.get("skipped_runs", 0) + 1
+            entry["last_skipped_at"] = datetime.now().isoformat(timespec="seconds")
+            self._write(manifest)
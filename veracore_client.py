@@ -0,0 +1,142 @@
+import logging
+import time
+
+from rate_limit import retry_after
+
+VERACORE_BASE_URL = "https://wms.3plwinner.com/VeraCore/Public.Api/api"
+
+# (connect, read) timeout used when a call does not pass its own
+DEFAULT_TIMEOUT = (10, 90)
+
+# Server errors worth retrying at the transport level
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+logger = logging.getLogger(__name__)
+
+
+def transport_retries(response):
+    """Number of retries urllib3 made before this response"""
+    retry = getattr(response.raw, "retries", None)
+    return len(retry.history) if retry is not None else 0
+
+
+def bytes_received(response):
+    """Body bytes received for a response that has been consumed"""
+    if getattr(response, "bytes_read", None) is not None:
+        return response.bytes_read
+    content = getattr(response, "_content", None)
+    if isinstance(content, bytes):
+        return len(content)
+    try:
+        return int(response.raw.tell())
+    except Exception:
+        return 0
+
+
+class VeraCoreClient:
+    """Keep-alive HTTP client for the VeraCore Public API.
+
+    All VeraCore calls share one requests.Session so connections through
+    Cloudflare are reused instead of re-negotiating TCP+TLS per request.
+    Connection errors are retried for every method; read errors and 5xx
+    responses are only retried for GET, so a report task is never queued twice.
+
+    With a ``token_manager`` attached, authenticated requests (those passing an
+    Authorization header) always carry the manager's current token, and a 401
+    triggers one token refresh and a single retry.
+
+    With a ``limiter`` (rate_limit.ApiLimiter) every request waits for the
+    shared rate limit and concurrency slot and fails fast with
+    CircuitOpenError while the API is down. A 429 was never processed by the
+    server, so it is retried for any method after its Retry-After.
+    """
+
+    def __init__(self, base_url=VERACORE_BASE_URL, pool_size=10, timeout=DEFAULT_TIMEOUT,
+                 retries=3, backoff_factor=0.5, token_manager=None, limiter=None, throttle_retries=2):
+        self.base_url = base_url.rstrip("/")
+        self.token_manager = token_manager
+        self.timeout = timeout
+        self.limiter = limiter
+        self.throttle_retries = throttle_retries
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path):
+        """Build a full URL from a path relative to the API root (full URLs pass through)"""
+        if path.startswith("http://") or path.startswith("https://"):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, timeout=None, headers=None, managed_auth=True, **kwargs):
+        url = self.url(path)
+        timeout = timeout or self.timeout
+        managed = managed_auth and self.token_manager is not None and headers and "Authorization" in headers
+        if managed:
+            headers = {**headers, **self.token_manager.header()}
+
+        response, retries = self._send(method, url, timeout=timeout, headers=headers, **kwargs)
+
+        if managed and response.status_code == 401:
+            stale_token = headers["Authorization"].split(" ", 1)[-1]
+            logger.warning(f"VeraCore rejected the token for {method} {url}, refreshing and retrying once")
+            response.close()
+            headers = {**headers, **self.token_manager.refresh(stale_token)}
+            response, more_retries = self._send(method, url, timeout=timeout, headers=headers, **kwargs)
+            retries += 1 + more_retries
+
+        # Retries behind this response (transport, throttling and token refresh), for run metrics
+        response.retries = retries
+        return response
+
+    def _send(self, method, url, **kwargs):
+        """Send through the limiter, retrying 429s; returns (response, retries)"""
+        retries = 0
+        for attempt in range(self.throttle_retries + 1):
+            if self.limiter:
+                response = self.limiter.call(lambda: self.session.request(method, url, **kwargs))
+            else:
+                response = self.session.request(method, url, **kwargs)
+            retries += transport_retries(response)
+            if response.status_code != 429 or attempt == self.throttle_retries:
+                break
+            wait = retry_after(response)
+            logger.warning(f"VeraCore throttled {method} {url}, retrying in {wait:g}s")
+            response.close()
+            retries += 1
+            if not self.limiter:
+                # With a limiter the shared bucket is already paused for everyone
+                time.sleep(wait)
+        return response, retries
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()